@@ -0,0 +1,42 @@
+"""Benchmark the AST to XML builders in `pygradecode.ast_to_xml`.
+
+Run with the package installed (e.g. `make install-dev`):
+
+  python benchmarks/bench_ast_to_xml.py
+"""
+
+import ast
+import timeit
+from textwrap import dedent
+
+from pygradecode.ast_to_xml import BUILDERS
+
+# a chunk of notebook-like code that gets repeated to make a large submission
+CHUNK = dedent("""
+  import pandas as pd
+  df = pd.read_csv("penguins.csv")
+  result = (df
+    .loc[df['species'] == 'Chinstrap']
+    .assign(rel_year = lambda df_: df_['year'] - 2007)
+    .groupby('island')['bill_length_mm']
+    .agg(['mean', 'max'])
+  )
+  def add_two(x, y=2):
+    return [i + y for i in range(x) if i % 2 == 0]
+  print(sum([1, round(2.5), 3]), sep=", ", end="\\n")
+""")
+
+def bench(lines: int = 3000, repeat: int = 5) -> None:
+  code = CHUNK * (lines // CHUNK.count("\n"))
+  ast_tree = ast.parse(code)
+  print(f"{code.count(chr(10))} lines, {sum(1 for _ in ast.walk(ast_tree))} AST nodes")
+
+  timings = {}
+  for name, builder in BUILDERS.items():
+    timings[name] = min(timeit.repeat(lambda: builder(ast_tree), number=1, repeat=repeat))
+    print(f"{name:>10}: {timings[name] * 1000:8.1f} ms")
+
+  print(f"   speedup: {timings['recursive'] / timings['native']:.2f}x")
+
+if __name__ == "__main__":
+  bench()
@@ -0,0 +1,60 @@
+"""Benchmark argument matching in `find_arguments()` on many call sites.
+
+Compares the grouped (hash join) matching of `get_matched_arguments()` with
+comparing every match argument to every code argument.
+
+Run with the package installed (e.g. `make install-dev`):
+
+  python benchmarks/bench_find_arguments.py
+"""
+
+import timeit
+
+from pygradecode.find_arguments import (
+  KWArg, args, extract_arguments, get_matched_arguments
+)
+from pygradecode.grade_code_found import GradeCodeFound
+from pygradecode.xml_utils import compare_xml_nodes
+
+def pairwise_matched_arguments(match_args, all_code_args):
+  """Match every match argument against every code argument."""
+  results = []
+  for match_arg in match_args:
+    for argument in all_code_args:
+      if type(match_arg) is not type(argument):
+        continue
+      elif isinstance(match_arg, KWArg):
+        if match_arg.name == argument.name and \
+          compare_xml_nodes(match_arg.value_xml_node, argument.value_xml_node):
+          results.append(argument.value_xml_node)
+      elif compare_xml_nodes(match_arg.xml_node, argument.xml_node):
+        results.append(argument.xml_node)
+  return results
+
+def bench(calls: int = 1500, repeat: int = 5) -> None:
+  code = "\n".join(
+    f'f{i % 7}({i % 50}, "s{i % 5}", [x{i % 3}, {i % 11}], key=lambda v: v + {i % 4}, sep=", ")'
+    for i in range(calls)
+  )
+  gcf = GradeCodeFound(code)
+  all_code_args = extract_arguments(code, gcf.index['Call'])
+  match_args = args(
+    '7', '"s3"', '[x1, 5]', '"missing"', key='lambda v: v + 2', sep='", "'
+  ).args
+  print(f"{calls} call sites, {len(all_code_args)} code arguments, {len(match_args)} match arguments")
+
+  expected = pairwise_matched_arguments(match_args, all_code_args)
+  assert get_matched_arguments(match_args, all_code_args) == expected
+
+  pairwise = min(timeit.repeat(
+    lambda: pairwise_matched_arguments(match_args, all_code_args), number=1, repeat=repeat
+  ))
+  grouped = min(timeit.repeat(
+    lambda: get_matched_arguments(match_args, all_code_args), number=1, repeat=repeat
+  ))
+  print(f"  pairwise: {pairwise * 1000:8.1f} ms")
+  print(f"   grouped: {grouped * 1000:8.1f} ms")
+  print(f"   speedup: {pairwise / grouped:.2f}x")
+
+if __name__ == "__main__":
+  bench()
@@ -0,0 +1,39 @@
+"""Benchmark the "xml" and "ast" backends of the find_*() functions.
+
+Each run starts with empty caches, like grading a new submission.
+
+Run with the package installed (e.g. `make install-dev`):
+
+  python benchmarks/bench_find_backends.py
+"""
+
+import timeit
+
+from pygradecode.ast_query import ast_index_cache_clear
+from pygradecode.ast_to_xml import xml_cache_clear
+from pygradecode.find_functions import find_functions, find_lambdas
+from pygradecode.find_operators import find_operators
+
+from bench_ast_to_xml import CHUNK
+
+def checks(code: str, backend: str) -> None:
+  xml_cache_clear()
+  ast_index_cache_clear()
+  find_functions(code, "sum", backend=backend)
+  find_functions(code, "agg", backend=backend)
+  find_lambdas(code, backend=backend)
+  find_operators(code, "+", backend=backend)
+
+def bench(lines: int = 3000, repeat: int = 5) -> None:
+  code = CHUNK * (lines // CHUNK.count("\n"))
+  print(f"{code.count(chr(10))} lines")
+
+  timings = {}
+  for backend in ("xml", "ast"):
+    timings[backend] = min(timeit.repeat(lambda: checks(code, backend), number=1, repeat=repeat))
+    print(f"{backend:>10}: {timings[backend] * 1000:8.1f} ms")
+
+  print(f"   speedup: {timings['xml'] / timings['ast']:.2f}x")
+
+if __name__ == "__main__":
+  bench()
@@ -0,0 +1,48 @@
+"""Benchmark `grade_code()` on a long, correct submission.
+
+The comparison walks both ASTs with an explicit work stack, skips the
+subtrees that have the same structural ids and only formats source text for a
+reported difference. The solution is prepared once (parsed, given structural
+ids, and its calls standardized) and reused for every submission.
+
+Run with the package installed (e.g. `make install-dev`):
+
+  python benchmarks/bench_grade_code.py
+"""
+
+import timeit
+
+from pygradethis.grade_code import grade_code, prepare_solution, solution_cache_clear
+
+def unprepared(student_code, solution_code):
+  """Grade as if it was the first submission graded against the solution."""
+  solution_cache_clear()
+  return grade_code(student_code, solution_code)
+
+def bench_case(name: str, code: str, wrong: str, repeat: int) -> None:
+  print(name)
+  assert grade_code(code, code) is None
+  assert grade_code(wrong, code) is not None
+
+  solution = prepare_solution(code)
+  for label, student_code in [("correct", code), ("wrong (last line)", wrong)]:
+    first = min(timeit.repeat(lambda: unprepared(student_code, code), number=1, repeat=repeat))
+    prepared = min(timeit.repeat(lambda: grade_code(student_code, solution), number=1, repeat=repeat))
+    print(f"  {label:>17}: {first * 1000:8.1f} ms first, {prepared * 1000:8.1f} ms prepared")
+
+def bench(lines: int = 2000, calls: int = 50, repeat: int = 5) -> None:
+  code = "\n".join(
+    f"x{i} = (y{i} + {i}) * (z{i} - {i}) if a{i} else [{i}, {i}]"
+    for i in range(lines)
+  )
+  wrong = code.replace(f"[{lines - 1}, {lines - 1}]", f"[{lines - 1}, {lines}]")
+  bench_case(f"{lines} lines", code, wrong, repeat)
+
+  code = "def f(a, b):\n  return a\n" + "\n".join(
+    f"y{i} = f(({i} + 1) * 2, b=abs({i}))" for i in range(calls)
+  )
+  wrong = code.replace(f"abs({calls - 1}))", f"abs({calls}))")
+  bench_case(f"{calls} calls", code, wrong, repeat)
+
+if __name__ == "__main__":
+  bench()
@@ -0,0 +1,49 @@
+"""Benchmark `grade_many()` against grading the submissions one at a time.
+
+Each worker process prepares the exercise once and grades the submissions in
+chunks, so the throughput grows with the number of workers.
+
+Run with the package installed (e.g. `make install-dev`):
+
+  python benchmarks/bench_grade_many.py
+"""
+
+import os
+import time
+
+from pygradethis.grade_code import prepare_solution
+from pygradethis.pygradethis_exercise_checker import pygradethis_exercise_checker
+from pygradethis.python_grader import grade_many
+
+CHECK_CODE = """grade_result(
+  pass_if_equals(3, "Nice work!"),
+  fail_if_equals(0, "Your code differs from the solution."),
+  user_result = 3 if grade_code(user_code, prepared_solution) is None else 0
+)"""
+
+def bench(submissions: int = 2000, lines: int = 100) -> None:
+  solution_code = "\n".join(f"x{i} = round({i} / 3, ndigits=2) + abs(y{i})" for i in range(lines))
+  wrong = solution_code.replace("ndigits=2", "ndigits=3")
+  codes = [solution_code if i % 2 else wrong for i in range(submissions)]
+
+  start = time.perf_counter()
+  solution = prepare_solution(solution_code)
+  serial = [
+    pygradethis_exercise_checker(user_code=code, solution_code=solution, check_code=CHECK_CODE)
+    for code in codes
+  ]
+  elapsed = time.perf_counter() - start
+  print(f"{submissions} submissions of {lines} lines")
+  print(f"  {'serial':>10}: {submissions / elapsed:8.0f} submissions/s")
+
+  workers = 1
+  while workers <= (os.cpu_count() or 1):
+    start = time.perf_counter()
+    results = list(grade_many(codes, solution_code, CHECK_CODE, workers=workers))
+    elapsed = time.perf_counter() - start
+    assert [r["correct"] for r in results] == [r["correct"] for r in serial]
+    print(f"  {f'{workers} workers':>10}: {submissions / elapsed:8.0f} submissions/s")
+    workers *= 2
+
+if __name__ == "__main__":
+  bench()
@@ -0,0 +1,55 @@
+"""Benchmark the cold import time of the packages against a budget.
+
+Each import is timed in a new interpreter (the best of a few runs), as in a
+short-lived grading process. The submodules of both packages are imported
+when they are first used, and pandas, rich and lxml only when they are
+needed, so the script also reports which of them each import loaded. It
+exits with status 1 if an import is over its budget.
+
+Run with the package installed (e.g. `make install-dev`):
+
+  python benchmarks/bench_import.py
+"""
+
+import subprocess
+import sys
+
+# the import statements and their budgets, in milliseconds
+BUDGETS = {
+  "import pygradethis": 10,
+  "import pygradecode": 10,
+  "from pygradethis.pygradethis_exercise_checker import pygradethis_exercise_checker": 60,
+  "from pygradethis.grade_code import grade_code": 60,
+  "from pygradecode.find_functions import find_functions": 80,
+}
+
+HEAVY = ("pandas", "numpy", "rich", "lxml")
+
+TIMER = """
+import sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(elapsed, *[m for m in {heavy!r} if m in sys.modules])
+"""
+
+def cold_import(statement: str) -> tuple[float, list]:
+  output = subprocess.run(
+    [sys.executable, "-c", TIMER.format(statement=statement, heavy=HEAVY)],
+    capture_output=True, text=True, check=True
+  ).stdout.split()
+  return float(output[0]), output[1:]
+
+def bench(repeat: int = 5) -> bool:
+  within_budget = True
+  for statement, budget in BUDGETS.items():
+    runs = [cold_import(statement) for _ in range(repeat)]
+    elapsed = min(t for t, _ in runs) * 1000
+    loaded = ", ".join(runs[0][1]) or "none"
+    status = "ok" if elapsed <= budget else "OVER BUDGET"
+    within_budget = within_budget and elapsed <= budget
+    print(f"{elapsed:7.1f} ms (budget {budget:3d} ms, {status}) {statement}\n    loads: {loaded}")
+  return within_budget
+
+if __name__ == "__main__":
+  sys.exit(0 if bench() else 1)
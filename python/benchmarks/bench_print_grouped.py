@@ -0,0 +1,46 @@
+"""Benchmark printing a query with many results.
+
+Compares printing a GradeCodeFound, which highlights each result in a copy of
+the whole source, with `print_grouped()`, which highlights all the results in
+one pass and prints only their lines, up to `max_results`.
+
+Run with the package installed (e.g. `make install-dev`):
+
+  python benchmarks/bench_print_grouped.py
+"""
+
+import io
+import timeit
+
+from rich.console import Console
+
+from pygradecode.find_functions import find_functions
+from pygradecode.grade_code_found import pgc_print, print_grouped
+
+def bench(lines: int = 200, repeat: int = 3) -> None:
+  code = "\n".join(
+    f'x{i} = print({i}) + g(print(f"{i}"), y={i})' if i % 2 == 0 else f'y{i} = {i}'
+    for i in range(lines)
+  )
+  found = find_functions(code, match='print')
+  print(f"{lines} lines, {len(found.last_result)} results")
+
+  def console():
+    return Console(file=io.StringIO(), color_system='standard', width=120)
+
+  per_result = min(timeit.repeat(
+    lambda: pgc_print(found, console()), number=1, repeat=repeat
+  ))
+  grouped = min(timeit.repeat(
+    lambda: print_grouped(found, max_results=None, console=console()),
+    number=1, repeat=repeat
+  ))
+  capped = min(timeit.repeat(
+    lambda: print_grouped(found, console=console()), number=1, repeat=repeat
+  ))
+  print(f"     per result: {per_result * 1000:8.1f} ms")
+  print(f"        grouped: {grouped * 1000:8.1f} ms")
+  print(f"  grouped (cap): {capped * 1000:8.1f} ms")
+
+if __name__ == "__main__":
+  bench()
@@ -0,0 +1,84 @@
+"""Benchmark `result_checker.test_conditions()` against the unittest-based
+matcher it replaced.
+
+The old matcher built a `unittest.TestSuite` with a TestCase per condition and
+ran it with a `TextTestRunner` (with `sys.stderr` swapped for a buffer) for
+each result. The new one compares the result to each condition directly and
+stops at the first matching `pass_if_equals()`.
+
+Run with the package installed (e.g. `make install-dev`):
+
+  python benchmarks/bench_result_checker.py
+"""
+
+import sys
+import timeit
+import unittest
+from collections import namedtuple
+from io import StringIO
+
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from pygradethis.conditions import Graded, pass_if_equals, fail_if_equals
+from pygradethis.result_checker import test_conditions as check_conditions
+
+class TestCondition(unittest.TestCase):
+  def __init__(self, test_name, condition):
+    super().__init__(test_name)
+    self.condition = condition
+
+  def test_condition(self):
+    ID, actual, expected, correct = self.condition
+    try:
+      if (actual.__class__.__name__ == "DataFrame" and 
+          expected.__class__.__name__ == "DataFrame"):
+        assert_frame_equal(actual, expected)
+      elif expected is not None:
+        self.assertEqual(actual, expected)
+    except Exception:
+      self.fail(ID)
+
+class ConditionTestResult(unittest.TextTestResult):
+  def __init__(self, stream, descriptions, verbosity):
+    super().__init__(stream, descriptions, verbosity)
+    self.matched = []
+
+  def addSuccess(self, test):
+    super().addSuccess(test)
+    self.matched.append(test.condition.id)
+
+def unittest_conditions(*conditions, user_result=None):
+  """The unittest-based matcher, as it was before it was replaced."""
+  suite = unittest.TestSuite()
+  TestCase = namedtuple("TestCase", ["id", "actual", "expected", "correct"])
+  for i, c in enumerate(conditions):
+    suite.addTest(TestCondition('test_condition', TestCase(i, user_result, c['x'], c['correct'])))
+  default_buffer = sys.stderr
+  sys.stderr = StringIO()
+  results = unittest.TextTestRunner(resultclass=ConditionTestResult).run(suite)
+  sys.stderr = default_buffer
+  matched = [conditions[i] for i in results.matched]
+  if not matched:
+    return Graded(x=None, message="", correct=False, type="error")
+  return next((c for c in matched if c['correct']), matched[0])
+
+def bench(repeat: int = 5, number: int = 200) -> None:
+  df = pd.DataFrame({"a": range(100), "b": [str(i) for i in range(100)]})
+  cases = {
+    "5 scalar conditions": (
+      [fail_if_equals(i, str(i)) for i in range(4)] + [pass_if_equals(4, "four")], 4
+    ),
+    "first of 5 passes": ([pass_if_equals(i, str(i)) for i in range(5)], 0),
+    "3 DataFrame conditions": (
+      [fail_if_equals(df.head(i)) for i in (1, 2)] + [pass_if_equals(df.copy())], df
+    ),
+  }
+  for name, (conditions, result) in cases.items():
+    assert unittest_conditions(*conditions, user_result=result) == check_conditions(*conditions, user_result=result)
+    old = min(timeit.repeat(lambda: unittest_conditions(*conditions, user_result=result), number=number, repeat=repeat))
+    new = min(timeit.repeat(lambda: check_conditions(*conditions, user_result=result), number=number, repeat=repeat))
+    print(f"{name:>24}: {old / number * 1e6:9.1f} us unittest, {new / number * 1e6:9.1f} us direct")
+
+if __name__ == "__main__":
+  bench()
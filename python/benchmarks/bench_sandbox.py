@@ -0,0 +1,45 @@
+"""Benchmark grading in a warm `SandboxPool` against a cold process per job.
+
+A cold job starts an interpreter that imports pandas and pygradethis before it
+grades, while a sandboxed job is forked from a worker that imported them once.
+
+Run with the package installed (e.g. `make install-dev`):
+
+  python benchmarks/bench_sandbox.py
+"""
+
+import subprocess
+import sys
+import time
+
+from pygradethis.sandbox import SandboxPool
+
+CHECK_CODE = "grade_result(pass_if_equals(2, 'Nice!'), user_result = last_value)"
+
+COLD_JOB = f"""
+import pandas
+from pygradethis.pygradethis_exercise_checker import pygradethis_exercise_checker
+assert pygradethis_exercise_checker(
+  user_code="2", solution_code="2", last_value=2, check_code={CHECK_CODE!r}
+)['correct']
+"""
+
+def bench(jobs: int = 20) -> None:
+  start = time.perf_counter()
+  for _ in range(jobs):
+    subprocess.run([sys.executable, "-c", COLD_JOB], check=True)
+  cold = (time.perf_counter() - start) / jobs
+
+  with SandboxPool(workers=1, timeout=10, cpu_seconds=5) as pool:
+    # start the worker and import the libraries before timing
+    pool.run(sum, [])
+    start = time.perf_counter()
+    for _ in range(jobs):
+      assert pool.check(user_code="2", solution_code="2", last_value=2, check_code=CHECK_CODE)['correct']
+    warm = (time.perf_counter() - start) / jobs
+
+  print(f"{'cold process':>14}: {cold * 1000:8.1f} ms per job")
+  print(f"{'warm sandbox':>14}: {warm * 1000:8.1f} ms per job")
+
+if __name__ == "__main__":
+  bench()
@@ -0,0 +1,57 @@
+"""Benchmark getting the source text of many nodes of one source.
+
+Compares splitting the source into lines for every node (as
+`get_node_source()` did before `SourceIndex`) with slicing a SourceIndex
+built once for the source.
+
+Run with the package installed (e.g. `make install-dev`):
+
+  python benchmarks/bench_source_index.py
+"""
+
+import timeit
+
+from pygradecode.grade_code_found import GradeCodeFound, get_node_source
+from pygradecode.highlight_text import format_text
+from pygradecode.source_index import SourceIndex
+
+def split_node_source(code, node):
+  """Split the source into lines to get the source of one (single line) node."""
+  lines = code.splitlines()
+  target_code = "\n".join(lines[int(node.get('lineno')) - 1:int(node.get('end_lineno'))])
+  return target_code[int(node.get('col_offset')):int(node.get('end_col_offset'))]
+
+def indexed_node_sources(code, nodes):
+  """Build the SourceIndex once to get the source of all the nodes."""
+  source_index = SourceIndex(code)
+  return [get_node_source(code, n, source_index) for n in nodes]
+
+def bench(calls: int = 2000, repeat: int = 5) -> None:
+  code = "\n".join(
+    f'f{i % 7}({i % 50}, "s{i % 5}", [x{i % 3}, {i % 11}], sep=", ")'
+    for i in range(calls)
+  )
+  gcf = GradeCodeFound(code)
+  nodes = list(gcf.index['Call'])
+  print(f"{len(code.splitlines())} lines, {len(nodes)} nodes")
+
+  assert [split_node_source(code, n) for n in nodes] == \
+    [get_node_source(gcf, n) for n in nodes]
+
+  split = min(timeit.repeat(
+    lambda: [split_node_source(code, n) for n in nodes], number=1, repeat=repeat
+  ))
+  indexed = min(timeit.repeat(
+    lambda: indexed_node_sources(code, nodes), number=1, repeat=repeat
+  ))
+  highlight = min(timeit.repeat(
+    lambda: [format_text(code, n, gcf.source_index) for n in nodes[:200]],
+    number=1, repeat=repeat
+  ))
+  print(f"  split per node: {split * 1000:8.1f} ms")
+  print(f"    source index: {indexed * 1000:8.1f} ms")
+  print(f"         speedup: {split / indexed:.2f}x")
+  print(f"  highlight 200 results: {highlight * 1000:8.1f} ms")
+
+if __name__ == "__main__":
+  bench()
@@ -0,0 +1,50 @@
+"""Benchmark the root-scope find_*() queries with and without the XML index.
+
+The XML tree is built once (as the cache does for a submission), then the
+queries are timed against an XPath scan of the whole tree.
+
+Run with the package installed (e.g. `make install-dev`):
+
+  python benchmarks/bench_xml_index.py
+"""
+
+import timeit
+
+from pygradecode.ast_to_xml import xml
+from pygradecode.find_functions import match_calls
+
+from bench_ast_to_xml import CHUNK
+
+def bench(lines: int = 3000, repeat: int = 5) -> None:
+  code = CHUNK * (lines // CHUNK.count("\n"))
+  xml_tree, index = xml(code, index=True)
+  print(f"{code.count(chr(10))} lines, {sum(1 for _ in xml_tree.iter())} elements")
+
+  queries = {
+    "//Call": (
+      lambda: xml_tree.xpath('.//Call|descendant-or-self::Call[.//attr]'),
+      lambda: list(index['Call'])
+    ),
+    "//Lambda": (
+      lambda: xml_tree.xpath("//Lambda"),
+      lambda: list(index['Lambda'])
+    ),
+    "//op/Add": (
+      lambda: xml_tree.xpath("//op/Add"),
+      lambda: [op[0] for op in index['op'] if op[0].tag == 'Add']
+    ),
+    "sum": (
+      lambda: xml_tree.xpath('.//Call//func/Name/id[.="sum"]|descendant-or-self::Call[.//attr[text()="sum"]]'),
+      lambda: match_calls(index['Call'], index['Attribute'], ['sum'])
+    ),
+  }
+  for name, (scan, indexed) in queries.items():
+    scan_time = min(timeit.repeat(scan, number=10, repeat=repeat)) / 10
+    index_time = min(timeit.repeat(indexed, number=10, repeat=repeat)) / 10
+    print(
+      f"{name:>10}: {scan_time * 1000:6.2f} ms scan, "
+      f"{index_time * 1000:6.2f} ms index ({scan_time / index_time:.1f}x)"
+    )
+
+if __name__ == "__main__":
+  bench()
@@ -1,5 +1,27 @@
-from pygradecode import find_functions
-from pygradecode import find_arguments
-from pygradecode import find_operators
-from pygradecode import find_attributes
+import importlib
 
+# the submodules are imported when they are first used (PEP 562), e.g. by
+# `pygradecode.find_functions`, so lxml is only loaded by the first query
+SUBMODULES = (
+  "find_functions",
+  "find_arguments",
+  "find_operators",
+  "find_attributes",
+  "find_utils",
+  "grade_code_found",
+  "highlight_text",
+  "xml_utils",
+  "ast_to_xml",
+  "ast_query",
+  "source_index",
+  "source_cache",
+  "xpath_queries",
+)
+
+def __getattr__(name: str):
+  if name in SUBMODULES:
+    return importlib.import_module("." + name, __name__)
+  raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+def __dir__():
+  return sorted(set(globals()) | set(SUBMODULES))
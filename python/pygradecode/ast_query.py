@@ -0,0 +1,272 @@
+"""Functions that answer find_*() queries by walking the Python AST directly.
+
+This skips turning the AST into XML for the queries that only need to look for
+node types and names (e.g. "is `sum` called?" or "is there a lambda?"). The
+results are `ASTNode`s, which have the parts of the XML Element API that
+`GradeCodeFound`, `get_node_source()` and `format_text()` use, so they can be
+shown like the results of the XML backend.
+"""
+
+import ast
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from operator import attrgetter
+from typing import Dict, Optional
+
+from lxml.etree import _Element as Element
+
+from .ast_to_xml import ATTRS, build_xml, node_table
+from .source_cache import SourceCache, CacheInfo
+
+_order = attrgetter("order")
+
+class ASTNode:
+  """An AST node located in its tree, that can be used like an XML Element.
+
+  Attributes
+  ----------
+  node : ast.AST
+      the AST node
+  field : Optional[str]
+      the name of the parent's field that holds the node
+  order : int
+      the position of the node in a pre-order walk of the tree, which is the
+      same as the order of the Elements made by `ast_to_xml.xml()`
+  end : int
+      the `order` of the last node in the subtree of the node
+  """
+  __slots__ = ("node", "field", "order", "end", "_parent", "_xml")
+
+  def __init__(
+    self,
+    node: ast.AST,
+    parent: Optional['ASTNode'] = None,
+    field: Optional[str] = None,
+    order: int = 0
+  ) -> None:
+    self.node = node
+    self.field = field
+    self.order = order
+    self.end = order
+    self._parent = parent
+    self._xml = None
+
+  @property
+  def tag(self) -> str:
+    return self.node.__class__.__name__
+
+  @property
+  def attrib(self) -> Dict[str, str]:
+    """The location attributes of the node, like those of its XML Element."""
+    node_dict = self.node.__dict__
+    return {key: str(node_dict[key]) for key in ATTRS if key in node_dict}
+
+  def get(self, key: str, default: Optional[str] = None) -> Optional[str]:
+    return self.attrib.get(key, default)
+
+  def getparent(self) -> Optional['ASTNode']:
+    return self._parent
+
+  def to_xml(self) -> Element:
+    """Return the XML Element tree for the subtree of this node."""
+    if self._xml is None:
+      self._xml = build_xml(self.node)
+    return self._xml
+
+  def xpath(self, query: str, **variables) -> list:
+    """Run an XPath query on the XML Element tree of the subtree of this node.
+
+    This lets the XML backend of the find_*() functions chain on the results
+    of the AST backend.
+    """
+    return self.to_xml().xpath(query, **variables)
+
+  def __repr__(self) -> str:
+    return f"<ASTNode {self.tag} at {hex(id(self))}>"
+
+class ASTIndex:
+  """A parsed AST with an index of its nodes by type and by parent field.
+
+  The index is filled in during a single walk of the tree, and each list of
+  nodes is in source (pre-order) order.
+
+  Parameters
+  ----------
+  code : str
+      the source code
+  """
+
+  def __init__(self, code: str) -> None:
+    self.source = code
+    self.nodes: list[ASTNode] = []
+    self.by_type: Dict[str, list[ASTNode]] = defaultdict(list)
+    self.by_field: Dict[str, list[ASTNode]] = defaultdict(list)
+
+    # (AST node, parent ASTNode, field name) tuples left to visit
+    stack = [(ast.parse(code), None, None)]
+    while stack:
+      node, parent, field = stack.pop()
+      located = ASTNode(node, parent, field, len(self.nodes))
+      self.nodes.append(located)
+      self.by_type[located.tag].append(located)
+      if field is not None:
+        self.by_field[field].append(located)
+
+      _, _, fields, _ = node_table(node.__class__)
+      node_dict = node.__dict__
+      children = []
+      for key, *_ in fields:
+        if key not in node_dict:
+          continue
+        value = node_dict[key]
+        if isinstance(value, ast.AST):
+          children.append((value, located, key))
+        elif isinstance(value, list) and all(isinstance(x, ast.AST) for x in value):
+          # like the XML tree, skip lists that mix AST nodes with other values
+          children.extend((x, located, key) for x in value)
+      stack.extend(reversed(children))
+
+    # the last order of each subtree
+    for located in reversed(self.nodes):
+      parent = located.getparent()
+      if parent is not None and located.end > parent.end:
+        parent.end = located.end
+
+  @property
+  def root(self) -> ASTNode:
+    return self.nodes[0]
+
+  def descendants(self, tag: str, context: ASTNode, include_self: bool = False) -> list[ASTNode]:
+    """Return the nodes of a type within the subtree of `context`, in source order.
+
+    Parameters
+    ----------
+    tag : str
+        the AST node type (e.g. 'Call')
+    context : ASTNode
+        the root of the subtree
+    include_self : bool, optional
+        whether to include `context` itself, by default False
+
+    Returns
+    -------
+    list[ASTNode]
+        the nodes
+    """
+    nodes = self.by_type.get(tag, [])
+    start = context.order if include_self else context.order + 1
+    lo = bisect_left(nodes, start, key=_order)
+    hi = bisect_right(nodes, context.end, key=_order)
+    return nodes[lo:hi]
+
+def is_ast_result(nodes: list) -> bool:
+  """Whether query results can be searched further by the AST backend."""
+  return all(isinstance(node, ASTNode) for node in nodes)
+
+def find_function_calls(index: ASTIndex, context: ASTNode, match: str = "") -> list[ASTNode]:
+  """Return the `Call` nodes within `context` for `find_functions()`.
+
+  This mirrors the XML backend query:
+  `.//Call//func/Name/id[.="match"]|descendant-or-self::Call[.//attr[text()="match"]]`
+
+  Parameters
+  ----------
+  index : ASTIndex
+      the indexed AST
+  context : ASTNode
+      the root of the subtree to search
+  match : str, optional
+      a particular function name, by default ""
+
+  Returns
+  -------
+  list[ASTNode]
+      the Call nodes in source order
+  """
+  if match == "":
+    calls = index.descendants('Call', context)
+    if context.tag == 'Call' and len(index.descendants('Attribute', context)) > 0:
+      calls.insert(0, context)
+    return calls
+
+  return find_function_calls_by_name(index, context, [match])[match]
+
+def find_function_calls_by_name(
+  index: ASTIndex,
+  context: ASTNode,
+  names: list[str]
+) -> Dict[str, list[ASTNode]]:
+  """Return the `Call` nodes within `context` for several function names at once.
+
+  Parameters
+  ----------
+  index : ASTIndex
+      the indexed AST
+  context : ASTNode
+      the root of the subtree to search
+  names : list[str]
+      the function names
+
+  Returns
+  -------
+  Dict[str, list[ASTNode]]
+      the Call nodes in source order for each name
+  """
+  # the results of each name keyed by the order of the matched XML node
+  found = {name: {} for name in names}
+  for name in index.descendants('Name', context):
+    call = name.getparent()
+    if name.field == 'func' and call is not context and name.node.id in found:
+      found[name.node.id][name.order] = call
+  for attribute in index.descendants('Attribute', context, include_self=True):
+    hits = found.get(attribute.node.attr)
+    if hits is None:
+      continue
+    # every Call between the attribute and the context (inclusive)
+    ancestor = attribute.getparent()
+    while ancestor is not None and ancestor.order >= context.order:
+      if ancestor.tag == 'Call':
+        hits[ancestor.order] = ancestor
+      ancestor = ancestor.getparent()
+  return {name: [hits[order] for order in sorted(hits)] for name, hits in found.items()}
+
+def find_lambda_nodes(index: ASTIndex, context: ASTNode) -> list[ASTNode]:
+  """Return the `Lambda` nodes within `context` for `find_lambdas()`."""
+  return index.descendants('Lambda', context)
+
+def find_operator_nodes(index: ASTIndex, operators: Optional[list[str]] = None) -> list[ASTNode]:
+  """Return the operator nodes (e.g. `Add`) for `find_operators()`.
+
+  Parameters
+  ----------
+  index : ASTIndex
+      the indexed AST
+  operators : Optional[list[str]], optional
+      the AST operator node names to match, by default all operators
+
+  Returns
+  -------
+  list[ASTNode]
+      the operator nodes in source order
+  """
+  op_nodes = index.by_field.get('op', [])
+  if operators is None:
+    return list(op_nodes)
+  return [op for op in op_nodes if op.tag in operators]
+
+# AST index cache ----
+
+# the indexed ASTs shared by the find_*() functions and GradeCodeFound
+AST_INDEX_CACHE = SourceCache(ASTIndex)
+
+def cached_ast_index(code: str) -> ASTIndex:
+  """Return the indexed AST of Python source code, parsing it only once."""
+  return AST_INDEX_CACHE.get(code)
+
+def ast_index_cache_info() -> CacheInfo:
+  """Return the hits, misses, maxsize and current size of the AST index cache."""
+  return AST_INDEX_CACHE.info()
+
+def ast_index_cache_clear() -> None:
+  """Clear the AST index cache and reset its counters."""
+  AST_INDEX_CACHE.clear()
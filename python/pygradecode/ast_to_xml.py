@@ -1,11 +1,14 @@
 import ast
 import textwrap
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 
 from lxml import etree as ET
 from lxml.etree import _Element as Element
 from lxml.etree import SubElement
 
+from .source_cache import SourceCache, CacheInfo
+from .source_index import SourceIndex
+
 ATTRS = ("lineno", "col_offset", "end_lineno", "end_col_offset")
 
 def ast_node_attrs(ast_node: ast.AST) -> Dict[str, Any]:
@@ -79,44 +82,327 @@ def visit_node(
 
   return xml_node
 
-def xml(code: str) -> Element:
+# the parser for the XML text made by `build_xml()`: blank text must be kept
+# since it is the content of string constants
+NATIVE_PARSER = ET.XMLParser(huge_tree=True)
+
+# scalar (non-AST) field Elements whose text is empty
+EMPTY_SCALARS = ET.XPath("//*[@type][not(text())]")
+
+# per-AST-class tables of precomputed tag names, field lists and XML templates,
+# filled in the first time a class is seen by `build_xml()`
+NODE_TABLES: Dict[type, Tuple] = {}
+
+def node_table(ast_class: type) -> Tuple:
+  """Return the precomputed XML layout of an AST class.
+
+  Parameters
+  ----------
+  ast_class : type
+      a subclass of ast.AST
+
+  Returns
+  -------
+  Tuple
+      the open tag template, the location attribute names, the fields as
+      (name, open tag, close tag, scalar template) tuples and the close tag
+  """
+  table = NODE_TABLES.get(ast_class)
+  if table is None:
+    name = ast_class.__name__
+    locations = tuple(a for a in ATTRS if a in ast_class._attributes)
+    fields = tuple(
+      (f, f"<{f}>", f"</{f}>", f'<{f} type="%s">%s</{f}>')
+      for f in ast_class._fields if not f.startswith("_")
+    )
+    open_tag = "<" + name + "".join(f' {a}="%s"' for a in locations) + ">"
+    table = NODE_TABLES[ast_class] = (open_tag, locations, fields, f"</{name}>")
+  return table
+
+def escape_text(text: str) -> str:
+  """Escape text for the content of an XML element."""
+  if "&" in text or "<" in text or ">" in text or "\r" in text:
+    text = (
+      text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+      .replace("\r", "&#13;") # XML parsers would turn a raw `\r` into `\n`
+    )
+  return text
+
+# the tags that the find_*() functions look up when no earlier result narrows
+# the scope of their query (`op` holds the operator of BinOp, UnaryOp, etc.)
+INDEXED_TAGS = ("Call", "Lambda", "Attribute", "op")
+
+# an index from a tag to its Elements in document order
+XMLIndex = Dict[str, list[Element]]
+
+def new_index(tags: Tuple[str, ...] = INDEXED_TAGS) -> XMLIndex:
+  return {tag: [] for tag in tags}
+
+def index_tree(root: Element, index: XMLIndex) -> XMLIndex:
+  """Fill in an index with the Elements of a tree, in document order."""
+  for element in root.iter(*index):
+    index[element.tag].append(element)
+  return index
+
+def build_xml(ast_node: ast.AST, index: Optional[XMLIndex] = None) -> Element:
+  """Given an AST node, create an XML Element tree in a single iterative pass.
+
+  This makes the same element layout as `visit_node()` but uses an explicit
+  stack instead of recursion, so deeply nested expressions do not hit the
+  recursion limit. The XML text is written in one pass using the per-class
+  templates in `NODE_TABLES` and turned into Elements by libxml2 in one go,
+  instead of creating every Element and attribute from Python.
+
+  Parameters
+  ----------
+  ast_node : ast.AST
+      The root node
+  index : Optional[XMLIndex], optional
+      an index to fill in with the Elements of its tags, by default None
+
+  Returns
+  -------
+  Element
+      The root Element
+  """
+  xml_text = []
+  write = xml_text.append
+  has_empty_text = False
+  # a stack of AST nodes left to visit, and tags left to write
+  stack = [ast_node]
+  while stack:
+    item = stack.pop()
+    if item.__class__ is str:
+      write(item)
+      continue
+
+    open_tag, locations, fields, close_tag = NODE_TABLES.get(item.__class__) or node_table(item.__class__)
+    node_dict = item.__dict__
+    if not locations:
+      write(open_tag)
+    elif all(key in node_dict for key in locations):
+      write(open_tag % tuple([node_dict[key] for key in locations]))
+    else:
+      write(open_tag.split(" ", 1)[0] + "".join(
+        f' {key}="{node_dict[key]}"' for key in locations if key in node_dict
+      ) + ">")
+
+    # push everything after the open tag in reverse so it is written in order
+    pending = [close_tag]
+    for key, open_field, close_field, scalar in reversed(fields):
+      if key not in node_dict:
+        continue
+      value = node_dict[key]
+      if isinstance(value, ast.AST):
+        pending += (close_field, value, open_field)
+      elif isinstance(value, list):
+        # only create subelements if they are all AST nodes
+        if all(isinstance(x, ast.AST) for x in value):
+          pending.append(close_field)
+          pending.extend(reversed(value))
+          pending.append(open_field)
+      else:
+        # for non-AST nodes, just set `type` and `text` value (content of tag)
+        text = str(value)
+        has_empty_text = has_empty_text or text == ""
+        pending.append(scalar % (type(value).__name__, escape_text(text)))
+    stack.extend(pending)
+
+  try:
+    root = ET.fromstring("".join(xml_text), NATIVE_PARSER)
+  except ET.XMLSyntaxError:
+    # libxml2 rejects documents nested deeper than 2048 elements, and text
+    # with control characters, so create the Elements one by one instead
+    # (which raises the usual lxml error for the latter)
+    return build_xml_elements(ast_node, index=index)
+
+  # the parser reads `<value type="str"></value>` as a `None` text
+  if has_empty_text:
+    for node in EMPTY_SCALARS(root):
+      node.text = ""
+  # the Elements are made by libxml2, so they are indexed in a single C-level
+  # walk that only creates Python objects for the indexed tags
+  if index is not None:
+    index_tree(root, index)
+  return root
+
+def build_xml_elements(
+  ast_node: ast.AST,
+  parser: ET.XMLParser = ET.XMLParser(remove_blank_text=True),
+  index: Optional[XMLIndex] = None
+) -> Element:
+  """Given an AST node, create an XML Element tree one Element at a time.
+
+  Like `build_xml()` this uses an explicit stack instead of recursion, but it
+  creates the Elements from Python, so it has no limit on the depth of the tree.
+
+  Parameters
+  ----------
+  ast_node : ast.AST
+      The root node
+  index : Optional[XMLIndex], optional
+      an index to fill in with the Elements of its tags, by default None
+
+  Returns
+  -------
+  Element
+      The root Element
+  """
+  if index is None:
+    index = {}
+  root = None
+  # (AST node, parent XML Element) pairs left to visit
+  stack = [(ast_node, None)]
+  while stack:
+    node, parent_xml_node = stack.pop()
+    if node is None:
+      # an indexed field Element, reached in document order
+      index[parent_xml_node.tag].append(parent_xml_node)
+      continue
+
+    _, locations, fields, _ = NODE_TABLES.get(node.__class__) or node_table(node.__class__)
+    node_dict = node.__dict__
+    attrs = {key: str(node_dict[key]) for key in locations if key in node_dict}
+
+    if parent_xml_node is None:
+      xml_node = root = parser.makeelement(node.__class__.__name__, attrs)
+    else:
+      xml_node = SubElement(parent_xml_node, node.__class__.__name__, attrs)
+    if xml_node.tag in index:
+      index[xml_node.tag].append(xml_node)
+
+    children = []
+    for key, *_ in fields:
+      if key not in node_dict:
+        continue
+      value = node_dict[key]
+      if isinstance(value, ast.AST):
+        sub_node = SubElement(xml_node, key)
+        if key in index:
+          children.append((None, sub_node))
+        children.append((value, sub_node))
+      elif isinstance(value, list):
+        if all(isinstance(x, ast.AST) for x in value):
+          sub_node = SubElement(xml_node, key)
+          if key in index:
+            children.append((None, sub_node))
+          children.extend((x, sub_node) for x in value)
+      else:
+        SubElement(xml_node, key, {"type": type(value).__name__}).text = str(value)
+
+    # visit the children in source order
+    stack.extend(reversed(children))
+
+  return root
+
+# the functions that can turn an AST into an XML tree
+BUILDERS = {
+  "native": build_xml,
+  "elements": build_xml_elements,
+  "recursive": visit_node,
+}
+
+def xml(
+  code: str,
+  builder: str = "native",
+  index: bool = False
+) -> Element | Tuple[Element, XMLIndex]:
   """Return an XML tree of Python source code representing the AST.
 
   Parameters
   ----------
   src : str
       source code text
+  builder : str, optional
+      the name of the AST to XML builder in `BUILDERS`, by default "native"
+  index : bool, optional
+      whether to also return an index from the `INDEXED_TAGS` to their
+      Elements, filled in while building the tree, by default False
 
   Returns
   -------
-  list[Element]
-      a list of Element(s)
+  Element | Tuple[Element, XMLIndex]
+      the root Element, and the index if `index` is True
   """
+  if builder not in BUILDERS:
+    raise ValueError(f"`builder` should be one of {list(BUILDERS)}")
   ast_tree = ast.parse(code)
-  return visit_node(ast_tree)
+  if not index:
+    return BUILDERS[builder](ast_tree)
+
+  xml_index = new_index()
+  if builder == "recursive":
+    root = visit_node(ast_tree)
+    index_tree(root, xml_index)
+  else:
+    root = BUILDERS[builder](ast_tree, index=xml_index)
+  return root, xml_index
+
+# Parsed XML tree cache ----
+
+# the XML trees and their indexes shared by all find_*() functions and
+# GradeCodeFound
+XML_TREE_CACHE = SourceCache(lambda code: xml(code, index=True))
+
+def cached_xml(code: str) -> Element:
+  """Return the XML tree of Python source code, parsing it only once.
+
+  The tree is shared by every caller with the same source code, so it must
+  not be modified in place.
+
+  Parameters
+  ----------
+  code : str
+      source code text
+
+  Returns
+  -------
+  Element
+      the root Element
+  """
+  return XML_TREE_CACHE.get(code)[0]
+
+def cached_xml_index(code: str) -> Tuple[Element, XMLIndex]:
+  """Return the XML tree of Python source code and its index of `INDEXED_TAGS`.
+
+  Like `cached_xml()`, both are shared and must not be modified in place.
+  """
+  return XML_TREE_CACHE.get(code)
+
+def xml_cache_info() -> CacheInfo:
+  """Return the hits, misses, maxsize and current size of the XML tree cache."""
+  return XML_TREE_CACHE.info()
+
+def xml_cache_clear() -> None:
+  """Clear the XML tree cache and reset its counters."""
+  XML_TREE_CACHE.clear()
 
 
 # Get source text ----
 
 def get_source_lines(
-  src_lines: list[str],
+  src_lines: list[str] | SourceIndex,
   node: Element,
   dedent: bool = True
 ) -> str:
-  code = "\n".join(src_lines)
-
   # attempt to extract source code lines relevant to the target node
   try:
     # extract ranges
-    start_lineno = int(node.attrib["lineno"]) - 1
+    start_lineno = int(node.attrib["lineno"])
     end_lineno = int(node.attrib["end_lineno"])
     
     # turn the relevant lines it into one string
-    code = "\n".join(src_lines[start_lineno:end_lineno])
+    if isinstance(src_lines, SourceIndex):
+      code = src_lines.lines_text(start_lineno, end_lineno)
+    else:
+      code = "\n".join(src_lines[start_lineno - 1:end_lineno])
     if dedent:
       code = textwrap.dedent(code)
   except (AttributeError, KeyError, ValueError):
     # if unsuccessful, we will return the entire code itself
-    pass
+    if isinstance(src_lines, SourceIndex):
+      code = src_lines.text
+    else:
+      code = "\n".join(src_lines)
 
   return code
@@ -1,5 +1,4 @@
 import itertools
-from copy import deepcopy
 from dataclasses import dataclass
 from typing import Optional, AnyStr
 
@@ -7,9 +6,13 @@ from lxml.etree import _Element as Element
 
 from .find_utils import uses, flatten_list
 from .grade_code_found import GradeCodeFound, get_node_source
-from .ast_to_xml import xml
+from .source_index import SourceIndex, cached_source_index
 from .xml_utils import (
-  compare_xml_nodes, literal, expr_xml_node
+  compare_xml_nodes, literal, expr_xml_node, xml_fingerprint
+)
+from .xpath_queries import (
+  CALLS_WITHIN, ARGUMENTS, POSITIONAL_ARGUMENTS, KEYWORD_ARGUMENTS,
+  KEYWORD_NAME, KEYWORD_VALUE, evaluate
 )
 
 @dataclass
@@ -89,72 +92,92 @@ def args(*args: AnyStr, **kwargs: AnyStr) -> ArgList:
 
   return ArgList(all_args)
 
-def make_kwargs(code: str, kwarg_xml_nodes: list[Element]) -> list[KWArg]:
+def source_index_of(code: str | GradeCodeFound) -> SourceIndex:
+  """Return the SourceIndex of the source code of a str or GradeCodeFound."""
+  if isinstance(code, GradeCodeFound):
+    return code.source_index
+  return cached_source_index(code)
+
+def make_kwargs(
+  code: str,
+  kwarg_xml_nodes: list[Element],
+  source_index: Optional[SourceIndex] = None
+) -> list[KWArg]:
   """Return KWArg(s) based on <keyword> XML Element(s)
 
+  The value nodes of the KWArg(s) are the <value> subtrees of the keywords
+  themselves, so they are neither re-parsed nor copied.
+
   Parameters
   ----------
   code : str
       the source code text
   kwarg_xml_nodes : list[Element]
       list of XML Elements representing keyword
+  source_index : Optional[SourceIndex], optional
+      the SourceIndex of the source code, if it was already built
 
   Returns
   -------
   list[KWArg]
       a list of KWArgs representing those keywords
   """
+  if source_index is None:
+    source_index = source_index_of(code)
+
   code_kwargs_list = []
   for kwarg_node in kwarg_xml_nodes:
     # keyword argument name
     kwarg_names = [
-      x.text for x in kwarg_node.xpath("./arg")
+      x.text for x in evaluate(KEYWORD_NAME, kwarg_node)
     ]
 
     # get the textual form for values
-    kwarg_values = [v for v in kwarg_node.xpath("./value/*")]
+    kwarg_values = [v for v in evaluate(KEYWORD_VALUE, kwarg_node)]
     kwargs_values_strings = [
-      get_node_source(code, kw)
+      get_node_source(code, kw, source_index)
       for kw in kwarg_values
     ]
 
     # combine them into pairs
-    kwargs_pairs = list(zip(kwarg_names, kwargs_values_strings))
+    kwargs_pairs = list(zip(kwarg_names, kwargs_values_strings, kwarg_values))
 
     # construct the list of Arg(s) from the keyword pairs
     code_kwargs_list.append([
       KWArg(
         name = k,
         code = v,
-        value_xml_node = expr_xml_node(v),
+        value_xml_node = value_node,
         keyword_xml_node = kwarg_node
       )
-      for k, v in kwargs_pairs
+      for k, v, value_node in kwargs_pairs
     ])
   return flatten_list(code_kwargs_list)
 
 def find_arguments(
   code: str | GradeCodeFound,
-  match: ArgList = ArgList(),
+  match: ArgList | list[ArgList] = ArgList(),
   recurse: bool = True
-) -> GradeCodeFound:
+) -> GradeCodeFound | list[GradeCodeFound]:
   """Find arguments of function calls in the code.
 
   Parameters
   ----------
   code : str | GradeCodeFound
       a string for the source code, or a GradeCodeFound for chaining queries
-  match : ArgList
-      an ArgList representing the arguments to match against
+  match : ArgList | list[ArgList]
+      an ArgList representing the arguments to match against, or a list of
+      them to match after extracting the code's arguments once
   recurse : bool
       a flag that requests whether or not to look for arguments
       within function call arguments for a previous 'function' request, by default False
 
   Returns
   -------
-  GradeCodeFound
+  GradeCodeFound | list[GradeCodeFound]
       a GradeCoundFound object that holds the list of previous results
-      and the current query results if any, by default True
+      and the current query results if any, or a list with one for each
+      match when `match` is a list
   
   Examples
   --------
@@ -185,115 +208,191 @@ def find_arguments(
   if not isinstance(code, str) and not isinstance(code, GradeCodeFound):
     raise Exception("`code` should be a `str` or `GradeCodeFound`")
   
-  gcf = deepcopy(code) if isinstance(code, GradeCodeFound) else GradeCodeFound(code)
-  xml_tree = xml(gcf.source) if isinstance(code, GradeCodeFound) else xml(code)
+  gcf = code if isinstance(code, GradeCodeFound) else GradeCodeFound(code)
 
   request_type = 'arguments'
   # TODO create a __str__ representation for ArgList
   request = ''
-  results = []
-
-  # Note: we have to encode the code to escape it properly
-  match_args = match.args
+  matches = match if isinstance(match, list) else [match]
 
   # get previous function calls in results if any, otherwise get all function calls
   all_call_xml_nodes = []
   if gcf.has_previous_request():
     for node in gcf.last_result:
       if recurse:
-        all_call_xml_nodes.append(node.xpath('//Call'))
+        all_call_xml_nodes.append(evaluate(CALLS_WITHIN, node))
       else:
         all_call_xml_nodes.append(node)
     all_call_xml_nodes = list(itertools.chain(*all_call_xml_nodes))
   else:
-    all_call_xml_nodes = xml_tree.xpath("//Call")
-
-  # if there are no arguments to look for in particular, look for
-  # all of the arguments in code
-  if len(match_args) == 0:
-    results = [
-      node.xpath("./args/*|./keywords/*")
-      for node in all_call_xml_nodes
-    ]
-    results = list(itertools.chain(*results))
-  else:
-    # Extracting each keyword pair is a bit tricky because a value
-    # could be any ast node so there is no way to have one query
-    # satisfy all types of nodes. So, instead we look at the
-    # <keyword> and its <value> node source text to reconstruct them.
-    # TODO if a gcf was passed when there was a previous request
-    # we need to iterate through gcf.results to repeat this process
-    # so we can make all of the Arg/KWArg
-
-    # extract the positional args
-    all_arg_xml_nodes = flatten_list([
-      call.xpath("./args/*")
-      for call in all_call_xml_nodes
-    ])
-    # extract the kwargs args
-    all_kwarg_xml_nodes = flatten_list([
-      call.xpath("./keywords/*")
-      for call in all_call_xml_nodes
-    ])
+    all_call_xml_nodes = gcf.index['Call']
+
+  # the arguments of the code are only extracted and grouped once for all matches
+  arg_groups = None
+  found = []
+  for arg_list in matches:
+    match_args = arg_list.args
+
+    # if there are no arguments to look for in particular, look for
+    # all of the arguments in code
+    if len(match_args) == 0:
+      results = [
+        evaluate(ARGUMENTS, node)
+        for node in all_call_xml_nodes
+      ]
+      results = list(itertools.chain(*results))
+    else:
+      if arg_groups is None:
+        arg_groups = group_arguments(extract_arguments(code, all_call_xml_nodes))
+      # check that each match Arg is in code's [Arg]
+      results = get_matched_arguments(match_args, arg_groups=arg_groups)
 
-    # construct Arg() for positional arguments
-    code_args_list = [
-      Arg(
-        code = get_node_source(code, arg),
-        xml_node = deepcopy(arg)
-      )
-      for arg in all_arg_xml_nodes
-    ]
+    # TODO make the chaining work well
+    found.append(gcf.push(request_type=request_type, request=request, result=results))
+
+  return found if isinstance(match, list) else found[0]
+
+def extract_arguments(
+  code: str | GradeCodeFound,
+  call_xml_nodes: list[Element]
+) -> list[Arg | KWArg]:
+  """Return the Arg(s) and KWArg(s) of <Call> XML Element(s)
+
+  The XML nodes of the arguments are the subtrees of the calls themselves,
+  so they are shared with the XML tree and must not be modified.
+
+  Parameters
+  ----------
+  code : str | GradeCodeFound
+      the source code text
+  call_xml_nodes : list[Element]
+      list of XML Elements representing function calls
+
+  Returns
+  -------
+  list[Arg | KWArg]
+      the positional arguments of all of the calls, then their keyword arguments
+  """
+  # Extracting each keyword pair is a bit tricky because a value
+  # could be any ast node so there is no way to have one query
+  # satisfy all types of nodes. So, instead we look at the
+  # <keyword> and its <value> node source text to reconstruct them.
+  # TODO if a gcf was passed when there was a previous request
+  # we need to iterate through gcf.results to repeat this process
+  # so we can make all of the Arg/KWArg
+
+  # extract the positional args
+  all_arg_xml_nodes = flatten_list([
+    evaluate(POSITIONAL_ARGUMENTS, call)
+    for call in call_xml_nodes
+  ])
+  # extract the kwargs args
+  all_kwarg_xml_nodes = flatten_list([
+    evaluate(KEYWORD_ARGUMENTS, call)
+    for call in call_xml_nodes
+  ])
+
+  # the source code is only indexed once for all arguments
+  source_index = source_index_of(code)
+
+  # construct Arg() for positional arguments
+  code_args_list = [
+    Arg(
+      code = get_node_source(code, arg, source_index),
+      xml_node = arg
+    )
+    for arg in all_arg_xml_nodes
+  ]
+
+  # extract the keyword args
+  code_kwargs_list = make_kwargs(code, all_kwarg_xml_nodes, source_index)
+  # combine the args with the kwargs
+  return code_args_list + code_kwargs_list
+
+def argument_key(argument: Arg | KWArg) -> Optional[tuple]:
+  """Return the key that an argument is grouped by in `group_arguments()`.
+
+  Parameters
+  ----------
+  argument : Arg | KWArg
+      a positional or keyword argument
+
+  Returns
+  -------
+  Optional[tuple]
+      the type of the argument, its keyword name (for KWArg) and the
+      fingerprint of its value node, or None if it has no value node
+  """
+  if isinstance(argument, KWArg):
+    if argument.value_xml_node is None:
+      return None
+    return (type(argument), argument.name, xml_fingerprint(argument.value_xml_node))
+  if argument.xml_node is None:
+    return None
+  return (type(argument), xml_fingerprint(argument.xml_node))
 
-    # extract the keyword args
-    code_kwargs_list = make_kwargs(code, all_kwarg_xml_nodes)
-    # combine the args with the kwargs
-    all_code_args = code_args_list + code_kwargs_list
-      
-    # check that each match Arg is in code's [Arg]
-    results = get_matched_arguments(match_args, all_code_args)
+def group_arguments(all_code_args: list[Arg | KWArg]) -> dict[tuple, list[Arg | KWArg]]:
+  """Group the arguments of the code by their `argument_key()`.
 
-  # TODO make the chaining work well
-  return gcf.push(request_type=request_type, request=request, result=results)
+  Parameters
+  ----------
+  all_code_args : list[Arg  |  KWArg]
+      a list with Arg and KWArgs representing positional and keyword arguments
+      of the code
+
+  Returns
+  -------
+  dict[tuple, list[Arg | KWArg]]
+      the arguments for each key, in the same order as `all_code_args`
+  """
+  groups = {}
+  for argument in all_code_args:
+    key = argument_key(argument)
+    if key is not None:
+      groups.setdefault(key, []).append(argument)
+  return groups
 
 def get_matched_arguments(
   match_args: list[Arg | KWArg],
-  all_code_args: list[Arg | KWArg]
+  all_code_args: Optional[list[Arg | KWArg]] = None,
+  arg_groups: Optional[dict[tuple, list[Arg | KWArg]]] = None
  ) -> list[Element]:
   """Return all code XML elements that match given the list of match and code arguments.
 
+  The code arguments are grouped by the structural fingerprint of their value
+  node (and keyword name), so each match argument is a lookup followed by an
+  exact `compare_xml_nodes()` on the arguments with the same key.
+
   Parameters
   ----------
   match_args : list[Arg  |  KWArg]
       a list with Arg and KWArgs representing positional and keyword arguments
       to match against
-  all_code_args : list[Arg  |  KWArg]
+  all_code_args : Optional[list[Arg  |  KWArg]]
       a list with Arg and KWArgs representing positional and keyword arguments
       of the code
+  arg_groups : Optional[dict[tuple, list[Arg | KWArg]]]
+      the code arguments already grouped by `group_arguments()`, instead of
+      `all_code_args`
 
   Returns
   -------
   list[Element]
-      a list of XML Element(s)
+      a list of XML Element(s), in the order of the match arguments then
+      of the code arguments
   """
+  if arg_groups is None:
+    arg_groups = group_arguments(all_code_args if all_code_args is not None else [])
+
   results = []
   for match_arg in match_args:
-    # for argument, element in args_spec:
-    for argument in all_code_args:
-      # if match Arg Element is the same as the code Arg Element
-      # add the code Arg Element as a result
-      if type(match_arg) != type(argument):
-        continue
-      elif isinstance(match_arg, KWArg) and isinstance(argument, KWArg):
-        # if we're comparing keyword arguments 
-        # check value nodes match
-        value_nodes_match = compare_xml_nodes(
-          match_arg.value_xml_node,
-          argument.value_xml_node
-        )
-        # check the kwarg name too
-        arg_names_match = match_arg.name == argument.name
-        if arg_names_match and value_nodes_match:
+    key = argument_key(match_arg)
+    if key is None:
+      continue
+    for argument in arg_groups.get(key, []):
+      # confirm the match in case of a fingerprint collision
+      if isinstance(argument, KWArg):
+        if compare_xml_nodes(match_arg.value_xml_node, argument.value_xml_node):
           results.append(argument.value_xml_node)
       elif compare_xml_nodes(match_arg.xml_node, argument.xml_node):
         results.append(argument.xml_node)
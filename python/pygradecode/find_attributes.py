@@ -1,12 +1,12 @@
 """Module to find attributes, method calls, properties in Python code."""
 
-from copy import deepcopy
-
 from lxml.etree import _Element as Element
 
-from .ast_to_xml import xml
 from .grade_code_found import GradeCodeFound
 from .find_utils import uses, flatten_list
+from .xpath_queries import (
+  ATTRIBUTES, FIRST_ATTRIBUTE, GRANDPARENT, PROPERTIES, PROPERTIES_NAMED, evaluate
+)
 
 def find_attributes(code: str | GradeCodeFound) -> GradeCodeFound:
   """Find top-level attribute access in the code.
@@ -34,25 +34,22 @@ def find_attributes(code: str | GradeCodeFound) -> GradeCodeFound:
   if not isinstance(code, str) and not isinstance(code, GradeCodeFound):
     raise Exception("`code` should be a `str` or `GradeCodeFound`")
   
-  gcf = deepcopy(code) if isinstance(code, GradeCodeFound) else GradeCodeFound(code)
-  xml_tree = xml(gcf.source) if isinstance(code, GradeCodeFound) else xml(code)
+  gcf = code if isinstance(code, GradeCodeFound) else GradeCodeFound(code)
 
   request_type = 'attributes'
   request = ''
   result = []
 
-  xpath_query = ".//Attribute"
-
   attrs = []
   if gcf.has_previous_request():
     for node in gcf.last_result:  
-      attrs.extend(node.xpath(xpath_query))
+      attrs.extend(evaluate(ATTRIBUTES, node))
     result.extend(attrs)
   else:
-    attrs = xml_tree.xpath(xpath_query)
+    attrs = gcf.index['Attribute']
     result.extend(
       flatten_list(
-        a.xpath("../..") # go up to the grandparent node (to go above <value> or <func>)
+        GRANDPARENT(a) # go up to the grandparent node (to go above <value> or <func>)
         for a in attrs
       )
     )
@@ -110,30 +107,26 @@ def find_properties(code: str | GradeCodeFound, match: str = "") -> GradeCodeFou
   if not isinstance(code, str) and not isinstance(code, GradeCodeFound):
     raise Exception("`code` should be a `str` or `GradeCodeFound`")
   
-  gcf = deepcopy(code) if isinstance(code, GradeCodeFound) else GradeCodeFound(code)
-  xml_tree = xml(gcf.source) if isinstance(code, GradeCodeFound) else xml(code)
-
+  gcf = code if isinstance(code, GradeCodeFound) else GradeCodeFound(code)
   request_type = 'property'
   request = match
   result = []
 
   if match == "":
-    xpath_query = ".//Expr/*/Attribute/../.." 
     # TODO we have duplication of this logic to handle previous requests if it exists
     # let's refactor it out into a function if possible
     if gcf.has_previous_request():
       for node in gcf.last_result:  
-        result.extend(flatten_list(node.xpath(xpath_query)))
+        result.extend(flatten_list(evaluate(PROPERTIES, node)))
     else:
-      result.extend(xml_tree.xpath(xpath_query))
+      result.extend(PROPERTIES(gcf.tree))
   else:
     # TODO support a list of matches
-    xpath_query = f".//attr[text()='{match}']/ancestor::Expr"
     if gcf.has_previous_request():
       for node in gcf.last_result:  
-        result.extend(flatten_list(node.xpath(xpath_query)))
+        result.extend(flatten_list(evaluate(PROPERTIES_NAMED, node, name=match)))
     else:
-      result.extend(xml_tree.xpath(xpath_query))
+      result.extend(PROPERTIES_NAMED(gcf.tree, name=match))
 
   return gcf.push(request_type=request_type, request=request, result=result)
 
@@ -188,8 +181,7 @@ def find_method_chains(code: str | GradeCodeFound) -> GradeCodeFound:
   if not isinstance(code, str) and not isinstance(code, GradeCodeFound):
     raise Exception("`code` should be a `str` or `GradeCodeFound`")
   
-  gcf = deepcopy(code) if isinstance(code, GradeCodeFound) else GradeCodeFound(code)
-  xml_tree = xml(gcf.source) if isinstance(code, GradeCodeFound) else xml(code)
+  gcf = code if isinstance(code, GradeCodeFound) else GradeCodeFound(code)
 
   request_type = 'property'
   request = ''
@@ -197,7 +189,7 @@ def find_method_chains(code: str | GradeCodeFound) -> GradeCodeFound:
   result = [
     a
     # if an Attribute is followed by another Attribute, we have a chain
-    for a in xml_tree.xpath(".//Attribute") if a.xpath("(.//Attribute)[1]")
+    for a in gcf.index['Attribute'] if FIRST_ATTRIBUTE(a)
   ]
 
   return gcf.push(request_type=request_type, request=request, result=result)
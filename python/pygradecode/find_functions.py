@@ -1,22 +1,40 @@
-from copy import deepcopy
-from .ast_to_xml import xml
+from typing import Optional
+
+from lxml.etree import _Element as Element
+
+from .ast_query import (
+  find_function_calls, find_function_calls_by_name, find_lambda_nodes, is_ast_result
+)
 from .grade_code_found import GradeCodeFound
-from .find_utils import uses, flatten_list
+from .find_utils import uses, flatten_list, check_backend
+from .xpath_queries import (
+  CALLS, CALLS_WITHIN, ATTRIBUTES_WITHIN, LAMBDAS, as_element, evaluate
+)
 
-def find_functions(code: str | GradeCodeFound, match: str = "") -> GradeCodeFound:
+def find_functions(
+  code: str | GradeCodeFound,
+  match: str | list[str] = "",
+  backend: str = "xml"
+) -> GradeCodeFound | list[GradeCodeFound]:
   """Find function calls in the code.
 
   Parameters
   ----------
   code : str | GradeCodeFound
       a string for the source code, or a GradeCodeFound for chaining queries
-  match : str, optional
-      a particular function name, by default None
+  match : str | list[str], optional
+      a particular function name, or a list of them to look for in a single
+      pass over the code, by default None
+  backend : str, optional
+      "xml" to query the XML tree, or "ast" to walk the indexed AST without
+      building the XML tree, by default "xml". The "ast" backend returns
+      `ASTNode`s, and falls back to "xml" when chained on XML results.
 
   Returns
   -------
-  list[Element]
-      list of XML elements corresponding to function definitions
+  GradeCodeFound | list[GradeCodeFound]
+      a GradeCodeFound with the function calls, or a list with one for
+      each match when `match` is a list
   
   Examples
   --------
@@ -49,39 +67,46 @@ def find_functions(code: str | GradeCodeFound, match: str = "") -> GradeCodeFoun
   """
   if not isinstance(code, str) and not isinstance(code, GradeCodeFound):
     raise Exception("`code` should be a `str` or `GradeCodeFound`")
+  check_backend(backend)
   
-  gcf = deepcopy(code) if isinstance(code, GradeCodeFound) else GradeCodeFound(code)
-  xml_tree = xml(gcf.source) if isinstance(code, GradeCodeFound) else xml(code)
+  gcf = code if isinstance(code, GradeCodeFound) else GradeCodeFound(code)
 
   request_type = 'functions'
-  request = match
-  result = []
+  matches = match if isinstance(match, list) else [match]
+  # the results for each match, an empty match is for all function calls
+  found = {m: [] for m in matches}
+  names = [m for m in found if m != ""]
 
-  # TODO support a list of matches
-  if request != "":
-    xpath_query = f'.//Call//func/Name/id[.="{request}"]|.//attr[text()="{request}"]/ancestor::Call'
-    if gcf.has_previous_request():
-      for node in gcf.last_result:  
-        id_nodes = node.xpath(xpath_query)
-        if len(id_nodes) > 0:
-          # grab the parent of the id element in order to view the source text
-          # since id is not an ast.AST
-          result.extend(flatten_list([get_ancestor_call(n) for n in id_nodes]))
-    else:
-      id_nodes = xml_tree.xpath(xpath_query)
-      if len(id_nodes) > 0:
-        # grab the parent of the id element in order to view the source text
-        # since id is not an ast.AST
-        result  = [get_ancestor_call(n) for n in id_nodes]
+  if backend == "ast" and is_ast_result(gcf.last_result):
+    index = gcf.ast_index
+    contexts = gcf.last_result if gcf.has_previous_request() else [index.root]
+    for node in contexts:
+      if "" in found:
+        found[""].extend(find_function_calls(index, node))
+      if len(names) > 0:
+        for name, calls in find_function_calls_by_name(index, node, names).items():
+          found[name].extend(calls)
+  elif gcf.has_previous_request():
+    for node in gcf.last_result:  
+      if "" in found:
+        found[""].extend(evaluate(CALLS, node))
+      if len(names) > 0:
+        calls = evaluate(CALLS_WITHIN, node)
+        attributes = evaluate(ATTRIBUTES_WITHIN, node)
+        for name, name_calls in match_calls(calls, attributes, names, as_element(node)).items():
+          found[name].extend(name_calls)
   else:
-    xpath_query = f'.//Call|.//attr/ancestor::Call'
-    if gcf.has_previous_request():
-      for node in gcf.last_result:  
-        result.extend(node.xpath(xpath_query))
-    else:
-      result = xml_tree.xpath(xpath_query)
+    # the query on the whole tree finds every Call
+    if "" in found:
+      found[""] = list(gcf.index['Call'])
+    if len(names) > 0:
+      found.update(match_calls(gcf.index['Call'], gcf.index['Attribute'], names))
 
-  return gcf.push(request_type=request_type, request=request, result=result)
+  results = [
+    gcf.push(request_type=request_type, request=m, result=found[m])
+    for m in matches
+  ]
+  return results if isinstance(match, list) else results[0]
 
 def uses_function(code: str, match: str = "") -> bool:
   """Check if the code uses functions.
@@ -106,15 +131,18 @@ def uses_function(code: str, match: str = "") -> bool:
   >>> uses_function(code, "round")
   False
   """
-  return uses(find_functions, code, match)
+  return uses(find_functions, code, match, backend="ast")
 
-def find_lambdas(code: str | GradeCodeFound) -> GradeCodeFound:
+def find_lambdas(code: str | GradeCodeFound, backend: str = "xml") -> GradeCodeFound:
   """Check if there are lambdas in the code.
 
   Parameters
   ----------
   code : str | GradeCodeFound
       a string for the source code, or a GradeCodeFound for chaining queries
+  backend : str, optional
+      "xml" to query the XML tree, or "ast" to walk the indexed AST without
+      building the XML tree, by default "xml"
 
   Returns
   -------
@@ -139,17 +167,23 @@ def find_lambdas(code: str | GradeCodeFound) -> GradeCodeFound:
   """
   if not isinstance(code, str) and not isinstance(code, GradeCodeFound):
     raise Exception("`code` should be a `str` or `GradeCodeFound`")
+  check_backend(backend)
   
   gcf = code if isinstance(code, GradeCodeFound) else GradeCodeFound(code)
-  xml_tree = xml(gcf.source) if isinstance(code, GradeCodeFound) else xml(code)
 
   request_type = 'lambdas'
   result = []
 
+  if backend == "ast" and is_ast_result(gcf.last_result):
+    index = gcf.ast_index
+    contexts = gcf.last_result if gcf.has_previous_request() else [index.root]
+    result = flatten_list([find_lambda_nodes(index, node) for node in contexts])
+    return gcf.push(request_type=request_type, request='', result=result)
+
   if gcf.has_previous_request():
-    result = flatten_list([r.xpath(".//Lambda") for r in gcf.last_result])
+    result = flatten_list([evaluate(LAMBDAS, r) for r in gcf.last_result])
   else:
-    result = xml_tree.xpath("//Lambda")
+    result = list(gcf.index['Lambda'])
 
   return gcf.push(request_type=request_type, request='', result=result)
 
@@ -175,7 +209,62 @@ def uses_lambda(code: str) -> bool:
   >>> uses_lambda(code)
   False
   """
-  return uses(find_lambdas, code)
+  return uses(find_lambdas, code, backend="ast")
+
+def match_calls(
+  calls: list[Element],
+  attributes: list[Element],
+  names: list[str],
+  context: Optional[Element] = None
+) -> dict[str, list[Element]]:
+  """Return the Calls to each function name in a single pass over the Calls.
+
+  A Call matches a name if it calls a function of that name, or if it has an
+  attribute of that name within it (e.g. `df.sum()` and `print(df.sum)` for
+  "sum"), in the same order as the XPath query
+  `.//Call//func/Name/id[.="sum"]|descendant-or-self::Call[.//attr[text()="sum"]]`
+
+  Parameters
+  ----------
+  calls : list[Element]
+      the Calls within the context (or the whole tree), in document order
+  attributes : list[Element]
+      the Attributes within the context (or the whole tree)
+  names : list[str]
+      the function names
+  context : Optional[Element], optional
+      the Element of a previous result to search within, by default the
+      whole tree
+
+  Returns
+  -------
+  dict[str, list[Element]]
+      the Call elements for each name
+  """
+  found = {name: [] for name in names}
+  scope = set(calls) if context is not None else None
+
+  # the names of the <attr>s within each Call
+  # (the children of an Attribute are <value>, <attr> and <ctx>)
+  attr_names = {}
+  for attribute in attributes:
+    name = attribute[1].text
+    if name not in found:
+      continue
+    for call in attribute.iterancestors("Call"):
+      if scope is not None and call not in scope:
+        break
+      attr_names.setdefault(call, set()).add(name)
+
+  for call in calls:
+    # a Call comes before the <id> of its own function name
+    for name in attr_names.get(call, ()):
+      found[name].append(call)
+    # <Call><func><Name><id>
+    function = call[0][0]
+    if function.tag == 'Name' and function[0].text in found and call is not context:
+      found[function[0].text].append(call)
+  return found
 
 # helper function to get the function <Call> given the <id> of function
 def get_ancestor_call(node):
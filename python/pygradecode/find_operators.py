@@ -1,5 +1,5 @@
-from .ast_to_xml import xml
-from .find_utils import uses
+from .ast_query import find_operator_nodes
+from .find_utils import uses, check_backend
 from .grade_code_found import GradeCodeFound
 
 # operator symbol to ast node name
@@ -40,7 +40,41 @@ def get_operator(op: str) -> list[str]:
   # so we will try to combine the valid ones in a list
   return [o for o in [OPERATORS.get(op), UNARY_OPS.get(op)] if o is not None]
 
-def find_operators(code: str | GradeCodeFound, match: str = "") -> GradeCodeFound:
+def match_operators(operators: list, matches: list[str]) -> dict[str, list]:
+  """Return the operator nodes for each match in a single pass over them.
+
+  Parameters
+  ----------
+  operators : list
+      the operator nodes (e.g. <Add>) in document order
+  matches : list[str]
+      the operators (e.g. '+'), an empty string matches all of them
+
+  Returns
+  -------
+  dict[str, list]
+      the operator nodes for each match
+  """
+  found = {m: [] for m in matches}
+  # AST node name to the matches that include it
+  wanted = {}
+  for m in found:
+    if m != "":
+      for name in get_operator(m):
+        wanted.setdefault(name, []).append(m)
+
+  for operator in operators:
+    for m in wanted.get(operator.tag, ()):
+      found[m].append(operator)
+  if "" in found:
+    found[""] = list(operators)
+  return found
+
+def find_operators(
+  code: str | GradeCodeFound,
+  match: str | list[str] = "",
+  backend: str = "xml"
+) -> GradeCodeFound | list[GradeCodeFound]:
   """Find operators in the code.
 
   NOTE: currently, the output is not super helpful because we're
@@ -52,13 +86,18 @@ def find_operators(code: str | GradeCodeFound, match: str = "") -> GradeCodeFoun
   ----------
   code : str
       the source code
-  match : str, optional
-      a particular operator name, by default None
+  match : str | list[str], optional
+      a particular operator name, or a list of them to look for in a single
+      pass over the code, by default None
+  backend : str, optional
+      "xml" to query the XML tree, or "ast" to walk the indexed AST without
+      building the XML tree, by default "xml"
 
   Returns
   -------
-  list[Element]
-      list of XML elements corresponding to operators
+  GradeCodeFound | list[GradeCodeFound]
+      a GradeCodeFound with the operators, or a list with one for each
+      match when `match` is a list
 
   Examples
   --------
@@ -105,20 +144,22 @@ def find_operators(code: str | GradeCodeFound, match: str = "") -> GradeCodeFoun
   """
   if not isinstance(code, str) and not isinstance(code, GradeCodeFound):
     raise Exception("`code` should be a `str` or `GradeCodeFound`")
+  check_backend(backend)
   
   gcf = code if isinstance(code, GradeCodeFound) else GradeCodeFound(code)
-  xml_tree = xml(gcf.source) if isinstance(code, GradeCodeFound) else xml(code)
 
   request_type = 'operators'
-  request = match
-  result = []
-  
-  if match != "":
-    matched_ops = get_operator(match)
-    # construct query to grab the specific matched operators
-    xpath = "|".join(f"//op/{mo}" for mo in matched_ops)
-    result = xml_tree.xpath(xpath)
-  else:
-    result = xml_tree.xpath("//op/*")
+  matches = match if isinstance(match, list) else [match]
 
-  return gcf.push(request_type=request_type, request=request, result=result)
+  if backend == "ast":
+    operators = find_operator_nodes(gcf.ast_index)
+  else:
+    # the operator node is the only child of each <op>
+    operators = [op[0] for op in gcf.index['op']]
+  found = match_operators(operators, matches)
+
+  results = [
+    gcf.push(request_type=request_type, request=m, result=found[m])
+    for m in matches
+  ]
+  return results if isinstance(match, list) else results[0]
@@ -3,6 +3,14 @@ from typing import Optional
 
 from lxml.etree import _Element as Element
 
+# the ways the find_*() functions can search the code: "xml" runs XPath queries
+# on the XML tree, "ast" walks the indexed AST (see `ast_query`)
+BACKENDS = ("xml", "ast")
+
+def check_backend(backend: str) -> None:
+  if backend not in BACKENDS:
+    raise ValueError(f"`backend` should be one of {list(BACKENDS)}")
+
 def get_ancestor_node(node: Optional[Element]) -> Optional[Element]:
   if node is None or (hasattr(node, "attrib") and len(node.attrib) > 0):
     return node
@@ -13,5 +21,38 @@ def get_ancestor_node(node: Optional[Element]) -> Optional[Element]:
 def uses(function, *args, **kwargs):
   return len(function(*args, **kwargs).last_result) > 0
 
+def uses_any(function, code, matches: list, **kwargs) -> bool:
+  """Check if `find_*()` finds results for any of the matches.
+
+  The `find_*()` function must accept a list of matches (`find_functions()`,
+  `find_operators()` or `find_arguments()`). All of the matches are looked up
+  with a single query, which doesn't stop early; only checking its results
+  stops at the first match found.
+
+  Examples
+  --------
+  >>> from pygradecode.find_functions import find_functions
+  >>> code = 'sum([1, 2, 3])'
+  >>> uses_any(find_functions, code, ["len", "sum"])
+  True
+  """
+  return any(len(found.last_result) > 0 for found in function(code, list(matches), **kwargs))
+
+def uses_all(function, code, matches: list, **kwargs) -> bool:
+  """Check if `find_*()` finds results for all of the matches.
+
+  The `find_*()` function must accept a list of matches. Like in
+  `uses_any()`, all of the matches are looked up with a single query, and
+  only checking its results stops at the first match not found.
+
+  Examples
+  --------
+  >>> from pygradecode.find_functions import find_functions
+  >>> code = 'sum([1, 2, 3])'
+  >>> uses_all(find_functions, code, ["len", "sum"])
+  False
+  """
+  return all(len(found.last_result) > 0 for found in function(code, list(matches), **kwargs))
+
 def flatten_list(alist: list | list[list]) -> list:
   return list(itertools.chain(*alist))
\ No newline at end of file
@@ -1,11 +1,20 @@
 from collections import namedtuple
-from typing import Optional
+from typing import TYPE_CHECKING, Iterable, Optional
 from lxml.etree import _Element as Element
-from rich.console import Console
 
-from .ast_to_xml import get_source_lines
+from .ast_query import ASTIndex, cached_ast_index
+from .ast_to_xml import XMLIndex, cached_xml_index
 from .find_utils import get_ancestor_node
-from .highlight_text import format_text, pgc_print
+from .highlight_text import default_console, format_pages, format_text, pgc_print
+from .source_index import SourceIndex, cached_source_index
+
+# rich is imported when something is printed
+if TYPE_CHECKING:
+  from rich.console import Console
+
+# the default cap on the results and the lines per page of print_grouped()
+MAX_RESULTS = 200
+PAGE_SIZE = 50
 
 # `type` hold the types of requests (e.g. 'function' for find_functions())
 # `request` hold the specific requests (e.g. 'sum' for find_functions())
@@ -13,12 +22,67 @@ from .highlight_text import format_text, pgc_print
 QueryResult = namedtuple("QueryResult", ['type', 'request', 'result'])
 
 class GradeCodeFound:
-  source: str
-  results: list[QueryResult]
+  """An immutable record of the source code, its XML tree and query results.
+
+  `push()` returns a new GradeCodeFound that shares the XML tree and its index,
+  the indexed AST, the source index and the previous results, so chaining
+  queries does not copy earlier results.
+  """
+  __slots__ = (
+    "_source", "_tree", "_index", "_ast_index", "_source_index", "_results"
+  )
+
+  def __init__(
+    self,
+    code: str = "",
+    results: Optional[Iterable[QueryResult]] = None,
+    tree: Optional[Element] = None,
+    index: Optional[XMLIndex] = None,
+    ast_index: Optional[ASTIndex] = None,
+    source_index: Optional[SourceIndex] = None
+  ) -> None:
+    self._source = code
+    self._results = tuple(results) if results is not None else ()
+    self._tree = tree
+    self._index = index
+    self._ast_index = ast_index
+    self._source_index = source_index
+
+  @property
+  def source(self) -> str:
+    return self._source
+
+  @property
+  def results(self) -> tuple[QueryResult, ...]:
+    return self._results
 
-  def __init__(self, code: str = "", results: Optional[QueryResult] = None) -> None:
-    self.source = code
-    self.results = results if results is not None else []
+  @property
+  def tree(self) -> Element:
+    """The XML tree of the source code, shared through the XML tree cache."""
+    if self._tree is None:
+      self._tree, self._index = cached_xml_index(self._source)
+    return self._tree
+
+  @property
+  def index(self) -> XMLIndex:
+    """The index from tag to Elements of the XML tree (see `INDEXED_TAGS`)."""
+    if self._index is None:
+      self._tree, self._index = cached_xml_index(self._source)
+    return self._index
+
+  @property
+  def ast_index(self) -> ASTIndex:
+    """The indexed AST of the source code, shared through the AST index cache."""
+    if self._ast_index is None:
+      self._ast_index = cached_ast_index(self._source)
+    return self._ast_index
+
+  @property
+  def source_index(self) -> SourceIndex:
+    """The line offsets of the source code, shared through the source index cache."""
+    if self._source_index is None:
+      self._source_index = cached_source_index(self._source)
+    return self._source_index
 
   def push(
     self, 
@@ -26,10 +90,14 @@ class GradeCodeFound:
     request: str, 
     result: list[Element]
   ) -> 'GradeCodeFound':
-    self.results.append(
-      QueryResult(type=request_type, request=request, result=result)
+    return GradeCodeFound(
+      self._source,
+      self._results + (QueryResult(type=request_type, request=request, result=result),),
+      tree=self._tree,
+      index=self._index,
+      ast_index=self._ast_index,
+      source_index=self._source_index
     )
-    return self
   
   def has_previous_request(self) -> bool:
     return len(self.results) > 0
@@ -50,13 +118,16 @@ class GradeCodeFound:
     pgc_print(self)
     return ""
 
-@pgc_print.register
-def _(arg: GradeCodeFound, console: Console = Console(color_system='standard')):
+@pgc_print.register(GradeCodeFound)
+def _(arg: GradeCodeFound, console: Optional['Console'] = None):
   last_state = arg.get_last_state()
 
   if last_state is None:
     return
 
+  if console is None:
+    console = default_console()
+
   last_type, last_request, last_result = last_state
 
   # code
@@ -70,28 +141,81 @@ def _(arg: GradeCodeFound, console: Console = Console(color_system='standard')):
   )
 
   # result
+  source_index = arg.source_index
   for i, element in enumerate(last_result):
     console.print(f"── Result {i + 1} ──")
-    formatted = format_text(arg.source, element)
+    formatted = format_text(arg.source, element, source_index)
     console.print(formatted.text, end="\n\n")
 
-def get_node_source(code: str | GradeCodeFound, node: Optional[Element]) -> str:
-  if node is None:
-    return ''
+def print_grouped(
+  found: GradeCodeFound,
+  max_results: Optional[int] = MAX_RESULTS,
+  page_size: int = PAGE_SIZE,
+  console: Optional['Console'] = None
+) -> None:
+  """Print the last results of a GradeCodeFound grouped by line, in pages.
+
+  Unlike printing a GradeCodeFound, which prints the whole source with each
+  result highlighted in turn, this highlights all the results in one pass and
+  prints only the lines that have results, a page at a time, so the output of
+  a query with many results on a big source stays short and fast.
+
+  Parameters
+  ----------
+  found : GradeCodeFound
+      the results to print
+  max_results : Optional[int], optional
+      the number of results to print at most, or None to print all of them,
+      by default MAX_RESULTS
+  page_size : int, optional
+      the number of lines of each page, by default PAGE_SIZE
+  console : Optional[Console], optional
+      the Rich console to print to, by default the default console
+  """
+  last_state = found.get_last_state()
+
+  if last_state is None:
+    return
 
-  if isinstance(code, GradeCodeFound):
-    code = code.source
+  if console is None:
+    console = default_console()
+  last_type, last_request, last_result = last_state
 
-  target_code = get_source_lines(
-    src_lines = code.splitlines(),
-    node = node,
-    dedent = False # we want to preserve the whitespace
+  console.print(f"── Request ──\n{last_type} {last_request}")
+  shown = last_result if max_results is None else last_result[:max_results]
+  console.print(
+    f"Found {len(last_result)} {'results' if len(last_result) > 1 else 'result'}."
+    + (f" Showing the first {len(shown)}." if len(shown) < len(last_result) else "")
+    + "\n"
   )
 
+  pages = format_pages(found.source, shown, page_size, found.source_index)
+  for i, page in enumerate(pages):
+    console.print(f"── Page {i + 1} ──")
+    console.print(page.text, end="\n\n")
+
+def get_node_source(
+  code: str | GradeCodeFound,
+  node: Optional[Element],
+  source_index: Optional[SourceIndex] = None
+) -> str:
+  if node is None:
+    return ''
+
+  # the source is indexed once, so getting the source of many nodes does not
+  # split it into lines again for each node
+  if source_index is None:
+    if isinstance(code, GradeCodeFound):
+      source_index = code.source_index
+    else:
+      source_index = cached_source_index(code)
+
   try:
-    node_with_location = get_ancestor_node(node)
-    start_col = int(node_with_location.attrib['col_offset'])
-    end_col = int(node_with_location.attrib['end_col_offset'])
-    return target_code[start_col:end_col].encode('raw_unicode_escape').decode()
+    location = get_ancestor_node(node).attrib
+    target_code = source_index.slice(
+      int(location['lineno']), int(location['col_offset']),
+      int(location['end_lineno']), int(location['end_col_offset'])
+    )
+    return target_code.encode('raw_unicode_escape').decode()
   except (Exception, ValueError):
     pass
\ No newline at end of file
@@ -3,9 +3,26 @@
 import builtins
 from dataclasses import dataclass
 from functools import singledispatch
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional
 
-from lxml.etree import _Element as Element
-from rich.console import Console
+from .source_index import SourceIndex, cached_source_index
+
+# lxml and rich are imported when they are first used, so importing the
+# package stays fast
+if TYPE_CHECKING:
+  from lxml.etree import _Element as Element
+  from rich.console import Console
+
+# the console that pgc_print() prints to by default
+DEFAULT_CONSOLE = None
+
+def default_console() -> 'Console':
+  """Return the default console, a standard color Rich console made once."""
+  global DEFAULT_CONSOLE
+  if DEFAULT_CONSOLE is None:
+    from rich.console import Console
+    DEFAULT_CONSOLE = Console(color_system='standard')
+  return DEFAULT_CONSOLE
 
 # pgc_print() is a generic print() method
 @singledispatch
@@ -16,33 +33,40 @@ def pgc_print(arg):
 class FormattedText:
   text: str
 
-@pgc_print.register
-def _(arg: FormattedText, console: Console = Console(color_system='standard')):
-  console.print(arg.text)
+@pgc_print.register(FormattedText)
+def _(arg: FormattedText, console: Optional['Console'] = None):
+  (console or default_console()).print(arg.text)
 
 # Override the default print() with my_print
 print = pgc_print
 
-def format_text(code: str, target_node: Element) -> FormattedText:
+def format_text(
+  code: str,
+  target_node: 'Element',
+  source_index: Optional[SourceIndex] = None
+) -> FormattedText:
 
   location = target_node.attrib
-  end_line = int(location['end_lineno']) - 1
+  end_line = int(location['end_lineno'])
 
-  code_lines = code.splitlines()
+  # the source is indexed once, so printing many results does not split it
+  # into lines again for each result
+  if source_index is None:
+    source_index = cached_source_index(code)
 
   # get the target line
   # NOTE: we might have different heuristics for different types of nodes
   # but generally when a particular node spans multiple lines
   # it might suffice to just focus on the most pertinent lines instead
   # of highlight blocks of code
-  target_line = code_lines[end_line]
+  target_line = source_index.line(end_line)
 
-  # get column offset
-  col_start = int(location['col_offset'])
-  col_end = int(location['end_col_offset'])
+  # get column offset (as characters, the AST offsets are in UTF-8 bytes)
+  col_start = source_index.char_col(end_line, int(location['col_offset']))
+  col_end = source_index.char_col(end_line, int(location['end_col_offset']))
 
   # beginning string is all previous lines
-  prev_str = "\n".join(code_lines[:end_line])
+  prev_str = source_index.text_before(end_line)
   
   beginning_line_str = target_line[:col_start]
   formatted_str = (
@@ -55,8 +79,112 @@ def format_text(code: str, target_node: Element) -> FormattedText:
 
   # end string is the rest of the lines
 
-  remaining_str = "\n".join(code_lines[end_line + 1:])
+  remaining_str = source_index.text_after(end_line)
 
   return FormattedText(
     f"{prev_str}\n{beginning_line_str}{formatted_str}{end_line_str}\n{remaining_str}"
   )
+
+def highlight_intervals(
+  target_nodes: Iterable['Element'],
+  source_index: SourceIndex
+) -> dict[int, list[tuple[int, int]]]:
+  """Return the highlighted column intervals of each line for many nodes.
+
+  The overlapping or adjacent intervals of a line are merged, so a line is
+  highlighted once however many nodes are on it. A node without a location
+  of its own (e.g. an operator) is highlighted with its closest ancestor that
+  has one.
+
+  Parameters
+  ----------
+  target_nodes : Iterable[Element]
+      the nodes to highlight
+  source_index : SourceIndex
+      the SourceIndex of the source code of the nodes
+
+  Returns
+  -------
+  dict[int, list[tuple[int, int]]]
+      the sorted (start, end) character intervals of each line number
+  """
+  intervals = {}
+  for node in target_nodes:
+    while node is not None and node.get('end_col_offset') is None:
+      node = node.getparent()
+    if node is None:
+      continue
+    location = node.attrib
+    start_line, end_line = int(location['lineno']), int(location['end_lineno'])
+    start_col = source_index.char_col(start_line, int(location['col_offset']))
+    end_col = source_index.char_col(end_line, int(location['end_col_offset']))
+    # a node that spans multiple lines is highlighted on each of them,
+    # without the indentation of the lines after the first one
+    for lineno in range(start_line, end_line + 1):
+      line = source_index.line(lineno)
+      line_start = start_col if lineno == start_line else len(line) - len(line.lstrip())
+      line_end = end_col if lineno == end_line else len(line)
+      intervals.setdefault(lineno, []).append((line_start, line_end))
+
+  for lineno, line_intervals in intervals.items():
+    line_intervals.sort()
+    merged = [line_intervals[0]]
+    for start, end in line_intervals[1:]:
+      if start <= merged[-1][1]:
+        merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+      else:
+        merged.append((start, end))
+    intervals[lineno] = merged
+  return intervals
+
+def format_line(line: str, intervals: list[tuple[int, int]]) -> str:
+  """Return a line with Rich markup around each of its (start, end) intervals."""
+  from rich.markup import escape
+  parts = []
+  position = 0
+  for start, end in intervals:
+    parts.append(escape(line[position:start]))
+    parts.append("[u bold]" + escape(line[start:end]) + "[/u bold]")
+    position = end
+  parts.append(escape(line[position:]))
+  return "".join(parts)
+
+def format_pages(
+  code: str,
+  target_nodes: Iterable['Element'],
+  page_size: int = 50,
+  source_index: Optional[SourceIndex] = None
+) -> Iterator[FormattedText]:
+  """Format the lines of many nodes, grouped by line, in pages.
+
+  All the nodes are highlighted in one pass over the lines that have them,
+  and the pages are generated one at a time, so printing can start before
+  every line is formatted and can stop at any page.
+
+  Parameters
+  ----------
+  code : str
+      the source code
+  target_nodes : Iterable[Element]
+      the nodes to highlight
+  page_size : int, optional
+      the number of lines of each page, by default 50
+  source_index : Optional[SourceIndex], optional
+      the SourceIndex of the source code, if it was already built
+
+  Yields
+  ------
+  FormattedText
+      a page of numbered lines, with the nodes in bold and underlined
+  """
+  if source_index is None:
+    source_index = cached_source_index(code)
+
+  intervals = highlight_intervals(target_nodes, source_index)
+  linenos = sorted(intervals)
+  width = len(str(linenos[-1])) if linenos else 1
+  for page_start in range(0, len(linenos), page_size):
+    yield FormattedText("\n".join(
+      f"{lineno:>{width}} │ {format_line(source_index.line(lineno), intervals[lineno])}"
+      for lineno in linenos[page_start:page_start + page_size]
+    ))
@@ -0,0 +1,91 @@
+"""A bounded LRU cache for objects built from source code (e.g. XML trees)."""
+
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+from typing import Any, Callable, Hashable
+
+# mirrors `functools.lru_cache().cache_info()`
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+def source_hash(code: str) -> str:
+  """Return a hash of the source code to use as a cache key.
+
+  Parameters
+  ----------
+  code : str
+      source code text
+
+  Returns
+  -------
+  str
+      a hex digest of the source code
+  """
+  return hashlib.blake2b(
+    code.encode("utf-8", "surrogatepass"), digest_size=16
+  ).hexdigest()
+
+class SourceCache:
+  """A bounded LRU cache keyed by a hash of the source code.
+
+  The `build` function is only called on a cache miss, so objects built from
+  the same source are shared by every caller. Callers should therefore treat
+  the cached objects as read-only.
+
+  Parameters
+  ----------
+  build : Callable[[str], Any]
+      function that builds the object for a source code string
+  maxsize : int, optional
+      the maximum number of entries to keep, by default 128
+  key : Callable[[Any], Hashable], optional
+      function that returns the cache key of the argument of `build`, by
+      default `source_hash`
+  """
+
+  def __init__(
+    self,
+    build: Callable[[str], Any],
+    maxsize: int = 128,
+    key: Callable[[Any], Hashable] = source_hash
+  ) -> None:
+    self.build = build
+    self.maxsize = maxsize
+    self.key = key
+    self.hits = 0
+    self.misses = 0
+    self._entries: OrderedDict[str, Any] = OrderedDict()
+    self._lock = threading.Lock()
+
+  def get(self, code: str) -> Any:
+    """Return the cached object for `code`, building it on a cache miss."""
+    key = self.key(code)
+    with self._lock:
+      if key in self._entries:
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return self._entries[key]
+      self.misses += 1
+
+    # build outside of the lock, errors (e.g. SyntaxError) are not cached
+    value = self.build(code)
+
+    with self._lock:
+      if self.maxsize > 0:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+          self._entries.popitem(last=False)
+    return value
+
+  def info(self) -> CacheInfo:
+    """Return the hit/miss counters and the current size of the cache."""
+    with self._lock:
+      return CacheInfo(self.hits, self.misses, self.maxsize, len(self._entries))
+
+  def clear(self) -> None:
+    """Remove all entries and reset the hit/miss counters."""
+    with self._lock:
+      self._entries.clear()
+      self.hits = 0
+      self.misses = 0
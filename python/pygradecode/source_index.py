@@ -0,0 +1,100 @@
+"""An index of the lines of a source code text, to slice it by AST locations."""
+
+from bisect import bisect_right
+
+from .source_cache import SourceCache, CacheInfo
+
+class SourceIndex:
+  """The line offsets of a source code text, built once per source.
+
+  The lines are split like `str.splitlines()` and joined back with "\\n" in
+  `text`, so slicing returns the same text as joining the split lines did.
+  AST column offsets are UTF-8 byte offsets, so they are mapped to character
+  offsets for lines that are not ASCII.
+
+  Parameters
+  ----------
+  code : str
+      the source code text
+  """
+  __slots__ = ("lines", "text", "line_starts", "_column_maps")
+
+  def __init__(self, code: str) -> None:
+    self.lines = code.splitlines()
+    self.text = "\n".join(self.lines)
+    # the offset of the start of each line in `text`
+    self.line_starts = []
+    offset = 0
+    for line in self.lines:
+      self.line_starts.append(offset)
+      offset += len(line) + 1
+    # the byte offset of each character, for lines that are not ASCII
+    self._column_maps = {}
+
+  def __len__(self) -> int:
+    return len(self.lines)
+
+  def line(self, lineno: int) -> str:
+    """Return a line by its (1-based) line number."""
+    return self.lines[lineno - 1]
+
+  def char_col(self, lineno: int, col: int) -> int:
+    """Return the character offset of a UTF-8 column offset in a line."""
+    line = self.lines[lineno - 1]
+    if line.isascii():
+      return col
+    byte_offsets = self._column_maps.get(lineno)
+    if byte_offsets is None:
+      byte_offsets = self._column_maps[lineno] = []
+      offset = 0
+      for char in line:
+        byte_offsets.append(offset)
+        offset += len(char.encode("utf-8", "surrogatepass"))
+    # the number of characters that start before the column
+    return bisect_right(byte_offsets, col - 1)
+
+  def offset(self, lineno: int, col: int) -> int:
+    """Return the offset in `text` of a (line number, UTF-8 column) location."""
+    return self.line_starts[lineno - 1] + self.char_col(lineno, col)
+
+  def slice(self, lineno: int, col: int, end_lineno: int, end_col: int) -> str:
+    """Return the text between two (line number, UTF-8 column) locations."""
+    return self.text[self.offset(lineno, col):self.offset(end_lineno, end_col)]
+
+  def lines_text(self, start_lineno: int, end_lineno: int) -> str:
+    """Return the lines from `start_lineno` to `end_lineno` (inclusive).
+
+    This is the same as `"\\n".join(lines[start_lineno - 1:end_lineno])`.
+    """
+    start = max(start_lineno, 1)
+    end = min(end_lineno, len(self.lines))
+    if start > end:
+      return ""
+    end_offset = self.line_starts[end - 1] + len(self.lines[end - 1])
+    return self.text[self.line_starts[start - 1]:end_offset]
+
+  def text_before(self, lineno: int) -> str:
+    """Return the lines before a line, like `"\\n".join(lines[:lineno - 1])`."""
+    return self.lines_text(1, lineno - 1)
+
+  def text_after(self, lineno: int) -> str:
+    """Return the lines after a line, like `"\\n".join(lines[lineno:])`."""
+    return self.lines_text(lineno + 1, len(self.lines))
+
+# Source index cache ----
+
+# the source indexes shared by GradeCodeFound and the source extraction and
+# highlighting functions
+SOURCE_INDEX_CACHE = SourceCache(SourceIndex)
+
+def cached_source_index(code: str) -> SourceIndex:
+  """Return the SourceIndex of a source code text, building it only once."""
+  return SOURCE_INDEX_CACHE.get(code)
+
+def source_index_cache_info() -> CacheInfo:
+  """Return the hits, misses, maxsize and current size of the source index cache."""
+  return SOURCE_INDEX_CACHE.info()
+
+def source_index_cache_clear() -> None:
+  """Clear the source index cache and reset its counters."""
+  SOURCE_INDEX_CACHE.clear()
@@ -1,4 +1,10 @@
-from pygradecode.ast_to_xml import xml
+from textwrap import dedent
+from lxml import etree as ET
+
+from pygradecode.ast_to_xml import (
+  xml, cached_xml, xml_cache_info, xml_cache_clear, INDEXED_TAGS
+)
+from pygradecode.source_cache import SourceCache
 from lxml.etree import _Element as Element
 
 def test_xml():
@@ -6,3 +12,71 @@ def test_xml():
   xml_tree = xml(code)
   assert isinstance(xml_tree, Element)
 
+
+def test_cached_xml():
+  xml_cache_clear()
+  code = "sum([1, 2, 3])"
+
+  first = cached_xml(code)
+  second = cached_xml(code)
+
+  # the tree is only parsed once and shared
+  assert first is second
+  info = xml_cache_info()
+  assert info.hits == 1
+  assert info.misses == 1
+  assert info.currsize == 1
+
+  xml_cache_clear()
+  info = xml_cache_info()
+  assert info.hits == 0 and info.misses == 0 and info.currsize == 0
+  assert cached_xml(code) is not first
+
+def test_source_cache_is_bounded():
+  cache = SourceCache(xml, maxsize=2)
+  a = cache.get("a")
+  cache.get("b")
+  # touch "a" so that "b" is the least recently used
+  assert cache.get("a") is a
+  cache.get("c")
+
+  assert cache.info().currsize == 2
+  assert cache.get("a") is a
+  assert cache.info().misses == 3
+
+def test_builders_make_the_same_tree():
+  code = dedent(r"""
+    import pandas as pd
+    df = pd.DataFrame({'a': [1, 2, 3]})
+    x: int = -1 + 2 * 3 // 4
+    add_two = lambda x: x + 2
+    print("", " ", "a\r\nb\t<&>", b"\x00", sep=", ", end=foo(x = ["\n"]))
+    def foo(a, *args, b=None, **kwargs):
+      global c
+      return [i for i in args if i is not None]
+    (df
+      .loc[df['a'] > 1]
+      .assign(b = lambda df_: df_['a'] * 2)
+    )
+  """)
+
+  recursive = xml(code, builder="recursive")
+  for builder in ["native", "elements"]:
+    xml_tree = xml(code, builder=builder)
+    assert ET.tostring(xml_tree) == ET.tostring(recursive)
+    assert [e.text for e in xml_tree.iter()] == [e.text for e in recursive.iter()]
+
+  # the index holds the same Elements as a query on the whole tree
+  for builder in ["native", "elements", "recursive"]:
+    xml_tree, index = xml(code, builder=builder, index=True)
+    assert set(index) == set(INDEXED_TAGS)
+    for tag in INDEXED_TAGS:
+      assert index[tag] == xml_tree.xpath(f"//{tag}")
+
+def test_native_builder_deep_nesting():
+  # deep enough to hit the recursion limit of the recursive builder
+  # and the maximum depth of documents parsed by libxml2
+  code = "+".join(["1"] * 1500)
+  xml_tree, index = xml(code, builder="native", index=True)
+  assert len(xml_tree.xpath("//BinOp")) == 1499
+  assert len(index['op']) == 1499
@@ -4,7 +4,7 @@ from lxml.etree import _Element as Element
 from pygradecode.grade_code_found import QueryResult
 from pygradecode.find_functions import find_functions
 from pygradecode.find_arguments import (
-  find_arguments, args, Arg, KWArg
+  find_arguments, args, Arg, KWArg, extract_arguments, get_matched_arguments
 )
 from pygradecode.grade_code_found import GradeCodeFound
 
@@ -130,3 +130,50 @@ def test_find_arguments_match_keyword_constant():
   assert len(last_result) == 1
   assert isinstance(last_result[0], Element)
   assert last_result[0].tag == 'Constant'
+
+def test_find_arguments_list_of_matches():
+  code = 'sum([1, round(2.5), 3])\nprint("Hello", "World!", 2.5, sep=", ")'
+  matches = [args(), args('2.5'), args(sep='", "'), args('"Bye"')]
+  found = find_arguments(code, match=matches)
+
+  assert isinstance(found, list) and len(found) == len(matches)
+  for arg_list, found_one in zip(matches, found):
+    expected = find_arguments(code, match=arg_list).last_result
+    assert [e.tag for e in found_one.last_result] == [e.tag for e in expected]
+  assert [len(f.last_result) for f in found] == [6, 2, 1, 0]
+
+def test_find_arguments_edge_whitespace():
+  # a string argument matches whatever whitespace is at its edges, like when
+  # every pair of arguments was compared
+  code = 'f("\\r1")\ng("1\\u00a0")\nh("1")\nk("1\\r2")'
+  assert len(find_arguments(code, match=args('"1"')).last_result) == 3
+
+def test_get_matched_arguments_order():
+  code = 'f(1, "a", x=1)\ng("a", 1, y=1)\nh(1, x=1, y="a")'
+  gcf = GradeCodeFound(code)
+  all_code_args = extract_arguments(code, gcf.index['Call'])
+  match_args = args('"a"', '1', x='1').args
+
+  results = get_matched_arguments(match_args, all_code_args)
+  # results follow the order of the match arguments, then of the code
+  assert [(e.get('lineno'), e.get('col_offset')) for e in results[:5]] == [
+    ('1', '5'), ('2', '2'), ('1', '2'), ('2', '7'), ('3', '2')
+  ]
+  kwargs = [a for a in all_code_args if isinstance(a, KWArg)]
+  assert [k.name for k in kwargs if any(k.value_xml_node is e for e in results)] == ['x', 'x']
+  assert len(results) == 7
+
+def test_extract_arguments_reuses_document_nodes():
+  code = 'sorted(x, key=lambda v: v + 1, reverse=True)\nprint("a b", sep=", ")'
+  gcf = GradeCodeFound(code)
+  all_code_args = extract_arguments(code, gcf.index['Call'])
+
+  # the argument nodes are the subtrees of the calls, not copies
+  for argument in all_code_args:
+    node = argument.value_xml_node if isinstance(argument, KWArg) else argument.xml_node
+    assert node.getroottree().getroot() is gcf.tree
+
+  # spaces in the match are kept, so lambdas and strings with spaces match
+  assert len(find_arguments(code, args(key='lambda v: v + 1')).last_result) == 1
+  assert len(find_arguments(code, args('"a b"')).last_result) == 1
+  assert len(find_arguments(code, args('"ab"')).last_result) == 0
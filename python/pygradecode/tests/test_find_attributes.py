@@ -111,6 +111,13 @@ def test_find_properties_match():
   assert len(results) == 1
   assert results[0].tag == 'Expr'
 
+def test_find_properties_match_with_quotes():
+  # quotes in the match are compared as text, not parsed as part of the query
+  code = "df.shape\ndf.size"
+  for match in ["sha'pe", 'sha"pe', "shape'] | //*[name()='Expr"]:
+    assert len(find_properties(code, match).last_result) == 0
+    assert len(find_properties(find_attributes(code), match).last_result) == 0
+
 def test_uses_properties():
   props = dedent(
     """
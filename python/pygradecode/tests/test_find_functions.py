@@ -1,10 +1,14 @@
+import doctest
+import pytest
 from lxml.etree import _Element as Element
 
+from pygradecode.ast_query import ASTNode
 from pygradecode.find_functions import (
   find_functions, uses_function, 
   find_lambdas, uses_lambda
 )
-from pygradecode.grade_code_found import GradeCodeFound
+from pygradecode.find_utils import uses_any, uses_all
+from pygradecode.grade_code_found import GradeCodeFound, get_node_source
 
 def test_find_functions_simple():
   # function calls that are not nested
@@ -82,3 +86,95 @@ def test_uses_lambda():
 
   code = 'add_two = lambda x: x + 2'
   assert uses_lambda(code) is True
+
+def test_ast_backend_matches_xml_backend():
+  code = 'df.groupby("a").agg(sum).sum()\nprint(sum([1, round(2.5)]), f(lambda x: x))'
+
+  def locations(found):
+    return [(e.tag, dict(e.attrib)) for e in found.last_result]
+
+  for match in ['', 'sum', 'print', 'round', 'agg', 'len']:
+    xml_found = find_functions(code, match)
+    ast_found = find_functions(code, match, backend="ast")
+    assert locations(ast_found) == locations(xml_found)
+
+    # chained queries search within the previous results
+    assert (
+      locations(find_functions(ast_found, 'sum', backend="ast")) ==
+      locations(find_functions(xml_found, 'sum'))
+    )
+    assert (
+      locations(find_lambdas(ast_found, backend="ast")) ==
+      locations(find_lambdas(xml_found))
+    )
+
+  # the results are ASTNodes that can be shown like XML Elements
+  found = find_functions(code, 'round', backend="ast")
+  assert all(isinstance(e, ASTNode) for e in found.last_result)
+  assert get_node_source(code, found.last_result[0]) == 'round(2.5)'
+
+  # the XML backend can chain on the results of the AST backend
+  found = find_functions(find_functions(code, 'print', backend="ast"), 'round')
+  assert [e.tag for e in found.last_result] == ['Call']
+
+def test_unknown_backend():
+  with pytest.raises(ValueError):
+    find_functions('sum([1])', backend="sql")
+
+def test_find_functions_index_matches_xpath():
+  code = 'sum(sum([1]))\nobj.sum.sum()\nprint(a.b(d.sum()), sum)'
+  found = find_functions(code, 'sum')
+  xml_tree = found.tree
+
+  query = './/Call//func/Name/id[.="sum"]|descendant-or-self::Call[.//attr[text()="sum"]]'
+  expected = [e if e.tag == 'Call' else e.getparent().getparent().getparent() for e in xml_tree.xpath(query)]
+  assert found.last_result == expected
+  assert find_functions(code).last_result == xml_tree.xpath('//Call')
+
+def test_find_functions_match_with_quotes():
+  # quotes in the match are compared as text, not parsed as part of the query
+  code = 'print(sum([1, 2]))\nx.sum()'
+  for match in ['su"m', "su'm", 'sum"] | //*[name()="Call']:
+    found = find_functions(code, match)
+    assert len(found.last_result) == 0
+    assert len(find_functions(find_functions(code, 'print'), match).last_result) == 0
+
+def test_find_functions_list_of_matches():
+  code = 'df.groupby("a").agg(sum).sum()\nprint(sum([1, round(2.5)]), f(lambda x: x))'
+  matches = ['sum', 'print', '', 'len', 'agg']
+
+  for backend in ["xml", "ast"]:
+    found = find_functions(code, matches, backend=backend)
+    assert isinstance(found, list) and len(found) == len(matches)
+    for match, found_one in zip(matches, found):
+      assert found_one.get_last_state().request == match
+      assert found_one.last_result == find_functions(code, match, backend=backend).last_result
+
+    # chained on previous results
+    previous = find_functions(code, 'print', backend=backend)
+    found = find_functions(previous, matches, backend=backend)
+    for match, found_one in zip(matches, found):
+      assert found_one.last_result == find_functions(previous, match, backend=backend).last_result
+
+def test_uses_any_and_all():
+  code = 'sum([1, round(2.5), 3])'
+  assert uses_any(find_functions, code, ['len', 'round']) is True
+  assert uses_any(find_functions, code, ['len', 'print']) is False
+  assert uses_all(find_functions, code, ['sum', 'round']) is True
+  assert uses_all(find_functions, code, ['sum', 'len'], backend="ast") is False
+
+  # the matches are looked up with a single query
+  queries = []
+  def counting_find_functions(code, match, **kwargs):
+    queries.append(match)
+    return find_functions(code, match, **kwargs)
+  for backend in ["xml", "ast"]:
+    queries.clear()
+    assert uses_any(counting_find_functions, code, ('len', 'round', 'print'), backend=backend) is True
+    assert uses_all(counting_find_functions, code, ['sum', 'round'], backend=backend) is True
+    assert uses_all(counting_find_functions, code, ['len', 'sum'], backend=backend) is False
+    assert queries == [['len', 'round', 'print'], ['sum', 'round'], ['len', 'sum']]
+
+  # the examples of the docstrings run as written
+  from pygradecode import find_utils
+  assert doctest.testmod(find_utils).failed == 0
@@ -0,0 +1,29 @@
+from pygradecode.find_operators import find_operators
+from pygradecode.find_utils import uses_any, uses_all
+
+def test_find_operators():
+  code = "x = -1 + 2 * 3 // 4 and not y"
+
+  assert [e.tag for e in find_operators(code).last_result] == ['And', 'USub', 'Add', 'Mult', 'FloorDiv', 'Not']
+  assert [e.tag for e in find_operators(code, '-').last_result] == ['USub']
+  assert [e.tag for e in find_operators(code, '//').last_result] == ['FloorDiv']
+
+def test_find_operators_list_of_matches():
+  code = "x = -1 + 2 * 3 // 4 and not y\nx += 1"
+  matches = ['+', '-', '', '**']
+
+  for backend in ["xml", "ast"]:
+    found = find_operators(code, matches, backend=backend)
+    assert isinstance(found, list) and len(found) == len(matches)
+    for match, found_one in zip(matches, found):
+      expected = find_operators(code, match, backend=backend).last_result
+      assert [e.tag for e in found_one.last_result] == [e.tag for e in expected]
+    assert [len(f.last_result) for f in found] == [2, 1, 7, 0]
+
+def test_uses_any_and_all_operators():
+  code = "x = -1 + 2 * 3 // 4 and not y"
+  for backend in ["xml", "ast"]:
+    assert uses_any(find_operators, code, ['**', '//'], backend=backend) is True
+    assert uses_any(find_operators, code, ['**', '%'], backend=backend) is False
+    assert uses_all(find_operators, code, ['+', '-', 'not'], backend=backend) is True
+    assert uses_all(find_operators, code, ['+', '**'], backend=backend) is False
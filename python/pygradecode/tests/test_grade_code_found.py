@@ -0,0 +1,50 @@
+from rich.console import Console
+
+from pygradecode.grade_code_found import GradeCodeFound, QueryResult, print_grouped
+from pygradecode.find_functions import find_functions, find_lambdas
+from pygradecode.find_arguments import find_arguments, args
+
+def test_push_returns_new_object():
+  found = GradeCodeFound("sum([1, 2])")
+  pushed = found.push(request_type='functions', request='sum', result=[])
+
+  assert pushed is not found
+  assert found.results == ()
+  assert pushed.results == (QueryResult('functions', 'sum', []),)
+
+def test_chained_queries_share_results_and_tree():
+  code = 'print(sum([1, 2]), 2.5, sep=", ")\nf = lambda x: x + 2'
+  found_print = find_functions(code, match='print')
+  found_sum = find_functions(found_print, match='sum')
+  found_args = find_arguments(found_print, match=args('2.5'))
+  found_lambdas = find_lambdas(found_args)
+
+  # earlier objects are left untouched
+  assert len(found_print.results) == 1
+  assert len(found_sum.results) == 2
+  assert len(found_args.results) == 2
+  assert len(found_lambdas.results) == 3
+
+  # previous results and the XML tree are shared, not copied
+  assert found_sum.results[0] is found_print.results[0]
+  assert found_lambdas.results[1] is found_args.results[1]
+  assert found_lambdas.tree is found_print.tree
+
+def test_print_grouped():
+  code = 'x = print(1) + print(print(2))\ny = [1]\nz = f(print(3),\n  print(4))'
+  found = find_functions(code, match='print')
+
+  console = Console(record=True, width=200)
+  print_grouped(found, page_size=2, console=console)
+  output = console.export_text()
+  # the results are grouped by line, and only the lines with results are printed
+  assert "Found 5 results." in output
+  assert output.count("── Page") == 2
+  assert "1 │ x = print(1) + print(print(2))" in output
+  assert "y = [1]" not in output
+
+  console = Console(record=True, width=200)
+  print_grouped(found, max_results=2, console=console)
+  output = console.export_text()
+  assert "Found 5 results. Showing the first 2." in output
+  assert "3 │" not in output
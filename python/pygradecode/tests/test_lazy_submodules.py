@@ -0,0 +1,20 @@
+import subprocess
+import sys
+
+def test_lazy_imports():
+  statement = "import pygradecode; import sys; print(' '.join(sys.modules))"
+  output = subprocess.run(
+    [sys.executable, "-c", statement], capture_output=True, text=True, check=True
+  ).stdout
+  assert not {"lxml", "rich"} & {name.partition(".")[0] for name in output.split()}
+
+  import pygradecode
+  assert pygradecode.find_functions.find_functions("sum(1)", match="sum").last_result
+
+  # every public submodule is served, e.g. `pygradecode$xml_utils$literal` in R
+  statement = "import pygradecode; print(pygradecode.xml_utils.literal('1').source)"
+  output = subprocess.run(
+    [sys.executable, "-c", statement], capture_output=True, text=True, check=True
+  ).stdout
+  assert output.strip() == "1"
+  assert set(pygradecode.SUBMODULES) <= set(dir(pygradecode))
@@ -0,0 +1,48 @@
+from pygradecode.ast_to_xml import xml
+from pygradecode.grade_code_found import GradeCodeFound, get_node_source
+from pygradecode.highlight_text import format_text, format_line, highlight_intervals
+from pygradecode.source_index import SourceIndex
+
+def test_source_index_lines():
+  code = 'a = 1\r\nb = [2,\n  3]\n\nc = 4\n'
+  lines = code.splitlines()
+  index = SourceIndex(code)
+
+  assert len(index) == len(lines)
+  assert index.text == "\n".join(lines)
+  for start in range(0, len(lines) + 2):
+    for end in range(0, len(lines) + 2):
+      assert index.lines_text(start, end) == "\n".join(lines[max(start - 1, 0):end])
+    assert index.text_before(start) == "\n".join(lines[:max(start - 1, 0)])
+    assert index.text_after(start) == "\n".join(lines[start:])
+
+def test_source_index_utf8_columns():
+  code = 's = "λx" + f("мир", x)\ny = f(a,\n      b)'
+  index = SourceIndex(code)
+  tree = xml(code)
+
+  # the AST column offsets are in UTF-8 bytes
+  assert [get_node_source(code, n) for n in tree.iter('Call')] == [
+    'f("мир", x)'.encode('raw_unicode_escape').decode(), 'f(a,\n      b)'
+  ]
+  call = tree.find('.//Call')
+  assert format_text(code, call, index).text.splitlines()[1] == \
+    's = "λx" + [u bold]f("мир", x)[/u bold]'
+
+def test_get_node_source_with_gcf():
+  code = 'print("Hello", sep=", ")'
+  gcf = GradeCodeFound(code)
+  constant = gcf.tree.find('.//Constant')
+
+  assert get_node_source(gcf, constant) == get_node_source(code, constant) == '"Hello"'
+  assert gcf.push('functions', 'print', []).source_index is gcf.source_index
+  assert get_node_source(code, None) == ''
+
+def test_highlight_intervals_merges_results():
+  code = 'x = print(1) + print(print(2))\nz = f(print(3),\n  print(4))'
+  tree = xml(code)
+  intervals = highlight_intervals(tree.iter('Call', 'Add'), SourceIndex(code))
+
+  # the nested calls and the operator are merged into one interval
+  assert intervals == {1: [(4, 30)], 2: [(4, 15)], 3: [(2, 11)]}
+  assert format_line('a[x] = b', [(0, 4)]) == '[u bold]a\\[x][/u bold] = b'
@@ -0,0 +1,46 @@
+from lxml import etree as ET
+
+from pygradecode.ast_to_xml import xml
+from pygradecode.xml_utils import compare_xml_nodes, xml_fingerprint
+
+def call_arguments(code: str) -> list:
+  return xml(code).xpath('//Call/args/*')
+
+def test_compare_xml_nodes():
+  first = call_arguments('f([1, 2], "a  b", x.y, lambda q: q + 1)')
+  second = call_arguments('g(\n  [1, 2],\n  "a b",\n  x.y,\n  lambda q: q + 1\n)')
+  different = call_arguments('h([1, 3], "ab", x.z, lambda r: r + 1)')
+
+  # the same code at different locations matches
+  for a, b in zip(first, second):
+    assert compare_xml_nodes(a, b)
+  for a, b in zip(first, different):
+    assert not compare_xml_nodes(a, b)
+  assert not compare_xml_nodes(first[0], None)
+
+def test_compare_xml_nodes_does_not_modify_nodes():
+  node = call_arguments('f(x.y)')[0]
+  before = ET.tostring(node)
+  compare_xml_nodes(node, call_arguments('g(x.y)')[0])
+  assert ET.tostring(node) == before
+
+def test_xml_fingerprint():
+  nodes = call_arguments(
+    'f([1, 2], "a b", x.y, 1.0, [1, 2], "a  b", x.y, 1, [2, 1], x.y())'
+  )
+  for a in nodes:
+    for b in nodes:
+      same_fingerprint = xml_fingerprint(a) == xml_fingerprint(b)
+      assert same_fingerprint == compare_xml_nodes(a, b)
+
+def test_xml_fingerprint_strips_like_compare_xml_nodes():
+  # the text of an Element is compared without any whitespace at its edges,
+  # not only spaces, tabs and newlines
+  nodes = call_arguments(
+    'f("1", "\\r1", "1\\r", "\\u00a01", "1\\u3000", " \\r\\t1\\u2028", "1\\r2", "1 2")'
+  )
+  for a in nodes:
+    for b in nodes:
+      same_fingerprint = xml_fingerprint(a) == xml_fingerprint(b)
+      assert same_fingerprint == compare_xml_nodes(a, b)
+  assert len({xml_fingerprint(n) for n in nodes}) == 3
@@ -1,12 +1,13 @@
-from copy import copy
+import hashlib
+import re
 from dataclasses import dataclass
 from typing import Any
 
 from lxml import etree as ET
 from lxml.etree import _Element as Element
-from lxml.doctestcompare import LXMLOutputChecker
 
-from .ast_to_xml import xml
+from .ast_to_xml import ATTRS, xml
+from .xpath_queries import EXPRESSION_VALUE
 
 # low-level functions ----
 
@@ -65,7 +66,7 @@ def expr_xml_node(arg_code: str) -> Element:
   if isinstance(arg_code, literal):
     arg_code = f"'{arg_code.source}'"
   else:
-    arg_code = arg_code.replace(" ", "").encode('raw_unicode_escape').decode()
+    arg_code = arg_code.strip().encode('raw_unicode_escape').decode()
 
   try:
     xml_tree = xml(arg_code)
@@ -74,33 +75,121 @@ def expr_xml_node(arg_code: str) -> Element:
       f"The matching argument value for `py_args()` is not a valid Python expression string"
     )
   
-  nodes = xml_tree.xpath('.//Expr/value/*[1]')
+  nodes = EXPRESSION_VALUE(xml_tree)
   
   return nodes.pop() if len(nodes) > 0 else None
 
-def compare_xml_nodes(n1: Any, n2: Any):
+# runs of whitespace are compared as a single space, like `LXMLOutputChecker`
+WHITESPACE = re.compile(r'[ \t\n][ \t\n]+')
+
+def node_attrs(n: Element) -> list[tuple[str, str]]:
+  """Return the attributes of an XML Element other than its location."""
+  if not n.attrib:
+    return []
+  return sorted((k, v) for k, v in n.attrib.items() if k not in ATTRS)
+
+def node_text(n: Element) -> str:
+  """Return the text of an XML Element with its whitespace normalized."""
+  return WHITESPACE.sub(' ', n.text or '').strip()
+
+def compare_xml_nodes(n1: Any, n2: Any) -> bool:
+  """Compare two XML subtrees structurally, ignoring location attributes.
+
+  The subtrees match if their Elements have the same tags, the same
+  attributes other than the location ones, the same text (with whitespace
+  normalized) and the same children in the same order. Neither subtree is
+  copied or modified.
+
+  Parameters
+  ----------
+  n1 : Any
+      an XML Element or None
+  n2 : Any
+      an XML Element or None
+
+  Returns
+  -------
+  bool
+      True if the subtrees match, False otherwise
+  """
   if n1 is None or n2 is None:
     return False
-  
-  # use the builtin LXMLOutputChecker
-  # Note: we could in the future make an `xml_checker` param
-  # to swap in any checker that has a `.compare_docs()` method
-  xml_checker = LXMLOutputChecker()
 
-  try:
-    # strip locations on both and compare the two elements/docs
-    n1 = copy(n1)
-    n2 = copy(n2)
+  # pairs of Elements left to compare
+  stack = [(n1, n2)]
+  while stack:
+    a, b = stack.pop()
+    if (
+      a.tag != b.tag or
+      len(a) != len(b) or
+      node_text(a) != node_text(b) or
+      node_attrs(a) != node_attrs(b)
+    ):
+      return False
+    stack.extend(zip(a, b))
+
+  return True
+
+# the location attributes of serialized XML
+LOCATION_ATTRS = re.compile(r' (?:lineno|col_offset|end_lineno|end_col_offset)="[^"]*"')
+# whitespace at the start or the end of the text of an Element in serialized
+# XML (the `<` and `>` of text content are escaped), the characters that
+# `str.strip()` removes in `node_text()`: any Unicode whitespace, and the `\r`
+# that the serializer writes as a character reference
+TEXT_EDGES = re.compile(r'(?<=>)(?:\s|&#13;)+|(?:\s|&#13;)+(?=<)')
+# an Element with an empty text, written like one without text
+EMPTY_ELEMENT = re.compile(r'<([^\s>/]+)([^>]*)></\1>')
+
+def canonical_xml(node: Element) -> str:
+  """Return the serialized XML of a subtree without its location attributes.
+
+  The text of each Element has its whitespace normalized like in
+  `compare_xml_nodes()`. The work is done by the lxml serializer and regular
+  expressions, instead of visiting each Element from Python.
 
-    result = xml_checker.compare_docs(
-      xml_strip_location(n1),
-      xml_strip_location(n2)
-    )
-    return result
-  except Exception:
-    pass
-  
-  return False
+  Parameters
+  ----------
+  node : Element
+      the root of the subtree
+
+  Returns
+  -------
+  str
+      the canonical XML text
+  """
+  text = LOCATION_ATTRS.sub('', ET.tostring(node, encoding="unicode", with_tail=False))
+  # most subtrees have none of these, so check before running the slower regexes
+  # (the other ASCII whitespace characters can't be in XML)
+  if (
+    "\t" in text or "\n" in text or "  " in text or "> " in text or " <" in text or
+    "&#13;" in text or not text.isascii()
+  ):
+    text = TEXT_EDGES.sub('', WHITESPACE.sub(' ', text))
+  # only the text of the scalar Elements (with a `type` attribute) can be empty
+  if '"></' in text:
+    text = EMPTY_ELEMENT.sub(r'<\1\2/>', text)
+  return text
+
+def xml_fingerprint(node: Element) -> str:
+  """Return a canonical fingerprint of an XML subtree, ignoring location attributes.
+
+  Subtrees made by `ast_to_xml` that match with `compare_xml_nodes()` have
+  the same fingerprint, so matching subtrees can be found with a hash lookup
+  instead of comparing every pair.
+
+  Parameters
+  ----------
+  node : Element
+      the root of the subtree
+
+  Returns
+  -------
+  str
+      a hex digest of the subtree
+  """
+  return hashlib.blake2b(
+    canonical_xml(node).encode("utf-8", "surrogatepass"), digest_size=16
+  ).hexdigest()
 
 # XML Print methods ----
 
@@ -0,0 +1,83 @@
+"""Precompiled XPath queries shared by the find_*() functions.
+
+The queries are compiled once when the module is imported. Values such as a
+property name are passed as XPath variables (e.g. `$name`) instead of being
+formatted into the query text, so a match string with quotes in it is
+compared as a string instead of changing the query.
+"""
+
+from lxml import etree as ET
+from lxml.etree import _Element as Element
+
+# find_functions() ----
+
+# all the function calls within a node
+CALLS = ET.XPath('.//Call|descendant-or-self::Call[.//attr]')
+
+# a node and the attributes within it
+ATTRIBUTES_WITHIN = ET.XPath('descendant-or-self::Attribute')
+
+# find_lambdas() ----
+
+LAMBDAS = ET.XPath('.//Lambda')
+
+# find_arguments() ----
+
+# a node and the calls within it
+CALLS_WITHIN = ET.XPath('descendant-or-self::Call')
+
+# the arguments of a <Call>
+ARGUMENTS = ET.XPath('./args/*|./keywords/*')
+POSITIONAL_ARGUMENTS = ET.XPath('./args/*')
+KEYWORD_ARGUMENTS = ET.XPath('./keywords/*')
+
+# the name and the value of a <keyword>
+KEYWORD_NAME = ET.XPath('./arg')
+KEYWORD_VALUE = ET.XPath('./value/*')
+
+# find_attributes() ----
+
+ATTRIBUTES = ET.XPath('.//Attribute')
+
+# the first <Attribute> within a node
+FIRST_ATTRIBUTE = ET.XPath('(.//Attribute)[1]')
+
+# the grandparent of a node (to go above <value> or <func>)
+GRANDPARENT = ET.XPath('../..')
+
+# the expressions that access a property
+PROPERTIES = ET.XPath('.//Expr/*/Attribute/../..')
+
+# the expressions that access property `$name`
+PROPERTIES_NAMED = ET.XPath('descendant-or-self::Expr[.//attr[text()=$name]]')
+
+# xml_utils ----
+
+# the node of the first expression of a parsed snippet
+EXPRESSION_VALUE = ET.XPath('.//Expr/value/*[1]')
+
+def as_element(node) -> Element:
+  """Return a node as an XML Element, using the XML tree of an ASTNode's subtree."""
+  if not isinstance(node, Element):
+    node = node.to_xml()
+  return node
+
+def evaluate(query: ET.XPath, node, **variables) -> list:
+  """Run a precompiled query on a node.
+
+  Parameters
+  ----------
+  query : ET.XPath
+      one of the queries of this module
+  node : Element | ASTNode
+      an XML Element, or a result of the AST backend which is queried
+      through the XML tree of its subtree
+  **variables
+      the values of the XPath variables of the query (e.g. `name="sum"`)
+
+  Returns
+  -------
+  list
+      the query results
+  """
+  return query(as_element(node), **variables)
@@ -1,13 +1,31 @@
-from pygradethis import check_functions
-from pygradethis import conditions
-from pygradethis import feedback
-from pygradethis import formatters
-from pygradethis import grade_code
-from pygradethis import grade_result
-from pygradethis import message_generators
-from pygradethis import pygradethis_exercise_checker
-from pygradethis import python_grader
-from pygradethis import result_checker
-from pygradethis import utils
-
-__version__ = "0.4.0"
\ No newline at end of file
+import importlib
+
+__version__ = "0.4.0"
+
+# the submodules are imported when they are first used (PEP 562), e.g. by
+# `pygradethis.grade_code` or `from pygradethis import grade_code`, so the
+# package imports quickly and only loads what a grading process uses
+SUBMODULES = (
+    "async_grader",
+    "check_functions",
+    "conditions",
+    "feedback",
+    "formatters",
+    "grade_code",
+    "grade_result",
+    "message_generators",
+    "pygradethis_exercise_checker",
+    "python_grader",
+    "result_checker",
+    "sandbox",
+    "signatures",
+    "utils",
+)
+
+def __getattr__(name: str):
+    if name in SUBMODULES:
+        return importlib.import_module("." + name, __name__)
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+def __dir__():
+    return sorted(set(globals()) | set(SUBMODULES))
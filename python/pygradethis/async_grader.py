@@ -0,0 +1,320 @@
+"""
+This module contains asynchronous versions of `grade_code`,
+`pygradethis_exercise_checker` and `grade`, for grading inside an asyncio
+application such as a web service. The grading runs in a bounded pool of
+worker processes, so it never blocks the event loop.
+"""
+import asyncio
+import os
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Union
+
+from .conditions import Graded
+from .grade_code import PreparedSolution, grade_code as sync_grade_code
+from .pygradethis_exercise_checker import (
+    pygradethis_exercise_checker as sync_exercise_checker
+)
+from .python_grader import GradingWorker, WorkerDied, grade as sync_grade, stopped_feedback
+
+# the default number of gradings that can be running or waiting in a grader
+MAX_PENDING = 100
+
+class GraderBusy(Exception):
+    """Raised when a grader already has as many pending gradings as it allows."""
+
+class AsyncGrader:
+    """A pool of worker processes to grade submissions from an event loop.
+
+    A grader has at most `max_pending` gradings running or waiting for a
+    worker; more raise GraderBusy right away (e.g. to answer "503 Service
+    Unavailable") instead of growing the queue. Each grading can take at most
+    `timeout` seconds in its worker before it raises `asyncio.TimeoutError`.
+    For a deadline that includes the time waiting for a worker, wrap the call
+    in `asyncio.wait_for()`.
+
+    A grader is used from one event loop at a time. When it is first used from
+    another loop (e.g. after a new `asyncio.run()`), the workers of the
+    previous loop are stopped, as if the grader was closed, and new ones are
+    started for the new loop.
+
+    The timeouts are enforced by the grader, not by the graded code: a worker
+    whose grading times out or is cancelled is killed and replaced, and so is
+    a worker that dies while grading (e.g. when the graded code calls
+    `os._exit()`), whose submission gets a warning as its feedback.
+
+    Parameters
+    ----------
+    workers : int, optional
+        the number of worker processes, by default the number of CPUs
+    max_pending : int, optional
+        the number of gradings that can be running or waiting, by default
+        MAX_PENDING
+    timeout : float, optional
+        the seconds a grading can run for in a worker, by default None (no
+        limit)
+    mp_context : optional
+        the multiprocessing context to start the workers with, by default the
+        platform's default
+    """
+
+    def __init__(self,
+                 workers: int = None,
+                 max_pending: int = MAX_PENDING,
+                 timeout: float = None,
+                 mp_context=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._mp_context = mp_context
+        # the workers that are started, the ones of them waiting for a grading,
+        # and the threads that wait for their outcomes
+        self._all_workers = set()
+        self._idle_workers = []
+        self._threads = None
+        # the event loop the grader is used from, and the semaphore of that
+        # loop that limits the gradings that are running to the number of workers
+        self._loop = None
+        self._slots = None
+        # changed when the grader is closed, to stop the gradings started before
+        self._generation = 0
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        """The number of gradings running or waiting for a worker."""
+        return self._pending
+
+    async def __aenter__(self) -> "AsyncGrader":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    def close(self) -> None:
+        """Stop the workers right away. The gradings that are running or
+        waiting for a worker raise `asyncio.CancelledError`."""
+        self._generation += 1
+        for worker in self._all_workers:
+            if worker in self._idle_workers:
+                worker.kill()
+            else:
+                # the thread waiting for its outcome closes it (see `_discard`)
+                worker.process.kill()
+        self._all_workers = set()
+        self._idle_workers = []
+        if self._threads is not None:
+            self._threads.shutdown(wait=False)
+            self._threads = None
+
+    async def aclose(self) -> None:
+        """Stop the workers, cancelling the gradings that haven't started, and
+        wait for the running ones without blocking the event loop."""
+        if self._slots is None:
+            return
+        if self._loop is not asyncio.get_running_loop():
+            # the gradings of another loop can't be waited for from this one
+            self.close()
+            return
+        self._generation += 1
+        acquired = 0
+        try:
+            for _ in range(self.workers):
+                await self._slots.acquire()
+                acquired += 1
+            self.close()
+        finally:
+            for _ in range(acquired):
+                self._slots.release()
+
+    def _discard(self, worker: GradingWorker, using: asyncio.Future) -> None:
+        """Kill a worker that is not reused, and close its connection once
+        the thread using it is done."""
+        self._all_workers.discard(worker)
+        worker.process.kill()
+
+        def close(using):
+            # the outcome of a killed worker is not used
+            using.exception()
+            worker.kill()
+        using.add_done_callback(close)
+
+    async def _receive(self, worker: GradingWorker, timeout: float = None) -> Any:
+        """Wait for the next outcome of a worker, in a thread, killing the
+        worker if it dies, or if the wait is cancelled or takes longer than
+        `timeout` seconds."""
+        receiving = asyncio.get_running_loop().run_in_executor(self._threads, worker.receive)
+        return await self._wait(worker, receiving, timeout)
+
+    async def _send(self, worker: GradingWorker, tasks: list) -> None:
+        """Send tasks to a worker, in a thread, killing the worker if the
+        sending is cancelled."""
+        sending = asyncio.get_running_loop().run_in_executor(self._threads, worker.send, tasks)
+        await self._wait(worker, sending)
+
+    async def _wait(self, worker: GradingWorker, future: asyncio.Future, timeout: float = None) -> Any:
+        """Wait for a future of a worker's thread, killing the worker if it
+        dies, or if the wait is cancelled or takes longer than `timeout`
+        seconds."""
+        try:
+            done, _ = await asyncio.wait([future], timeout=timeout)
+        except asyncio.CancelledError:
+            self._discard(worker, future)
+            raise
+        if not done:
+            self._discard(worker, future)
+            raise asyncio.TimeoutError(
+                "grading took longer than {} seconds".format(timeout)
+            )
+        if isinstance(future.exception(), WorkerDied):
+            self._discard(worker, future)
+        return future.result()
+
+    async def _worker(self, generation: int) -> GradingWorker:
+        """Return an idle worker, or start one in a thread and wait until it
+        is ready."""
+        while self._idle_workers:
+            worker = self._idle_workers.pop()
+            if worker.process.is_alive():
+                return worker
+            self._all_workers.discard(worker)
+            worker.kill()
+        starting = asyncio.get_running_loop().run_in_executor(
+            self._threads, partial(GradingWorker, mp_context=self._mp_context)
+        )
+        try:
+            worker = await asyncio.shield(starting)
+        except asyncio.CancelledError:
+            # the worker is still started, and nothing else will stop it
+            starting.add_done_callback(
+                lambda starting: starting.exception() is None and starting.result().kill()
+            )
+            raise
+        if self._generation != generation:
+            # the grader was closed while the worker started
+            worker.kill()
+            raise asyncio.CancelledError()
+        self._all_workers.add(worker)
+        await self._receive(worker)
+        return worker
+
+    async def run(self, func, *args, timeout: float = None, **kwargs) -> Any:
+        """Run a grading function in a worker and return its result.
+
+        Parameters
+        ----------
+        func : callable
+            a module level function, so it can be sent to a worker
+        timeout : float, optional
+            the seconds the function can run for, by default the grader's
+
+        Raises
+        ------
+        GraderBusy
+            if the grader already has `max_pending` pending gradings
+        asyncio.TimeoutError
+            if the function ran for more than `timeout` seconds
+        WorkerDied
+            if the worker died before the function returned
+        """
+        if self._pending >= self.max_pending:
+            raise GraderBusy(
+                "{} gradings are already pending, try again later".format(self._pending)
+            )
+        if timeout is None:
+            timeout = self.timeout
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # the workers and the semaphore of another loop can't be used here
+            self.close()
+            self._loop = loop
+            self._slots = asyncio.Semaphore(self.workers)
+        generation = self._generation
+        self._pending += 1
+        try:
+            async with self._slots:
+                if self._generation != generation:
+                    raise asyncio.CancelledError()
+                if self._threads is None:
+                    self._threads = ThreadPoolExecutor(self.workers)
+                worker = await self._worker(generation)
+                try:
+                    await self._send(worker, [(func, args, kwargs)])
+                    return await self._receive(worker, timeout)
+                finally:
+                    # a worker that wasn't killed can grade the next submission,
+                    # even if the function raised
+                    if worker in self._all_workers:
+                        self._idle_workers.append(worker)
+        except WorkerDied:
+            if self._generation != generation:
+                raise asyncio.CancelledError() from None
+            raise
+        finally:
+            self._pending -= 1
+
+    async def grade_code(self,
+                         student_code: str,
+                         solution_code: Union[str, PreparedSolution],
+                         timeout: float = None) -> Union[str, None]:
+        """Asynchronous `grade_code.grade_code` (the solution is prepared once
+        in each worker)."""
+        if isinstance(solution_code, PreparedSolution):
+            solution_code = solution_code.source
+        try:
+            return await self.run(sync_grade_code, student_code, solution_code, timeout=timeout)
+        except WorkerDied:
+            return stopped_feedback()["message"]
+
+    async def pygradethis_exercise_checker(self, timeout: float = None, **kwargs) -> dict:
+        """Asynchronous `pygradethis_exercise_checker`, with the same keyword
+        arguments."""
+        if isinstance(kwargs.get("solution_code"), PreparedSolution):
+            kwargs["solution_code"] = kwargs["solution_code"].source
+        try:
+            return await self.run(sync_exercise_checker, timeout=timeout, **kwargs)
+        except WorkerDied:
+            return stopped_feedback()
+
+    async def grade(self,
+                    *check_code: Graded,
+                    user_code: str = None,
+                    solution_code: str = None,
+                    timeout: float = None) -> dict:
+        """Asynchronous `python_grader.grade`."""
+        try:
+            return await self.run(
+                sync_grade, *check_code, user_code=user_code, solution_code=solution_code, timeout=timeout
+            )
+        except WorkerDied:
+            return stopped_feedback()
+
+# Default grader ----
+
+DEFAULT_GRADER = None
+
+def default_grader() -> AsyncGrader:
+    """Return the grader of the module level functions, started on first use."""
+    global DEFAULT_GRADER
+    if DEFAULT_GRADER is None:
+        DEFAULT_GRADER = AsyncGrader()
+    return DEFAULT_GRADER
+
+async def grade_code(student_code: str,
+                     solution_code: Union[str, PreparedSolution],
+                     timeout: float = None) -> Union[str, None]:
+    """Asynchronous `grade_code.grade_code`, run by the default grader."""
+    return await default_grader().grade_code(student_code, solution_code, timeout=timeout)
+
+async def pygradethis_exercise_checker(timeout: float = None, **kwargs) -> dict:
+    """Asynchronous `pygradethis_exercise_checker`, run by the default grader."""
+    return await default_grader().pygradethis_exercise_checker(timeout=timeout, **kwargs)
+
+async def grade(*check_code: Graded,
+                user_code: str = None,
+                solution_code: str = None,
+                timeout: float = None) -> dict:
+    """Asynchronous `python_grader.grade`, run by the default grader."""
+    return await default_grader().grade(
+        *check_code, user_code=user_code, solution_code=solution_code, timeout=timeout
+    )
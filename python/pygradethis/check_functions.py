@@ -5,6 +5,7 @@ and return standardized call.
 import ast
 import inspect
 import builtins
+import weakref
 from typing import Union
 # add any libraries you might need for grading
 # TODO we need a better way to include lib dependencies for running student code
@@ -14,12 +15,162 @@ from .message_generators import (
     missing_argument, unexpected_argument, surplus_argument
 )
 from .formatters import formatted
+from .signatures import ProgramBindings, program_bindings, static_signature
+
+class ProgramNamespace:
+    """The namespace of a program, to look up the functions that it calls.
+
+    The program is run the first time its namespace is needed, and only once,
+    however many calls are standardized with it. If running it raised an
+    exception, the same exception is raised each time the namespace is needed.
+    Calls to builtins, functions of imported modules and methods of known
+    classes are looked up in the signature registry instead, so they don't
+    need the program to be run, unless the program would fail in a way that
+    can be found without running it (e.g. a NameError).
+
+    A program that would only fail when it runs, for a reason unrelated to
+    the call (e.g. `x = 1 / 0`), is not run, so its known calls are checked
+    like in a program that doesn't fail. When such programs were run, the
+    checking failed and the feedback was "There was a problem checking user
+    or solution code".
+
+    Parameters
+    ----------
+    source : str
+        the program source code
+    """
+    __slots__ = ("source", "_envir", "_error", "_bindings")
+
+    def __init__(self, source: str = ""):
+        self.source = source
+        self._envir = None
+        self._error = None
+        self._bindings = None
+
+    @property
+    def envir(self) -> dict:
+        """The globals, builtins and names defined by the program."""
+        if self._error is not None:
+            raise self._error
+        if self._envir is None:
+            try:
+                self._envir = run_program(self.source)
+            except Exception as e:
+                self._error = e
+                raise
+        return self._envir
+
+    @property
+    def bindings(self) -> Union[ProgramBindings, None]:
+        """The names bound by the program, or None if it can't be parsed."""
+        if self._bindings is None:
+            try:
+                self._bindings = program_bindings(ast.parse(self.source))
+            except (SyntaxError, ValueError):
+                self._bindings = False
+        return self._bindings or None
+
+    def static_signature(self, func: ast.expr) -> inspect.Signature:
+        """Return the registered signature of a call's function, without
+        running the program (see `signatures.static_signature`).
+
+        Raises
+        ------
+        KeyError
+            if the function can't be known without running the program, has
+            no signature, or if the program would fail (e.g. it can't be
+            parsed, uses names it never binds, or raised when it was run), so
+            the call is checked with the program's error
+        """
+        bindings = self.bindings
+        if bindings is None or bindings.unbound or self._error is not None:
+            raise KeyError(func)
+        sig = static_signature(func, bindings)
+        if sig is None:
+            raise KeyError(func)
+        return sig
+
+def run_program(source: str) -> dict:
+    """Run a program and return the namespace to look up its functions in.
+
+    Parameters
+    ----------
+    source : str
+        the program source code
+
+    Returns
+    -------
+    dict
+        the globals of this module, overridden by builtins and then by the
+        names the program defined
+    """
+    envir = dict(globals(), **builtins.__dict__)
+    # NOTE: we are attempting to import `r` object for learnr use.
+    if "r" in globals():
+        exec(source, {}, r)
+        return envir
+    module_globals = globals()
+    namespace = dict(module_globals)
+    exec(source, namespace)
+    # the names defined (or redefined) by the program
+    envir.update(
+        (name, value) for name, value in namespace.items()
+        if name not in module_globals or value is not module_globals[name]
+    )
+    return envir
+
+# inspect.signature() of callables (None when they have no signature), for
+# functions that can be weakly referenced, the functions of bound methods and
+# other callables
+SIGNATURES = weakref.WeakKeyDictionary()
+METHOD_SIGNATURES = weakref.WeakKeyDictionary()
+OTHER_SIGNATURES = {}
+
+def callable_signature(func) -> inspect.Signature:
+    """Return `inspect.signature(func)`, cached by callable identity.
+
+    A bound method is cached by its function, since its signature doesn't
+    depend on the object it is bound to. The student's functions are weakly
+    referenced, so they are not kept alive by the cache.
+
+    Raises
+    ------
+    ValueError
+        if no signature can be provided (e.g. for `print`)
+    TypeError
+        if `func` is not a callable
+    """
+    if inspect.ismethod(func):
+        cache, key = METHOD_SIGNATURES, func.__func__
+    else:
+        cache, key = SIGNATURES, func
+    try:
+        try:
+            sig = cache[key]
+        except TypeError:
+            # a callable that can't be weakly referenced (e.g. a builtin)
+            cache = OTHER_SIGNATURES
+            sig = cache[key]
+    except KeyError:
+        try:
+            sig = inspect.signature(func)
+        except ValueError:
+            sig = None
+        cache[key] = sig
+    except TypeError:
+        # an unhashable callable
+        sig = inspect.signature(func)
+    if sig is None:
+        raise ValueError("no signature found for {!r}".format(func))
+    return sig
 
 def standardize_arguments(
     left_call: ast.Call, 
     right_call: ast.Call,
     left_source: str = "",
-    right_source: str = "") -> Union[ast.Call, None]:
+    right_source: str = "",
+    left_program: ProgramNamespace = None,
+    right_program: ProgramNamespace = None) -> Union[ast.Call, None]:
     """This will standardize the function calls for a function Call and return
     the modified Call.
     
@@ -39,6 +190,11 @@ def standardize_arguments(
         the entire source code in which left_call belongs, by default ""
     right_source : str, optional
         the entire source code in which right_call belongs the source code, by default ""
+    left_program : ProgramNamespace, optional
+        the namespace of left_source, shared by all the calls of a grading so
+        that it is run only once, by default a new one
+    right_program : ProgramNamespace, optional
+        the namespace of right_source, by default a new one
 
     Returns
     -------
@@ -51,54 +207,63 @@ def standardize_arguments(
         when there is an issue with the standardization process
     """
     final_call = None
+    if left_program is None:
+        left_program = ProgramNamespace(left_source)
+    if right_program is None:
+        right_program = ProgramNamespace(right_source)
     try:
-        # 1) introduce function call in environment
-        # first pass: is it legal Python code?
-        # for e.g., positional args should always be before keywords args
-        # exec will catch these issues
-        # NOTE: we are attempting to import `r` object for learnr use.
-        if "r" in globals():
-            exec(left_source, {}, r)
-        else:
-            exec(left_source)
-        # 2) construct an environment containing both global and locals, 
-        # overwriting the globals with locals, and builtins.
-        envir = dict(globals(), **locals(), **builtins.__dict__)
-        # 3) grab the live function from the environment
-        # if we're calling a function on an object, the function info has
-        # to be extracted from an ast.Attribute
-        if isinstance(left_call.func, ast.Attribute):
-            func_name = getattr(left_call.func, "attr")
-            # the object's name 
-            obj = left_call.func.value.id
-            # the live function from the environment associated with object
-            # e.g. the `df` in df.head() is a pd.DataFrame so must get the
-            # `head` associated with that class.
-            live_func = getattr(envir[obj], func_name)
-        else:
-            # if we're calling a function not associated with an object
-            # just grab function from environment using its name
-            func_name = left_call.func.id
-            live_func = envir[func_name]
-
-        # 4) collect the arguments passed
-        # construct keyword args mapping
-        kwargs = {a.arg: a.value for a in left_call.keywords}
-
-        # 5) get the formal arguments for function
-        sig = None
         try:
-            # Note: this will raise ValueError if inspect cannot retrieve signature
-            # which can happen for some builtins like `print`, where underlying C
-            # code does not provide any metadata about its signature.
-            sig = inspect.signature(live_func)
-        except ValueError: 
+            # 0) if the function is a builtin, a function of a module that the
+            # program imports or a method of a known class, its signature is
+            # registered, so the program doesn't have to be run
+            sig = left_program.static_signature(left_call.func)
+            # a call that doesn't fit the signature would fail when the program
+            # runs, so it is checked with that error instead
+            sig.bind(*left_call.args, **{a.arg: a.value for a in left_call.keywords})
+        except (KeyError, TypeError):
+            # 1) introduce function call in environment
+            # first pass: is it legal Python code?
+            # for e.g., positional args should always be before keywords args
+            # running the program (once) will catch these issues
+            # 2) the environment contains the globals, builtins and the names
+            # defined by the program
+            envir = left_program.envir
+            # 3) grab the live function from the environment
+            # if we're calling a function on an object, the function info has
+            # to be extracted from an ast.Attribute
+            if isinstance(left_call.func, ast.Attribute):
+                func_name = getattr(left_call.func, "attr")
+                # the object's name 
+                obj = left_call.func.value.id
+                # the live function from the environment associated with object
+                # e.g. the `df` in df.head() is a pd.DataFrame so must get the
+                # `head` associated with that class.
+                live_func = getattr(envir[obj], func_name)
+            else:
+                # if we're calling a function not associated with an object
+                # just grab function from environment using its name
+                func_name = left_call.func.id
+                live_func = envir[func_name]
+
+            # 4) get the formal arguments for function
+            sig = None
+            try:
+                # Note: this will raise ValueError if inspect cannot retrieve signature
+                # which can happen for some builtins like `max`, where underlying C
+                # code does not provide any metadata about its signature.
+                sig = callable_signature(live_func)
+            except ValueError: 
+                pass
+        if sig is None:
             # if we can't get a signature just return call for normal Call
             # checking flow
             final_call = left_call
-        if sig is None:
             raise ValueError()
 
+        # 5) collect the arguments passed
+        # construct keyword args mapping
+        kwargs = {a.arg: a.value for a in left_call.keywords}
+
         # 6) unpack args and kwargs and attempt to standardize argument calls
         # returns: https://docs.python.org/3.6/library/inspect.html#inspect.BoundArguments
         partial_args = sig.bind(*left_call.args, **kwargs)
@@ -120,7 +285,8 @@ def standardize_arguments(
                 left_call,
                 formatted(standardize_arguments(
                     left_call=right_call, right_call = right_call, 
-                    left_source=right_source, right_source=right_source
+                    left_source=right_source, right_source=right_source,
+                    left_program=right_program, right_program=right_program
                     )
                 ),
                 error
@@ -130,7 +296,8 @@ def standardize_arguments(
                 left_call,
                 formatted(standardize_arguments(
                     left_call=right_call, right_call = right_call, 
-                    left_source=right_source, right_source=right_source
+                    left_source=right_source, right_source=right_source,
+                    left_program=right_program, right_program=right_program
                     )
                 ),
                 error
@@ -140,7 +307,8 @@ def standardize_arguments(
                 left_call,
                 formatted(standardize_arguments(
                     left_call=right_call, right_call = right_call, 
-                    left_source=right_source, right_source=right_source
+                    left_source=right_source, right_source=right_source,
+                    left_program=right_program, right_program=right_program
                     )
                 ),
                 error
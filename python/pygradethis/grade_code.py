@@ -9,16 +9,30 @@ import ast
 # formatting
 from .formatters import formatted
 # checking functions
-from .check_functions import standardize_arguments
+from .check_functions import ProgramNamespace, standardize_arguments
 # feedback
 from .message_generators import (
     missing, not_expected, wrong_value, repeated_argument
 )
 
+# caching
+from pygradecode.source_cache import CacheInfo, SourceCache
+
 # misc
+from copy import copy
 from itertools import zip_longest
 from typing import Dict, Any
 
+def is_parent_source(tree: Any) -> bool:
+    """Return whether an AST can be the nearest parent source for feedback.
+
+    It is a somewhat complex AST which is defined as having more than 1 field,
+    which means that for e.g. "1" is not a good candidate since we're trying
+    to support calling out higher level expressions.
+    """
+    return (len(tree._fields) > 1 and 
+        (issubclass(tree.__class__, ast.Expr) or issubclass(tree.__class__, ast.Call)))
+
 def new_parent_source(tree: Any, last_parent: str) -> str:
     """Given an ast, the current tree, and the last parent source,
     return a new last parent source for facilitating feedback on problematic
@@ -36,26 +50,388 @@ def new_parent_source(tree: Any, last_parent: str) -> str:
     str
         the new last_parent or the same
     """
-    # only set the last_parent if:
-    # 1) it is a somewhat complex AST which is defined as having more than 1 field, 
-    # wich means that for e.g. "1" is not a good candidate since we're trying to support
-    # calling out higher level expressions
-    # 2) we can get a source text
-    if (len(tree._fields) > 1 and 
-        (issubclass(tree.__class__, ast.Expr) or issubclass(tree.__class__, ast.Call))):
+    # only set the last_parent if it is a candidate and we can get a source text
+    if is_parent_source(tree):
         # attempt to get a new parent source text for feedback
         try:
             last_parent = formatted(tree)
         except:
             pass
     return last_parent
-    
+
+class ParentSource:
+    """The nearest parent that can be converted to source text for feedback.
+
+    Unlike `new_parent_source`, the parent is only formatted when its source
+    text is needed for a message, so checking correct code does not unparse
+    every expression and call it goes through.
+
+    Parameters
+    ----------
+    node : Any, optional
+        the parent ast.AST, by default None
+    parent : ParentSource, optional
+        the previous parent, whose source text is used if `node` can't be
+        formatted, by default None
+    text : str, optional
+        the source text, if it is already known, by default None
+    """
+    __slots__ = ("node", "parent", "_text")
+
+    def __init__(self, node: Any = None, parent: "ParentSource" = None, text: str = None):
+        self.node = node
+        self.parent = parent
+        self._text = text
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            try:
+                self._text = formatted(self.node)
+            except Exception:
+                self._text = self.parent.text if self.parent is not None else ""
+        return self._text
+
+    def __str__(self) -> str:
+        return self.text
+
+    def push(self, tree: Any) -> "ParentSource":
+        """Return the parent source of the children of `tree`."""
+        if is_parent_source(tree):
+            return ParentSource(tree, self)
+        return self
+
+# the types of the values of AST fields that are compared by value
+VALUE_TYPES = frozenset({str, int, float, complex, bytes, bool, type(None), type(...)})
+
+class StructuralIds:
+    """Structural ids of the subtrees of ASTs, to skip identical subtrees.
+
+    Each AST node and list of nodes gets an id that is the same for subtrees
+    with the same structure and values, whatever their locations. The ids are
+    hash-consed: a subtree's id is looked up in a table by its type and the ids
+    of its children, so equal ids mean equal subtrees, without collisions.
+
+    Subtrees that contain an ast.Call have no id, since checking a call runs
+    the code and can report problems even when both calls are the same.
+
+    Parameters
+    ----------
+    *trees : Any
+        the ASTs to give ids to
+    base : StructuralIds, optional
+        the ids of other ASTs (e.g. of a PreparedSolution) that `trees` are
+        compared with, which are looked up but left unchanged, by default None
+    """
+    __slots__ = ("table", "subtrees", "base")
+
+    def __init__(self, *trees: Any, base: "StructuralIds" = None):
+        self.base = base
+        # (type, children keys) to structural id
+        self.table = {}
+        # id() of a node or list to its structural id and the line number of
+        # the last node with a line number in it, which is the line number
+        # checking it leaves behind
+        self.subtrees = {}
+        for tree in trees:
+            self.add(tree)
+
+    def add(self, tree: Any) -> None:
+        """Give ids to all the subtrees of an AST."""
+        # the nodes and lists in preorder, so in reverse the children of each
+        # of them are given ids before it
+        order = []
+        stack = [tree]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, ast.AST):
+                # nodes without fields (e.g. ast.Load, ast.Add) are keyed by type
+                if not node._fields:
+                    continue
+                children = [getattr(node, field, None) for field in node._fields]
+            elif isinstance(node, list):
+                children = node
+            else:
+                continue
+            order.append((node, children))
+            stack.extend(children)
+
+        subtrees, table = self.subtrees, self.table
+        base_table = self.base.table if self.base is not None else {}
+        for node, children in reversed(order):
+            keys = []
+            last_line = getattr(node, "lineno", None)
+            for child in children:
+                subtree = subtrees.get(id(child))
+                if subtree is not None:
+                    keys.append(subtree[0])
+                    if subtree[1] is not None:
+                        last_line = subtree[1]
+                elif child.__class__ in VALUE_TYPES:
+                    # a value like an identifier or a constant
+                    keys.append((child.__class__, child))
+                elif isinstance(child, ast.AST) and not child._fields:
+                    keys.append((child.__class__,))
+                else:
+                    keys.append(None)
+            if node.__class__ is ast.Call or None in keys:
+                structural_id = None
+            else:
+                key = (node.__class__, tuple(keys))
+                structural_id = base_table.get(key)
+                if structural_id is None:
+                    structural_id = table.setdefault(key, len(base_table) + len(table))
+            subtrees[id(node)] = (structural_id, last_line)
+
+    def subtree(self, node: Any) -> tuple | None:
+        """Return the structural id and last line number of a subtree, if it has one."""
+        subtree = self.subtrees.get(id(node))
+        if subtree is None and self.base is not None:
+            subtree = self.base.subtree(node)
+        return subtree
+
+    def same(self, left: Any, right: Any) -> bool:
+        """Return whether two subtrees are known to be the same."""
+        left_subtree = self.subtree(left)
+        if left_subtree is None or left_subtree[0] is None:
+            return False
+        right_subtree = self.subtree(right)
+        return right_subtree is not None and left_subtree[0] == right_subtree[0]
+
+    def last_line(self, node: Any) -> int | None:
+        """Return the line number of the last node with a line number in a subtree."""
+        return self.subtree(node)[1]
+
+def standardize_solution_call(right_call: ast.Call, right_program: ProgramNamespace) -> ast.Call | None:
+    """Return a standardized copy of a solution call (see `standardize_arguments`)."""
+    solution_call = copy(right_call)
+    return standardize_arguments(
+        left_call=solution_call, right_call=solution_call,
+        left_source=right_program.source, right_source=right_program.source,
+        left_program=right_program, right_program=right_program
+    )
+
+class PreparedSolution:
+    """The solution side of `grade_code`, prepared once to grade many students.
+
+    It holds the parsed solution, the structural ids of its subtrees, and the
+    namespace, standardized calls and formatted snippets of the solution,
+    which are made the first time a student's code is checked against them.
+    Nothing in it is modified by grading, so it can be shared by every grading
+    of an exercise.
+
+    Parameters
+    ----------
+    solution_code : str
+        the solution source code
+    """
+    __slots__ = ("source", "tree", "structure", "program", "_standardized", "_formatted")
+
+    def __init__(self, solution_code: str):
+        self.source = solution_code
+        self.tree = ast.parse(solution_code)
+        self.structure = StructuralIds(self.tree)
+        # the solution is run once, to standardize all of its calls
+        self.program = ProgramNamespace(solution_code)
+        # id() of a call of the solution to its standardized copy
+        self._standardized = {}
+        # id() of a node to the node and its formatted text
+        self._formatted = {}
+
+    def standardized(self, right_call: ast.Call) -> ast.Call | None:
+        """Return the standardized copy of a call of the solution."""
+        key = id(right_call)
+        if key not in self._standardized:
+            self._standardized[key] = standardize_solution_call(right_call, self.program)
+        return self._standardized[key]
+
+    def formatted(self, node: Any) -> str:
+        """Return the formatted text of a node of the solution."""
+        entry = self._formatted.get(id(node))
+        if entry is None or entry[0] is not node:
+            entry = self._formatted[id(node)] = (node, formatted(node))
+        return entry[1]
+
+# the prepared solutions, keyed by a hash of their source code
+SOLUTION_CACHE = SourceCache(PreparedSolution)
+
+def prepare_solution(solution_code: str) -> PreparedSolution:
+    """Return the PreparedSolution of a solution source code, preparing it only once.
+
+    Parameters
+    ----------
+    solution_code : str
+        the solution source code
+
+    Returns
+    -------
+    PreparedSolution
+        the prepared solution, shared with the other gradings of the same solution
+    """
+    if isinstance(solution_code, str):
+        return SOLUTION_CACHE.get(solution_code)
+    return PreparedSolution(solution_code)
+
+def solution_cache_info() -> CacheInfo:
+    """Return the hits, misses, maxsize and current size of the prepared solution cache."""
+    return SOLUTION_CACHE.info()
+
+def solution_cache_clear() -> None:
+    """Clear the prepared solution cache and reset its counters."""
+    SOLUTION_CACHE.clear()
+
+# the kinds of work in the work stack of `run_checks`
+COMPARE = "compare"
+FIELD = "field"
+KEYWORDS = "keywords"
+
+def field_tasks(left: Any, right: Any, last_parent: ParentSource) -> list:
+    """Return the work to check the children of two asts, field by field."""
+    lf, rf = ast.iter_fields(left), ast.iter_fields(right)
+    return [
+        (FIELD, left_field, right_field, last_parent)
+        for left_field, right_field in zip_longest(lf, rf, fillvalue="")
+    ]
+
+def call_tasks(left_call: ast.Call, 
+               right_call: ast.Call, 
+               last_parent: ParentSource,
+               left_program: ProgramNamespace,
+               right_program: ProgramNamespace,
+               solution: PreparedSolution = None) -> list:
+    """Return the work to standardize and check two ast.Calls."""
+    # TODO standardize_arguments args naming is confusing, perhaps refactor it.
+    # standardize copies of the left and right calls, so the trees are left
+    # as they were written for the source text of the parents
+    ls = standardize_arguments(
+        left_call=copy(left_call), right_call=copy(right_call),
+        left_source=left_program.source, right_source=right_program.source,
+        left_program=left_program, right_program=right_program
+    )
+    if solution is not None:
+        rs = solution.standardized(right_call)
+    else:
+        rs = standardize_solution_call(right_call, right_program)
+    tasks = []
+    # if we don't have any arguments simply compare the two nodes
+    if len(ls.keywords) == 0:
+        tasks = field_tasks(ls, rs if rs is not None else right_call, last_parent)
+    # then, check all of the arguments which are all in keywords after running
+    # `standardize_arguments` to simplify checking
+    tasks.append((KEYWORDS, ls, rs, last_parent))
+    return tasks
+
+def check_keywords(ls: ast.Call, 
+                   rs: ast.Call, 
+                   line_info: Dict[str, int], 
+                   last_parent: ParentSource,
+                   solution: PreparedSolution = None):
+    """Compares the keywords of two standardized ast.Calls."""
+    format_right = solution.formatted if solution is not None else formatted
+    if ls != None and rs != None:
+        for l, r in zip_longest(ls.keywords, rs.keywords, fillvalue=""):
+            # check if the student and solution keyword matches in their value
+            wrong_value(l.value, r.value, line_info, formatted(l.value) == format_right(r.value), last_parent)
+            # last parent node would be the value of the parameter if it's an expression/call
+            last_parent = last_parent.push(l.value)
+    else:
+        raise AssertionError("Foo-y! Something went wrong with function call checking.")
+
+def run_checks(tasks: list, 
+               line_info: Dict[str, int],
+               left_source: str = "", 
+               right_source: str = "",
+               structure: StructuralIds = None,
+               solution: PreparedSolution = None) -> None:
+    """Run the checks of two asts with an explicit work stack.
+
+    The work is done in the same order as a depth-first recursion over the
+    fields of the asts, so the first difference is the one reported, but deep
+    or long trees do not recurse. Subtrees that have the same structural id
+    are skipped without going down into them.
+
+    Parameters
+    ----------
+    tasks : list
+        the (kind, left, right, last_parent) work to do first, in order
+    line_info :  Dict[str, int]]
+        holds line information about a particular node
+    left_source : str, optional
+        the source text for user code, by default ""
+    right_source : str, optional
+        the source text for the solution code, by default ""
+    structure : StructuralIds, optional
+        the structural ids of the subtrees of both asts, by default None
+    solution : PreparedSolution, optional
+        the prepared solution, if the right ast is its tree, by default None
+    """
+    # the programs are only run if there are calls to standardize, and once
+    left_program = ProgramNamespace(left_source)
+    right_program = solution.program if solution is not None else ProgramNamespace(right_source)
+    stack = tasks[::-1]
+    while stack:
+        kind, left, right, last_parent = stack.pop()
+        if kind is FIELD:
+            left_name, left_values = left
+            right_name, right_values = right
+            # check that the name of the AST nodes match
+            compare_node(left_name, right_name, line_info, last_parent)
+            # then check the values
+            stack.append((COMPARE, left_values, right_values, last_parent))
+            continue
+        if kind is KEYWORDS:
+            check_keywords(left, right, line_info, last_parent, solution)
+            continue
+
+        # skip the same subtrees, leaving the line numbers their checks would
+        if structure is not None and structure.same(left, right):
+            for side, node in (("left", left), ("right", right)):
+                last_line = structure.last_line(node)
+                line_info[side] = last_line if last_line is not None else line_info.get(side, 1)
+            continue
+
+        # check types first
+        compare_node_type(left, right, line_info)
+
+        # the check AST, list of Expr, or a core data type
+        if isinstance(left, ast.AST):
+            # store line number for feedback
+            line_info["left"] = getattr(
+                left, "lineno", line_info.get("left", 1)
+            )
+            line_info["right"] = getattr(
+                right, "lineno", line_info.get("right", 1)
+            )
+            # the new parent source text for feedback
+            last_parent = last_parent.push(left)
+            # for ast.Call we will raise error when there is either a problem 
+            # with the function or the arguments do not match after standardization
+            if isinstance(left, ast.Call):
+                children = call_tasks(left, right, last_parent, left_program, right_program, solution)
+            else:
+                children = field_tasks(left, right, last_parent)
+        elif isinstance(left, list):
+            children = [
+                (COMPARE, left_child, right_child, last_parent)
+                for left_child, right_child in zip_longest(left, right, fillvalue="")
+            ]
+        else:
+            compare_node(left, right, line_info, last_parent)
+            continue
+        stack.extend(reversed(children))
+
+def as_parent_source(last_parent: str | ParentSource) -> ParentSource:
+    """Return a last parent source text as a ParentSource."""
+    if isinstance(last_parent, ParentSource):
+        return last_parent
+    return ParentSource(text=last_parent)
+
 def check_children(left: Any, 
                    right: Any, 
                    line_info: Dict[str, int],
                    left_source: str = "", 
                    right_source: str = "",
-                   last_parent: str = ""):
+                   last_parent: str | ParentSource = ""):
     """Checks children of two asts by iterating their fields
 
     Parameters
@@ -70,26 +446,20 @@ def check_children(left: Any,
         the source text for user code, by default ""
     right_source : str, optional
         the source text for the solution code, by default ""
-    last_parent : str, optional
+    last_parent : str | ParentSource, optional
         the nearest parent that can be converted to source text, by default ""
     """
-    lf, rf = ast.iter_fields(left), ast.iter_fields(right)
-    # iterate through the children of both ASTs
-    for left_field, right_field in zip_longest(lf, rf, fillvalue=""):
-        left_name, left_values = left_field
-        right_name, right_values = right_field
-        # attempt to get a new parent source text for feedback
-        # check that the name of the AST nodes match
-        compare_node(left_name, right_name, line_info, last_parent)
-        # recurse on values
-        compare_ast(left_values, right_values, line_info, left_source, right_source, last_parent)
+    tasks = field_tasks(left, right, as_parent_source(last_parent))
+    run_checks(tasks, line_info, left_source, right_source)
 
 def compare_ast(left: Any, 
                 right: Any, 
                 line_info: Dict[str, int],
                 left_source: str = "", 
                 right_source: str = "",
-                last_parent: str = "") -> None:
+                last_parent: str | ParentSource = "",
+                structure: StructuralIds = None,
+                solution: PreparedSolution = None) -> None:
     """Compare two abstract syntax trees. Raise AssertionError as soon as they differ.
 
     Parameters
@@ -104,47 +474,26 @@ def compare_ast(left: Any,
         the source text for user code, by default ""
     right_source : str
         the source text for the solution code, by default ""
-    last_parent : str
+    last_parent : str | ParentSource
         the nearest parent that can be converted to source text, by default ""
+    structure : StructuralIds, optional
+        the structural ids of the subtrees of `left` and `right`, to skip the
+        ones that are the same, by default None
+    solution : PreparedSolution, optional
+        the prepared solution, if `right` is its tree, to reuse its
+        standardized calls, by default None
     """
     # to hold line information like line number, and original source
     line_info = {} if line_info is None else line_info
-    # check types first
-    compare_node_type(left, right, line_info)
-
-    # the check AST, list of Expr, or a core data type
-    if isinstance(left, ast.AST):
-        # store line number for feedback
-        line_info["left"] = getattr(
-            left, "lineno", line_info.get("left", 1)
-        )
-        line_info["right"] = getattr(
-            right, "lineno", line_info.get("right", 1)
-        )
-        # attempt to get a new parent source text for feedback
-        last_parent = new_parent_source(left, last_parent)
-        # for ast.Call we will raise error when there is either a problem 
-        # with the function or the arguments do not match after standardization
-        if isinstance(left, ast.Call):
-            # check that the standardized left and right Calls are the same
-            check_functions(left, right, line_info, left_source, right_source, last_parent)
-        else:
-            check_children(left, right, line_info, left_source, right_source, last_parent)
-        
-    elif isinstance(left, list):
-        for left_child, right_child in zip_longest(left, right, fillvalue=""):
-            # recurse on [Expr, ...]
-            # attempt to get a new parent source text for feedback
-            compare_ast(left_child, right_child, line_info, left_source, right_source, last_parent)
-    else:
-        compare_node(left, right, line_info, last_parent)
+    tasks = [(COMPARE, left, right, as_parent_source(last_parent))]
+    run_checks(tasks, line_info, left_source, right_source, structure, solution)
 
 def check_functions(left_call: ast.Call, 
                    right_call: ast.Call, 
                    line_info: Dict[str, int],
                    left_source: str = "", 
                    right_source: str = "",
-                   last_parent: str = ""):
+                   last_parent: str | ParentSource = ""):
     """Standardizes and compares two ast.Calls. Raise AssertionError as soon as they differ.
 
     Parameters
@@ -155,30 +504,18 @@ def check_functions(left_call: ast.Call,
         the solution function call
     line_info :  Dict[str, int]]
         holds line information about a particular node
-    last_parent : str
+    last_parent : str | ParentSource
         the nearest parent that can be converted to source text, by default ""
     left_source : str
         the source text for user code, by default ""
     right_source : str
         the source text for the solution code, by default ""
     """
-    # TODO standardize_arguments args naming is confusing, perhaps refactor it.
-    # standardize the left and right tree
-    ls = standardize_arguments(left_call=left_call, right_call=right_call, left_source=left_source, right_source=right_source)
-    rs = standardize_arguments(left_call=right_call, right_call=right_call, left_source=right_source, right_source=right_source)
-    # if we don't have any arguments simply compare the two nodes
-    if len(ls.keywords) == 0:
-        check_children(left_call, right_call, line_info, left_source, right_source, last_parent)
-    # else, check all of the arguments which are all in keywords after running
-    # `standardize_arguments` to simplify checking
-    if ls != None and rs != None:
-        for l, r in zip_longest(ls.keywords, rs.keywords, fillvalue=""):
-            # check if the student and solution keyword matches in their value
-            wrong_value(l.value, r.value, line_info, formatted(l.value) == formatted(r.value), last_parent)
-            # last parent node would be the value of the parameter if it's an expression/call
-            last_parent = new_parent_source(l.value, last_parent)
-    else:
-        raise AssertionError("Foo-y! Something went wrong with function call checking.")
+    tasks = call_tasks(
+        left_call, right_call, as_parent_source(last_parent), 
+        ProgramNamespace(left_source), ProgramNamespace(right_source)
+    )
+    run_checks(tasks, line_info, left_source, right_source)
     
 def compare_node_type(
         left: Any, 
@@ -223,15 +560,19 @@ def compare_node(left: Any, right: Any, line_info: Dict[str, int], last_parent:
     """
     wrong_value(left, right, line_info, left == right, last_parent)
 
-def grade_code(student_code: str, solution_code: str):
+def grade_code(student_code: str, solution_code: str | PreparedSolution):
     """Checks user and solution code and prints a message if they differ
 
+    The solution is prepared once for each solution source code (see
+    `prepare_solution`), so grading many students against the same solution
+    does not parse and standardize it again.
+
     Parameters
     ----------
     student_code : str
         the user source code
-    solution_code : str
-        the solution source code
+    solution_code : str | PreparedSolution
+        the solution source code, or a prepared solution
 
     Returns
     -------
@@ -241,21 +582,28 @@ def grade_code(student_code: str, solution_code: str):
         If user code differs from solution
     """
     try:
+        solution = solution_code if isinstance(solution_code, PreparedSolution) else None
+        if solution is not None:
+            solution_code = solution.source
         # source node back
         if student_code == '':
             raise Exception("I didn't receive the student code.")
         elif solution_code == '':
             raise Exception("I didn't receive the solution code.")
         student = ast.parse(student_code)
-        solution = ast.parse(solution_code)
-        last_parent = [a for a in ast.walk(ast.parse(student))][1]
+        if solution is None:
+            solution = prepare_solution(solution_code)
+        # the first statement is the first parent source
+        last_parent = ParentSource(text="").push(student.body[0])
         compare_ast(
             student, 
-            solution, 
+            solution.tree, 
             {}, 
             left_source = student_code, 
             right_source = solution_code, 
-            last_parent = new_parent_source(last_parent, "")
+            last_parent = last_parent,
+            structure = StructuralIds(student, base = solution.structure),
+            solution = solution
         )
     except SyntaxError as e:
         message = str(e)
@@ -24,12 +24,15 @@ def missing(left: Any, right: Any, line_info: Dict[str, int]) -> None:
     str
         feedback message
     """
+    # the message is only formatted when the check fails
+    if type(left) is type(right):
+        return
     msg = "I expected `{}` at line {}."
     msg_args = (
         formatted(right), 
         line_info.get("left")
     )
-    assert type(left) == type(right), msg.format(*msg_args)
+    assert type(left) is type(right), msg.format(*msg_args)
 
 def not_expected(left: Any, right: Any, line_info: Dict[str, int]) -> None:
     """Generates message when user supplies an extra node or element in code.
@@ -48,12 +51,15 @@ def not_expected(left: Any, right: Any, line_info: Dict[str, int]) -> None:
     str
         feedback message
     """
+    # the message is only formatted when the check fails
+    if type(left) is type(right):
+        return
     msg = "I did not expect `{}` at line {}."
     msg_args = (
         formatted(left), 
         line_info.get("left")
     )
-    assert type(left) == type(right), msg.format(*msg_args)
+    assert type(left) is type(right), msg.format(*msg_args)
 
 def wrong_value(left: Any, right: Any, line_info: Dict[str, int], condition: bool, last_parent: str) -> None:
     """Generates message when user's code contains in an incorrect value.
@@ -67,7 +73,8 @@ def wrong_value(left: Any, right: Any, line_info: Dict[str, int], condition: boo
     line_info : Dict[str, int]
         holds line information about a particular node
     last_parent : str
-        the nearest parent that can be converted to source text
+        the nearest parent that can be converted to source text (or an object
+        that formats it with `str()`, like grade_code.ParentSource)
     condition : bool
         the condition we want to check regarding equality between left and right
         ast nodes or values
@@ -77,6 +84,10 @@ def wrong_value(left: Any, right: Any, line_info: Dict[str, int], condition: boo
     str
         feedback message
     """
+    # the message is only formatted when the check fails
+    if condition:
+        return
+    last_parent = str(last_parent)
     msg = "I expected `{}`, but what you wrote was interpreted as `{}` at line {}."
     msg_args = (
         formatted(right),
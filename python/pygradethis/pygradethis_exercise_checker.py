@@ -7,10 +7,82 @@ from copy import copy
 from typing import Any, Union, List, Tuple
 
 from .grade_result import grade_result
-from .grade_code import grade_code
+from .grade_code import grade_code, PreparedSolution
 from .conditions import *
 from .feedback import praise, encourage
-from .utils import parse_code
+from .utils import LayeredNamespace, parse_code
+from pygradecode.source_cache import CacheInfo, SourceCache, source_hash
+
+# the number of compiled check codes kept by `prepare_exercise()`
+MAX_EXERCISES = 128
+
+class PreparedExercise:
+  """The check code of an exercise, compiled once for all of its submissions.
+
+  Parameters
+  ----------
+  label : str
+      exercise label
+  check_code : str
+      checking code
+
+  Raises
+  ------
+  SyntaxError
+      if the check code can't be compiled
+  """
+  __slots__ = ("label", "check_code", "source", "code")
+
+  def __init__(self, label: str, check_code: str):
+    self.label = label
+    self.check_code = check_code
+    # the final checking code stores the final grade in a variable that we can reference later
+    self.source = f"__result__ = {check_code}"
+    self.code = compile(self.source, "<string>", "exec")
+
+def exercise_key(exercise: Tuple[str, str]) -> Tuple[str, str]:
+  """Return the cache key of a (label, check code) pair: the label and a hash
+  of the check code."""
+  label, check_code = exercise
+  return (label, source_hash(str(check_code)))
+
+# the prepared exercises, keyed by label and a hash of the check code
+EXERCISE_CACHE = SourceCache(
+  lambda exercise: PreparedExercise(*exercise), MAX_EXERCISES, key=exercise_key
+)
+
+def prepare_exercise(label: str = None, check_code: str = None) -> PreparedExercise:
+  """Compile the check code of an exercise, or return it from the cache.
+
+  A server can prepare its exercises when it starts, so that errors in the check
+  code are reported once, and no submission pays for compiling it.
+
+  Parameters
+  ----------
+  label : str, optional
+      exercise label, by default None
+  check_code : str, optional
+      checking code, by default None
+
+  Returns
+  -------
+  PreparedExercise
+      the compiled check code, shared by every grading of the exercise
+
+  Raises
+  ------
+  SyntaxError
+      if the check code can't be compiled
+  """
+  return EXERCISE_CACHE.get((label, check_code))
+
+def exercise_cache_info() -> CacheInfo:
+  """Return the hits, misses, maxsize and current size of the exercise cache."""
+  return EXERCISE_CACHE.info()
+
+def exercise_cache_clear() -> None:
+  """Clear the exercise cache and reset its counters."""
+  EXERCISE_CACHE.clear()
 
 def graded(graded: Union[str, dict]):
   if (graded is not None):
@@ -40,9 +112,9 @@ def graded(graded: Union[str, dict]):
     )
 
 def pygradethis_exercise_checker(label: str = None,
-                        solution_code: str = None,
+                        solution_code: Union[str, PreparedSolution] = None,
                         user_code: str = None,
-                        check_code: List[str] = None,
+                        check_code: Union[str, PreparedExercise] = None,
                         envir_result: dict = {},
                         evaluate_result: List[str] = [],
                         envir_prep: dict = {},
@@ -57,12 +129,14 @@ def pygradethis_exercise_checker(label: str = None,
   ----------
   label : str, optional
       exercise label, by default None
-  solution_code : str, optional
-      solution source code, by default None
+  solution_code : Union[str, PreparedSolution], optional
+      solution source code, or a solution prepared once for all the submissions
+      (see `grade_code.prepare_solution`), by default None
   user_code : str, optional
       user source code, by default None
-  check_code : List[str], optional
-      checking code, by default None
+  check_code : Union[str, PreparedExercise], optional
+      checking code, or the exercise prepared once for all the submissions
+      (see `prepare_exercise`), by default None
   envir_result : dict, optional
       environment containing execution results, by default None
   evaluate_result : List[str], optional
@@ -83,6 +157,17 @@ def pygradethis_exercise_checker(label: str = None,
         location = "append|prepend|replace"
       }
   """
+  # the check code gets the solution source code as `solution_code` and the
+  # prepared solution as `prepared_solution` to pass to `grade_code()`
+  prepared_solution = None
+  if isinstance(solution_code, PreparedSolution):
+    prepared_solution = solution_code
+    solution_code = prepared_solution.source
+  exercise = None
+  if isinstance(check_code, PreparedExercise):
+    exercise = check_code
+    check_code = exercise.check_code
+
   # check if there is user_code
   if user_code and "".join(user_code) == "":
     return dict(
@@ -105,25 +190,25 @@ def pygradethis_exercise_checker(label: str = None,
 
   # TODO validate checking code after the final check source is constructed
   # the final checking code includes the grading modules and stores the final grade in
-  # a variable that we can reference later
-  final_check_source = f"__result__ = {check_code}"
-  
-  # prep the dictionary that will hold imports, the variables passed into this function, and 
-  # everything else that learnr stored into `envir_prep`
+  # a variable that we can reference later; it is compiled once per exercise (see
+  # `prepare_exercise`)
+
+  # prep the namespace that will hold imports, the variables passed into this function, and 
+  # everything else that learnr stored into `envir_prep`. The check code reads through to these
+  # layers without copying them (names set to None are left out), and its writes stay in the
+  # namespace itself
   # NOTE: in the future, we could abstract and have an Exercise class that would have envir bits 
   # and could have functions to do the checking + check flows
-  if envir_prep is not None:
-    graded_envir = dict(globals(), **locals(), **envir_prep)
-  else:
-    graded_envir = dict(globals(), **locals())
-  graded_envir = {k: v for k, v in graded_envir.items() if v is not None}
+  graded_envir = LayeredNamespace(envir_prep or {}, locals(), globals())
 
   # evaluate exercise and check code output
   try:
     # NOTE: eventually this will have to follow the gradethis grading flow where check code
     # can either contain the grading the result or the code and use the student's result
     # evaluate check code and return the result and a Graded list structure
-    exec(final_check_source, graded_envir)
+    if exercise is None:
+      exercise = prepare_exercise(label, check_code)
+    exec(exercise.code, graded_envir)
     # extract the result out of the environment
     result = graded_envir['__result__']
   except Exception as e:
@@ -1,10 +1,23 @@
 """
 This module contains functions to faciliate checking Python code or output.
 """
-from typing import Any
+import multiprocessing
+import os
+import time
+from collections import deque
+from itertools import islice
+from multiprocessing import connection
+from typing import Any, Callable, Iterable, Iterator, List, Union
 
-from .pygradethis_exercise_checker import pygradethis_exercise_checker
+from .pygradethis_exercise_checker import (
+  PreparedExercise, pygradethis_exercise_checker, prepare_exercise
+)
 from .conditions import Graded
+from .grade_code import PreparedSolution, prepare_solution
+from .sandbox import dump_outcome, load_outcome
+
+# the default number of submissions sent to a worker at a time by `grade_many()`
+CHUNK_SIZE = 64
 
 def grade(
   *check_code: Graded,
@@ -49,3 +62,315 @@ def grade(
     envir_result = {}
   )
 
+
+# Grading workers ----
+
+class WorkerDied(Exception):
+  """Raised when a grading worker process dies without sending back an
+  outcome (e.g. the graded code called `os._exit()` or used up its memory)."""
+
+def worker_loop(conn, initializer: Callable = None, initargs: tuple = ()) -> None:
+  """Run the tasks sent to a grading worker process, one at a time.
+
+  The worker first sends back the outcome of its initializer, then the
+  outcome of each task in the order they were sent (see `GradingWorker`).
+  """
+  conn.send_bytes(dump_outcome(initializer or (lambda *args: None), initargs, {}))
+  while True:
+    try:
+      tasks = conn.recv()
+    except EOFError:
+      return
+    for func, args, kwargs in tasks:
+      conn.send_bytes(dump_outcome(func, args, kwargs))
+
+class GradingWorker:
+  """A worker process that runs grading tasks, and that the grading process
+  can kill, e.g. when a task takes too long or it has to be cancelled.
+
+  The tasks are sent to the worker pickled, and their outcomes are sent back
+  as JSON (see `sandbox.dump_outcome`), so the grading process never unpickles
+  anything that the graded code made. The first outcome that the worker
+  sends back is the one of its initializer, which is None when it is ready.
+
+  Parameters
+  ----------
+  initializer : Callable, optional
+      a module level function that the worker calls when it starts, by
+      default None
+  initargs : tuple, optional
+      the arguments of the initializer, by default ()
+  mp_context : optional
+      the multiprocessing context to start the worker with, by default the
+      platform's default
+  """
+
+  def __init__(self, initializer: Callable = None, initargs: tuple = (), mp_context=None):
+    context = mp_context or multiprocessing.get_context()
+    self.conn, worker_conn = context.Pipe()
+    self.process = context.Process(
+      target=worker_loop, args=(worker_conn, initializer, initargs), daemon=True
+    )
+    self.process.start()
+    worker_conn.close()
+
+  def send(self, tasks: List[tuple]) -> None:
+    """Send (func, args, kwargs) tasks to the worker, which runs them in order.
+
+    The tasks are sent in one message, so the worker reads all of them before
+    it sends back the first outcome.
+    """
+    self.conn.send(tasks)
+
+  def receive(self) -> Any:
+    """Wait for the next outcome and return its result, or raise its exception.
+
+    Raises
+    ------
+    WorkerDied
+        if the worker died before it sent the outcome
+    """
+    try:
+      data = self.conn.recv_bytes()
+    except (EOFError, OSError):
+      self.process.join()
+      raise WorkerDied(
+        "the grading worker died (exit code {})".format(self.process.exitcode)
+      ) from None
+    return load_outcome(data)
+
+  def kill(self) -> None:
+    """Stop the worker right away, with the task it is running."""
+    self.process.kill()
+    self.process.join()
+    self.conn.close()
+
+def failure_feedback(message: str) -> dict:
+  """Return the feedback of a submission that couldn't be graded."""
+  return dict(
+    message=message,
+    correct=False,
+    type="warning",
+    location="append"
+  )
+
+def timeout_feedback(timeout: float) -> dict:
+  return failure_feedback("Grading your submission took longer than {} seconds.".format(timeout))
+
+def stopped_feedback() -> dict:
+  """Return the feedback of a submission whose grading worker died."""
+  return failure_feedback("Grading your submission stopped before it was done.")
+
+# Bulk grading ----
+
+# the exercise of a grading worker process, set by `init_worker()`
+WORKER_EXERCISE = {}
+
+def init_worker(solution_code: str, check_code: str) -> None:
+  """Prepare the exercise once in a grading worker process.
+
+  A solution or check code that can't be prepared (e.g. that has a syntax
+  error) is passed to the exercise checker as it is, which reports the error
+  for each submission, like when grading a single submission.
+  """
+  try:
+    solution = prepare_solution(solution_code) if solution_code else solution_code
+  except Exception:
+    solution = solution_code
+  try:
+    exercise = prepare_exercise(None, check_code)
+  except Exception:
+    exercise = check_code
+  WORKER_EXERCISE.clear()
+  WORKER_EXERCISE.update(solution=solution, check_code=exercise)
+
+def grade_submission(
+  submission: Union[str, dict],
+  solution: Union[str, PreparedSolution],
+  check_code: Union[str, PreparedExercise]
+) -> dict:
+  """Grade a submission with `pygradethis_exercise_checker`.
+
+  Parameters
+  ----------
+  submission : Union[str, dict]
+      the user code, or the keyword arguments of the exercise checker for the
+      submission (e.g. `user_code` and `last_value`)
+  solution : Union[str, PreparedSolution]
+      the solution source code, or the prepared solution
+  check_code : Union[str, PreparedExercise]
+      checking code, or the prepared exercise
+
+  Returns
+  -------
+  dict
+      a feedback dict (see `pygradethis_exercise_checker`)
+  """
+  kwargs = dict(user_code=submission) if isinstance(submission, str) else dict(submission)
+  return pygradethis_exercise_checker(solution_code=solution, check_code=check_code, **kwargs)
+
+def grade_worker_submission(submission: Union[str, dict]) -> dict:
+  """Grade a submission against the exercise of a grading worker process."""
+  return grade_submission(submission, WORKER_EXERCISE["solution"], WORKER_EXERCISE["check_code"])
+
+class ChunkGrader:
+  """A grading worker of `grade_many()`, with the submissions it was sent and
+  hasn't graded yet, in order, and the deadline of the first one."""
+
+  def __init__(self, solution_code: str, check_code: str):
+    self.initargs = (solution_code, check_code)
+    self.worker = GradingWorker(init_worker, self.initargs)
+    self.ready = False
+    self.pending = deque()
+    self.deadline = None
+
+  def send(self, submissions: List[tuple], timeout: float = None) -> None:
+    """Send (index, submission) pairs to grade after the pending ones."""
+    if self.ready:
+      self.worker.send([(grade_worker_submission, (submission,), {}) for _, submission in submissions])
+      if not self.pending:
+        self.start_clock(timeout)
+    self.pending.extend(submissions)
+
+  def start_clock(self, timeout: float = None) -> None:
+    self.deadline = None if timeout is None else time.monotonic() + timeout
+
+  def restart(self) -> None:
+    """Kill the worker and start a new one, which is sent the pending
+    submissions when it is ready."""
+    self.worker.kill()
+    self.worker = GradingWorker(init_worker, self.initargs)
+    self.ready = False
+    self.deadline = None
+
+def grade_many(
+  submissions: Iterable[Union[str, dict]],
+  solution_code: str,
+  check_code: str,
+  workers: int = None,
+  chunk_size: int = CHUNK_SIZE,
+  timeout: float = None
+) -> Iterator[dict]:
+  """Grade many submissions to an exercise in a pool of worker processes.
+
+  The exercise is prepared once in each worker, and the submissions are sent
+  to the workers in chunks, a chunk per worker at a time, so the submissions
+  can be a stream that is too big to hold in memory. The feedback is yielded
+  in the order of the submissions, as soon as it is ready.
+
+  A submission that takes longer than `timeout` seconds to grade, or that
+  kills its worker (e.g. with `os._exit()`), gets a warning as its feedback.
+  Its worker is killed and replaced, and grades the rest of its chunk.
+
+  Parameters
+  ----------
+  submissions : Iterable[Union[str, dict]]
+      the user code of each submission, or the keyword arguments of
+      `pygradethis_exercise_checker` for it (e.g. `user_code` and `last_value`)
+  solution_code : str
+      solution source code
+  check_code : str
+      checking code
+  workers : int, optional
+      the number of worker processes (at least 1), by default the number of
+      CPUs
+  chunk_size : int, optional
+      the number of submissions sent to a worker at a time, by default
+      CHUNK_SIZE
+  timeout : float, optional
+      the seconds each submission can take to grade, by default None (no
+      limit). It is enforced by this process, which kills the worker.
+
+  Returns
+  -------
+  Iterator[dict]
+      the feedback dict of each submission (see `pygradethis_exercise_checker`)
+
+  Raises
+  ------
+  ValueError
+      if `workers` is less than 1, when `grade_many()` is called
+  SyntaxError
+      if the check code can't be compiled, when `grade_many()` is called
+  WorkerDied
+      if a worker dies before it is ready to grade, while iterating over the
+      feedback
+  """
+  prepare_exercise(None, check_code)
+  if workers is None:
+    workers = os.cpu_count() or 1
+  if workers < 1:
+    raise ValueError(f"workers must be at least 1, not {workers}")
+  return grade_in_workers(submissions, solution_code, check_code, workers, chunk_size, timeout)
+
+def grade_in_workers(
+  submissions: Iterable[Union[str, dict]],
+  solution_code: str,
+  check_code: str,
+  workers: int,
+  chunk_size: int,
+  timeout: Union[float, None]
+) -> Iterator[dict]:
+  """Yield the feedback of `grade_many()`, once its arguments are checked."""
+  submissions = enumerate(submissions)
+  # the feedback that is not yielded yet, by submission index
+  feedback = {}
+  next_index = 0
+  graders = []
+  try:
+    graders.extend(ChunkGrader(solution_code, check_code) for _ in range(workers))
+    exhausted = False
+    while True:
+      # keep the workers busy without reading too far ahead of the feedback
+      for grader in graders:
+        if grader.pending or exhausted or len(feedback) >= 2 * workers * chunk_size:
+          continue
+        chunk = list(islice(submissions, chunk_size))
+        if chunk:
+          grader.send(chunk, timeout)
+        else:
+          exhausted = True
+      while next_index in feedback:
+        yield feedback.pop(next_index)
+        next_index += 1
+      busy = [grader for grader in graders if grader.pending or not grader.ready]
+      if exhausted and not any(grader.pending for grader in graders):
+        return
+
+      deadlines = [grader.deadline for grader in busy if grader.deadline is not None]
+      wait_for = max(min(deadlines) - time.monotonic(), 0) if deadlines else None
+      ready = connection.wait([grader.worker.conn for grader in busy], wait_for)
+      now = time.monotonic()
+      for grader in busy:
+        if grader.worker.conn not in ready:
+          if grader.deadline is not None and now >= grader.deadline:
+            index, _ = grader.pending.popleft()
+            feedback[index] = timeout_feedback(timeout)
+            grader.restart()
+          continue
+        try:
+          result = grader.worker.receive()
+        except WorkerDied:
+          if not grader.ready:
+            raise
+          index, _ = grader.pending.popleft()
+          feedback[index] = stopped_feedback()
+          grader.restart()
+          continue
+        except Exception as e:
+          if not grader.ready:
+            raise
+          result = failure_feedback("Error occured while checking the submission. {}".format(e))
+        if not grader.ready:
+          # the worker is ready, send it the submissions left by the last one
+          grader.ready = True
+          pending, grader.pending = grader.pending, deque()
+          if pending:
+            grader.send(list(pending), timeout)
+          continue
+        index, _ = grader.pending.popleft()
+        feedback[index] = result
+        grader.start_clock(timeout)
+  finally:
+    for grader in graders:
+      grader.worker.kill()
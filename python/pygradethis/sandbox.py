@@ -0,0 +1,265 @@
+"""
+This module contains a pool of warm sandbox workers to run grading code (e.g.
+`pygradethis_exercise_checker`, which `exec`s the check code and the student's
+code) away from the grading process.
+
+Each worker imports the common data science libraries once, when it starts.
+Every job then runs in a child forked from a worker, which shares the imported
+libraries copy-on-write, is limited in CPU time and memory, and is killed if it
+runs for too long. The child exits after the job, so a job can't change the
+worker for the next ones.
+"""
+import builtins
+import gc
+import importlib
+import json
+import os
+import select
+import signal
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable
+
+from .grade_code import PreparedSolution
+from .pygradethis_exercise_checker import pygradethis_exercise_checker
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# the modules imported by the workers before they run any job
+PRELOAD = ("numpy", "pandas", "pygradethis.pygradethis_exercise_checker")
+
+class SandboxError(RuntimeError):
+    """Raised when a sandboxed job dies without a result (e.g. it was killed
+    for using too much CPU time)."""
+
+class SandboxTimeout(TimeoutError):
+    """Raised when a sandboxed job runs for longer than its timeout."""
+
+def dump_outcome(func: Callable, args: tuple, kwargs: dict) -> bytes:
+    """Call a function and return its outcome as JSON: {"result": result}, or
+    {"error": [exception type name, message]} if it raised.
+
+    Only JSON is sent back from the code that runs the job, so reading the
+    outcome can't run code (unlike unpickling an exception that the job made).
+    """
+    try:
+        outcome = {"result": func(*args, **kwargs)}
+    except BaseException as e:
+        try:
+            outcome = {"error": [type(e).__name__, str(e)]}
+        except Exception:
+            outcome = {"error": ["SandboxError", "the job raised an exception that can't be described"]}
+    try:
+        return json.dumps(outcome).encode("utf-8")
+    except Exception as e:
+        return json.dumps({"error": [
+            "SandboxError", "the result of the job can't be sent back: {}".format(e)
+        ]}).encode("utf-8")
+
+def load_outcome(data: bytes) -> Any:
+    """Return the result of a job from its JSON outcome (see `dump_outcome()`),
+    or raise its exception.
+
+    Raises
+    ------
+    Exception
+        the job's exception, rebuilt from its type name and message if it is a
+        builtin `Exception`, and a SandboxError otherwise
+    SandboxError
+        if the outcome is not valid
+    """
+    try:
+        outcome = json.loads(data)
+        if "error" not in outcome:
+            return outcome["result"]
+        type_name, message = outcome["error"]
+    except (ValueError, TypeError, KeyError, RecursionError):
+        raise SandboxError("the job sent back an invalid outcome") from None
+    raise rebuild_exception(str(type_name), str(message))
+
+def rebuild_exception(type_name: str, message: str) -> Exception:
+    """Return an exception of a job from its type name and message."""
+    exc_type = getattr(builtins, type_name, None)
+    if exc_type is None:
+        exc_type = {"SandboxError": SandboxError, "SandboxTimeout": SandboxTimeout}.get(type_name)
+    if isinstance(exc_type, type) and issubclass(exc_type, Exception):
+        try:
+            return exc_type(message)
+        except Exception:
+            # e.g. UnicodeDecodeError, which needs more arguments
+            pass
+    return SandboxError("{}: {}".format(type_name, message) if message else type_name)
+
+def warm_up(preload: tuple) -> None:
+    """Import the preloaded modules in a worker, and keep the objects created
+    so far out of the garbage collector, so forked children don't copy the
+    pages it would touch."""
+    for module_name in preload:
+        try:
+            importlib.import_module(module_name)
+        except ImportError:
+            pass
+    gc.collect()
+    gc.freeze()
+
+def set_limits(cpu_seconds: int = None, memory_bytes: int = None) -> None:
+    """Limit the CPU time and the address space of the current process."""
+    if resource is None:
+        return
+    if cpu_seconds is not None:
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+    if memory_bytes is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+
+def run_in_child(
+    func: Callable,
+    args: tuple,
+    kwargs: dict,
+    timeout: float = None,
+    cpu_seconds: int = None,
+    memory_bytes: int = None) -> Any:
+    """Run a function in a forked child of the current process and return its
+    result, or raise its exception.
+
+    The child sends back its outcome as JSON (see `dump_outcome()`), so the
+    result must be JSON serializable (e.g. a feedback dict), and comes back
+    with JSON types (e.g. a tuple comes back as a list).
+
+    Raises
+    ------
+    SandboxTimeout
+        if the child runs for more than `timeout` seconds; it is killed
+    SandboxError
+        if the child exits without a result
+    """
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        # the child: run the job, send back its outcome and exit
+        status = 1
+        try:
+            os.close(read_fd)
+            set_limits(cpu_seconds, memory_bytes)
+            data = dump_outcome(func, args, kwargs)
+            with os.fdopen(write_fd, "wb") as f:
+                f.write(data)
+            status = 0
+        finally:
+            os._exit(status)
+
+    # the worker: read the outcome until the child closes the pipe
+    os.close(write_fd)
+    chunks = []
+    timed_out = False
+    with os.fdopen(read_fd, "rb", buffering=0) as f:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            ready, _, _ = select.select([f], [], [], remaining)
+            if not ready:
+                timed_out = True
+                os.kill(pid, signal.SIGKILL)
+                break
+            chunk = f.read(1 << 16)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    _, status = os.waitpid(pid, 0)
+
+    if timed_out:
+        raise SandboxTimeout("the job took longer than {} seconds".format(timeout))
+    if not chunks:
+        if os.WIFSIGNALED(status):
+            reason = "was killed by signal {}".format(signal.Signals(os.WTERMSIG(status)).name)
+        else:
+            reason = "exited with status {}".format(os.WEXITSTATUS(status))
+        raise SandboxError("the job {} without a result".format(reason))
+    return load_outcome(b"".join(chunks))
+
+class SandboxPool:
+    """A pool of warm workers that run each job in a forked, limited child.
+
+    Parameters
+    ----------
+    workers : int, optional
+        the number of worker processes, by default the number of CPUs
+    preload : tuple, optional
+        the modules the workers import when they start, by default PRELOAD
+    timeout : float, optional
+        the wall-clock seconds a job can run for, by default None (no limit)
+    cpu_seconds : int, optional
+        the CPU seconds a job can use, by default None (no limit)
+    memory_bytes : int, optional
+        the address space a job can use, including the libraries that the
+        worker imported, by default None (no limit)
+    mp_context : optional
+        the multiprocessing context to start the workers with, by default the
+        platform's default
+
+    Raises
+    ------
+    RuntimeError
+        on platforms that can't fork (Windows)
+    """
+
+    def __init__(self,
+                 workers: int = None,
+                 preload: tuple = PRELOAD,
+                 timeout: float = None,
+                 cpu_seconds: int = None,
+                 memory_bytes: int = None,
+                 mp_context=None):
+        if not hasattr(os, "fork"):
+            raise RuntimeError("sandboxes need os.fork(), which this platform doesn't have")
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_bytes = memory_bytes
+        self._executor = ProcessPoolExecutor(
+            workers or os.cpu_count() or 1,
+            mp_context=mp_context,
+            initializer=warm_up,
+            initargs=(preload,)
+        )
+
+    def __enter__(self) -> "SandboxPool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self, wait: bool = True) -> None:
+        """Stop the workers, cancelling the jobs that haven't started."""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def submit(self, func: Callable, *args, **kwargs) -> Future:
+        """Run `func(*args, **kwargs)` in a sandbox and return its future.
+
+        `func` is sent to a worker, so it must be a module level function.
+        """
+        return self._executor.submit(
+            run_in_child, func, args, kwargs, self.timeout, self.cpu_seconds, self.memory_bytes
+        )
+
+    def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Run `func(*args, **kwargs)` in a sandbox and return its result,
+        which must be JSON serializable (see `run_in_child()`).
+
+        Raises
+        ------
+        SandboxTimeout
+            if it ran for longer than the pool's timeout
+        SandboxError
+            if it died without a result (e.g. it used up its CPU time)
+        """
+        return self.submit(func, *args, **kwargs).result()
+
+    def check(self, **kwargs) -> dict:
+        """Run `pygradethis_exercise_checker` with keyword arguments in a
+        sandbox and return its feedback."""
+        if isinstance(kwargs.get("solution_code"), PreparedSolution):
+            # the namespaces of a prepared solution can't be sent to a worker
+            kwargs["solution_code"] = kwargs["solution_code"].source
+        return self.run(pygradethis_exercise_checker, **kwargs)
@@ -0,0 +1,437 @@
+"""
+This module contains a registry of the signatures of builtins and known library
+functions, so the arguments of calls to them can be standardized without
+running the program that makes the calls.
+"""
+import ast
+import builtins
+import importlib
+import inspect
+import json
+import math
+from collections import Counter
+from typing import Dict, NamedTuple, Optional, Set
+
+# the modules whose functions are registered when they are first looked up,
+# and which `SignatureRegistry.seed()` registers by default
+STATIC_MODULES = ("builtins", "math", "numpy", "pandas")
+
+# the functions that return instances of a known class, so the methods called
+# on a name assigned their result can be looked up without running the program
+RECEIVER_TYPES = {
+    "numpy.array": "numpy.ndarray",
+    "numpy.arange": "numpy.ndarray",
+    "numpy.linspace": "numpy.ndarray",
+    "numpy.ones": "numpy.ndarray",
+    "numpy.zeros": "numpy.ndarray",
+    "pandas.DataFrame": "pandas.DataFrame",
+    "pandas.Series": "pandas.Series",
+    "pandas.read_csv": "pandas.DataFrame",
+}
+
+# the keywords that make a function of RECEIVER_TYPES return another type
+# (e.g. `pd.read_csv(path, chunksize=10)` returns a reader)
+RECEIVER_TYPE_KEYWORDS = {"chunksize", "iterator"}
+
+# the calls that can change the names of a program without binding them
+DYNAMIC_CALLS = {"exec", "eval", "globals", "vars", "setattr", "delattr", "__import__"}
+
+# the version of the serialized signatures file
+FORMAT_VERSION = 1
+
+class SignatureRegistry:
+    """The signatures of functions by qualified name (e.g. "math.sqrt").
+
+    A function without a signature that `inspect` can retrieve (e.g. `max`) is
+    registered with None, so looking it up again doesn't import or inspect it.
+    A module of `modules` is seeded (see `seed()`) the first time one of its
+    functions is looked up, and a class of one of them (e.g.
+    "pandas.DataFrame") the first time one of its methods is.
+
+    Parameters
+    ----------
+    modules : tuple, optional
+        the modules whose functions are registered on lookup, by default
+        STATIC_MODULES
+    """
+
+    def __init__(self, modules: tuple = STATIC_MODULES):
+        self.modules = modules
+        self._signatures = {}
+        self._seeded = set()
+
+    def __contains__(self, name: str) -> bool:
+        try:
+            self.lookup(name)
+        except KeyError:
+            return False
+        return True
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def register(self, name: str, signature: Optional[inspect.Signature]) -> None:
+        """Register the signature of a function, or None if it has none."""
+        self._signatures[name] = signature
+
+    def lookup(self, name: str) -> Optional[inspect.Signature]:
+        """Return the signature of a function by qualified name.
+
+        Returns None if the function has no signature. The signature of a
+        method (e.g. "pandas.DataFrame.head") doesn't have its `self`.
+
+        Raises
+        ------
+        KeyError
+            if the function is not registered, and is not a function of the
+            registry's modules or a method of one of their classes
+        """
+        try:
+            return self._signatures[name]
+        except KeyError:
+            pass
+        owner = name.rpartition(".")[0]
+        if owner in self._seeded:
+            raise KeyError(name)
+        module_name, _, class_name = owner.rpartition(".")
+        if owner in self.modules:
+            self.seed((owner,))
+        elif module_name in self.modules:
+            self.seed_class(module_name, class_name)
+        else:
+            raise KeyError(name)
+        return self._signatures[name]
+
+    def seed(self, modules: tuple = None) -> None:
+        """Register the public functions of modules that can be imported.
+
+        Parameters
+        ----------
+        modules : tuple, optional
+            the names of the modules, by default the registry's modules
+        """
+        for module_name in modules or self.modules:
+            self._seeded.add(module_name)
+            try:
+                module = importlib.import_module(module_name)
+            except ImportError:
+                continue
+            for attr, func in vars(module).items():
+                name = "{}.{}".format(module_name, attr)
+                if attr.startswith("_") or not callable(func) or name in self._signatures:
+                    continue
+                self._signatures[name] = inspect_signature(func)
+
+    def seed_class(self, module_name: str, class_name: str) -> None:
+        """Register the public methods of a class of a module that can be
+        imported, without their `self`."""
+        owner = "{}.{}".format(module_name, class_name)
+        self._seeded.add(owner)
+        try:
+            cls = getattr(importlib.import_module(module_name), class_name)
+        except (ImportError, AttributeError):
+            return
+        if not isinstance(cls, type):
+            return
+        for attr in dir(cls):
+            name = "{}.{}".format(owner, attr)
+            if attr.startswith("_") or name in self._signatures:
+                continue
+            try:
+                func = getattr(cls, attr)
+            except AttributeError:
+                continue
+            if callable(func):
+                self._signatures[name] = method_signature(cls, attr, func)
+
+    def dump(self, path: str) -> None:
+        """Write the registered signatures to a JSON file.
+
+        Signatures with defaults that can't be written as Python literals are
+        left out, and are inspected again when they are looked up.
+        """
+        signatures = {}
+        for name, signature in self._signatures.items():
+            try:
+                signatures[name] = serialize_signature(signature)
+            except ValueError:
+                continue
+        with open(path, "w") as f:
+            json.dump({"version": FORMAT_VERSION, "signatures": signatures}, f, indent=1)
+
+    def load(self, path: str) -> None:
+        """Register the signatures of a JSON file written by `dump()`.
+
+        Raises
+        ------
+        ValueError
+            if the file is not a signatures file of a supported version
+        """
+        with open(path) as f:
+            data = json.load(f)
+        if not isinstance(data, dict) or data.get("version") != FORMAT_VERSION:
+            raise ValueError("{} is not a signatures file of version {}".format(path, FORMAT_VERSION))
+        for name, parameters in data["signatures"].items():
+            self._signatures[name] = deserialize_signature(parameters)
+
+def inspect_signature(func) -> Optional[inspect.Signature]:
+    """Return `inspect.signature(func)`, or None if it has no signature."""
+    try:
+        return inspect.signature(func)
+    except (ValueError, TypeError):
+        return None
+
+def method_signature(cls: type, attr: str, func) -> Optional[inspect.Signature]:
+    """Return the signature of a method called on an instance of a class, or
+    None if it has no signature."""
+    signature = inspect_signature(func)
+    if signature is None or isinstance(inspect.getattr_static(cls, attr), (staticmethod, classmethod)):
+        return signature
+    # a function of the class is bound to the instance it is called on
+    parameters = list(signature.parameters.values())
+    if not parameters or parameters[0].kind not in (
+        inspect.Parameter.POSITIONAL_ONLY, inspect.Parameter.POSITIONAL_OR_KEYWORD
+    ):
+        return None
+    return signature.replace(parameters=parameters[1:])
+
+def serialize_signature(signature: Optional[inspect.Signature]) -> Optional[list]:
+    """Return a signature as a list of [name, kind] or [name, kind, default repr].
+
+    Raises
+    ------
+    ValueError
+        if a default is not a Python literal
+    """
+    if signature is None:
+        return None
+    parameters = []
+    for p in signature.parameters.values():
+        if p.default is p.empty:
+            parameters.append([p.name, p.kind.name])
+            continue
+        default = repr(p.default)
+        try:
+            if ast.literal_eval(default) != p.default:
+                raise ValueError
+        except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+            raise ValueError("the default of {} is not a literal: {}".format(p.name, default))
+        parameters.append([p.name, p.kind.name, default])
+    return parameters
+
+def deserialize_signature(parameters: Optional[list]) -> Optional[inspect.Signature]:
+    """Return the signature of a list written by `serialize_signature()`."""
+    if parameters is None:
+        return None
+    return inspect.Signature([
+        inspect.Parameter(
+            p[0],
+            getattr(inspect.Parameter, p[1]),
+            default=ast.literal_eval(p[2]) if len(p) > 2 else inspect.Parameter.empty
+        )
+        for p in parameters
+    ])
+
+# the registry used to standardize arguments
+SIGNATURE_REGISTRY = SignatureRegistry()
+
+def load_signatures(path: str) -> None:
+    """Register the signatures of a JSON file in the default registry."""
+    SIGNATURE_REGISTRY.load(path)
+
+def dump_signatures(path: str) -> None:
+    """Write the signatures of the default registry to a JSON file."""
+    SIGNATURE_REGISTRY.dump(path)
+
+# Static resolution ----
+
+class ProgramBindings(NamedTuple):
+    """The names a program binds, found without running it.
+
+    `names` are the names bound by anything but a module import, `modules`
+    maps the names bound only by `import` to their modules, and `dynamic` is
+    True if the program can bind names in ways that can't be found statically
+    (e.g. `from x import *` or `exec()`). `unbound` are the names the program
+    can use before binding them, and that are neither builtins nor functions of
+    `math`, so running it would raise a NameError. `receivers` maps the names
+    bound once, by an assignment at the top of the program, to that assignment.
+    """
+    names: Set[str]
+    modules: Dict[str, str]
+    dynamic: bool
+    unbound: Set[str]
+    receivers: Dict[str, ast.Assign]
+
+def is_predefined(name: str) -> bool:
+    """Return whether a name is defined without the program binding it, in the
+    namespace the code is run with (see `check_functions.run_program`)."""
+    return name in builtins.__dict__ or (not name.startswith("_") and name in math.__dict__)
+
+def immediate_loads(node: ast.AST) -> Set[str]:
+    """Return the names loaded when a statement runs, without the ones loaded
+    in the bodies of the functions and lambdas it defines."""
+    loaded = set()
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, ast.Name):
+            if isinstance(node.ctx, ast.Load):
+                loaded.add(node.id)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            # the decorators, defaults and annotations run with the definition
+            stack.extend(node.decorator_list)
+            stack.append(node.args)
+            if node.returns is not None:
+                stack.append(node.returns)
+        elif isinstance(node, ast.Lambda):
+            stack.append(node.args)
+        else:
+            stack.extend(ast.iter_child_nodes(node))
+    return loaded
+
+def program_bindings(tree: ast.AST) -> ProgramBindings:
+    """Return the names bound anywhere in a program (see `ProgramBindings`)."""
+    # the number of times each name is bound, other than by a module import
+    bound = Counter()
+    loaded = set()
+    imports = {}
+    dynamic = False
+    unbound = set()
+    statements = getattr(tree, "body", [tree])
+    for statement in statements:
+        # the names a statement loads when it runs must be bound by then (or by
+        # the statement itself, e.g. the target of a `for`)
+        loaded_now = immediate_loads(statement)
+        for node in ast.walk(statement):
+            if isinstance(node, ast.Name):
+                if isinstance(node.ctx, ast.Load):
+                    loaded.add(node.id)
+                else:
+                    bound[node.id] += 1
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                bound[node.name] += 1
+            elif isinstance(node, ast.arg):
+                bound[node.arg] += 1
+            elif isinstance(node, ast.ExceptHandler):
+                if node.name:
+                    bound[node.name] += 1
+            elif isinstance(node, (ast.MatchAs, ast.MatchStar)):
+                if node.name:
+                    bound[node.name] += 1
+            elif isinstance(node, ast.MatchMapping):
+                if node.rest:
+                    bound[node.rest] += 1
+            elif isinstance(node, ast.Import):
+                for alias in node.names:
+                    if alias.asname:
+                        name, module = alias.asname, alias.name
+                    else:
+                        name = module = alias.name.partition(".")[0]
+                    # a name imported as different modules is not known statically
+                    if imports.setdefault(name, module) != module:
+                        bound[name] += 1
+            elif isinstance(node, ast.ImportFrom):
+                for alias in node.names:
+                    if alias.name == "*":
+                        dynamic = True
+                    else:
+                        bound[alias.asname or alias.name] += 1
+            elif isinstance(node, (ast.Global, ast.Nonlocal)):
+                bound.update(node.names)
+            elif isinstance(node, ast.Attribute):
+                # e.g. `builtins.print = ...`
+                if not isinstance(node.ctx, ast.Load):
+                    dynamic = True
+            elif isinstance(node, ast.Call):
+                if isinstance(node.func, ast.Name) and node.func.id in DYNAMIC_CALLS:
+                    dynamic = True
+        unbound.update(
+            name for name in loaded_now
+            if name not in bound and name not in imports and not is_predefined(name)
+        )
+    names = set(bound)
+    modules = {name: module for name, module in imports.items() if name not in names}
+    # and the names loaded later (e.g. in a function body) must be bound somewhere
+    unbound.update(
+        name for name in loaded
+        if name not in names and name not in imports and not is_predefined(name)
+    )
+    receivers = {}
+    for node in statements:
+        if (isinstance(node, ast.Assign) and len(node.targets) == 1
+                and isinstance(node.targets[0], ast.Name)
+                and bound[node.targets[0].id] == 1 and node.targets[0].id not in imports):
+            receivers[node.targets[0].id] = node
+    return ProgramBindings(names, modules, dynamic, unbound, receivers)
+
+def static_receiver_type(name: str, func: ast.expr, bindings: ProgramBindings) -> str:
+    """Return the qualified name of the class of a name that a method is
+    called on, found statically.
+
+    The name must be assigned the result of a function of `RECEIVER_TYPES`
+    once, before the line of the call.
+
+    Raises
+    ------
+    KeyError
+        if the class can't be known without running the program
+    """
+    assign = bindings.receivers.get(name)
+    if assign is None or not isinstance(assign.value, ast.Call):
+        raise KeyError(name)
+    if getattr(func, "lineno", 0) <= assign.end_lineno:
+        raise KeyError(name)
+    receiver_type = RECEIVER_TYPES[static_function_name(assign.value.func, bindings)]
+    for keyword in assign.value.keywords:
+        if keyword.arg is None or keyword.arg in RECEIVER_TYPE_KEYWORDS:
+            raise KeyError(name)
+    return receiver_type
+
+def static_function_name(func: ast.expr, bindings: ProgramBindings) -> str:
+    """Return the qualified name of the function of a call, found statically.
+
+    A name that the program doesn't bind is a builtin or a function of `math`
+    (which the code is run with), an attribute of a name bound only by an
+    `import` is a function of that module, and an attribute of a name assigned
+    an instance of a known class (see `static_receiver_type`) is a method of
+    that class.
+
+    Raises
+    ------
+    KeyError
+        if the function can't be known without running the program
+    """
+    if bindings.dynamic:
+        raise KeyError(func)
+    if isinstance(func, ast.Name):
+        name = func.id
+        if name in bindings.names or name in bindings.modules:
+            raise KeyError(name)
+        if name in builtins.__dict__:
+            return "builtins." + name
+        if not name.startswith("_") and name in math.__dict__:
+            return "math." + name
+        raise KeyError(name)
+    if isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name):
+        module = bindings.modules.get(func.value.id)
+        if module is not None:
+            return "{}.{}".format(module, func.attr)
+        receiver_type = static_receiver_type(func.value.id, func, bindings)
+        return "{}.{}".format(receiver_type, func.attr)
+    raise KeyError(func)
+
+def static_signature(
+    func: ast.expr,
+    bindings: ProgramBindings,
+    registry: SignatureRegistry = SIGNATURE_REGISTRY) -> Optional[inspect.Signature]:
+    """Return the registered signature of the function of a call.
+
+    Returns None if the function has no signature.
+
+    Raises
+    ------
+    KeyError
+        if the function can't be known without running the program, or isn't
+        registered
+    """
+    return registry.lookup(static_function_name(func, bindings))
@@ -0,0 +1,112 @@
+import asyncio
+import pytest
+
+from pygradethis import async_grader
+from pygradethis.async_grader import AsyncGrader, GraderBusy
+from pygradethis.grade_code import grade_code, prepare_solution
+
+SLOW_CHECK_CODE = """grade_result(
+    pass_if_equals(3, "Nice work!"),
+    user_result = any(x for x in iter(int, 1))
+)"""
+
+def test_async_grading():
+    async def main():
+        async with AsyncGrader(workers=2) as grader:
+            student_codes = ["abs(-3)", "abs(3)", "round(2.5, 1)"] * 3
+            messages = await asyncio.gather(*[
+                grader.grade_code(code, prepare_solution("abs(-3)")) for code in student_codes
+            ])
+            assert messages == [grade_code(code, "abs(-3)") for code in student_codes]
+            result = await grader.pygradethis_exercise_checker(
+                user_code="2", solution_code="2", last_value=2,
+                check_code="grade_result(pass_if_equals(2, 'Nice!'), user_result = last_value)"
+            )
+            assert result['correct']
+            assert grader.pending == 0
+    asyncio.run(main())
+
+def test_async_grading_event_loops(monkeypatch):
+    grader = AsyncGrader(workers=1)
+    monkeypatch.setattr(async_grader, "DEFAULT_GRADER", grader)
+    async def main():
+        messages = await asyncio.gather(*[
+            async_grader.grade_code("abs(3)", "abs(-3)") for _ in range(4)
+        ])
+        assert messages == [grade_code("abs(3)", "abs(-3)")] * 4
+        return set(grader._all_workers)
+    # the default grader can be used from one event loop after another, with
+    # the workers of each loop
+    try:
+        first_workers = asyncio.run(main())
+        second_workers = asyncio.run(main())
+        assert first_workers and second_workers and not first_workers & second_workers
+        assert not any(worker.process.is_alive() for worker in first_workers)
+    finally:
+        grader.close()
+
+def test_async_grading_limits():
+    async def main():
+        async with AsyncGrader(workers=1, max_pending=2, timeout=0.2) as grader:
+            ticks = 0
+            async def tick():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+            ticker = asyncio.create_task(tick())
+            slow = asyncio.create_task(grader.pygradethis_exercise_checker(
+                user_code="abs(-3)", solution_code="abs(-3)", check_code=SLOW_CHECK_CODE
+            ))
+            queued = asyncio.create_task(grader.grade_code("abs(3)", "abs(-3)"))
+            await asyncio.sleep(0)
+            # more gradings than the grader allows are refused
+            with pytest.raises(GraderBusy):
+                await grader.grade_code("abs(3)", "abs(-3)")
+            # a grading that runs for too long times out, without blocking the loop
+            with pytest.raises(asyncio.TimeoutError):
+                await slow
+            assert ticks > 5
+            assert await queued is not None
+            # a cancelled grading frees its place
+            task = asyncio.create_task(grader.grade_code("abs(3)", "abs(-3)"))
+            await asyncio.sleep(0)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            assert grader.pending == 0
+            ticker.cancel()
+    asyncio.run(main())
+
+def test_async_grading_failures():
+    run_check_code = """grade_result(pass_if_equals(1, "Ran!"), user_result = len([exec(user_code, {})]))"""
+    swallows_timeouts = "while True:\n    try:\n        while True: pass\n    except BaseException:\n        pass"
+    async def main():
+        async with AsyncGrader(workers=1, timeout=0.5) as grader:
+            async def check(user_code):
+                return await grader.pygradethis_exercise_checker(
+                    user_code=user_code, solution_code="x = 1", check_code=run_check_code
+                )
+            # a submission that kills its worker gets a warning, and a new
+            # worker grades the next ones
+            result = await check("import os\nos._exit(1)")
+            assert (result['correct'], result['type']) == (False, "warning")
+            assert (await check("x = 1"))['correct']
+            # the timeout can't be swallowed by the graded code
+            with pytest.raises(asyncio.TimeoutError):
+                await check(swallows_timeouts)
+            assert (await check("x = 1"))['correct']
+            # a cancelled grading doesn't keep running in its worker
+            task = asyncio.create_task(grader.pygradethis_exercise_checker(
+                user_code=swallows_timeouts, solution_code="x = 1", check_code=run_check_code,
+                timeout=60
+            ))
+            await asyncio.sleep(0.2)
+            [worker] = grader._all_workers
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            worker.process.join(5)
+            assert not worker.process.is_alive()
+            assert (await check("x = 1"))['correct']
+    asyncio.run(main())
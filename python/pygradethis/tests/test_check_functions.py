@@ -0,0 +1,86 @@
+import ast
+import inspect
+import pytest
+
+from pygradethis.check_functions import (
+    ProgramNamespace, callable_signature, standardize_arguments
+)
+
+def test_program_namespace():
+    program = ProgramNamespace("def foo(a, b=1): pass\nsum = foo")
+    # the program's names shadow the builtins
+    assert program.envir["sum"] is program.envir["foo"]
+    assert program.envir["max"] is max
+    # a program that raises is only run once, and raises each time
+    failing = ProgramNamespace("1/0")
+    for _ in range(2):
+        with pytest.raises(ZeroDivisionError):
+            failing.envir
+    assert failing._envir is None
+
+def test_callable_signature_is_cached():
+    program = ProgramNamespace("def foo(a, b=1): pass\nclass A:\n    def m(self, x): pass")
+    foo = program.envir["foo"]
+    assert callable_signature(foo) == inspect.signature(foo)
+    assert callable_signature(foo) is callable_signature(foo)
+    # bound methods of different objects share their function's signature
+    A = program.envir["A"]
+    assert callable_signature(A().m) is callable_signature(A().m)
+    assert list(callable_signature(A().m).parameters) == ["x"]
+    assert callable_signature(abs) is callable_signature(abs)
+
+def test_standardize_arguments_with_programs():
+    source = "def foo(a, b=1): pass"
+    program = ProgramNamespace(source)
+    call = ast.parse("foo(2, b=3)").body[0].value
+    standardized = standardize_arguments(
+        call, call, source, source, left_program=program, right_program=program
+    )
+    assert [k.arg for k in standardized.keywords] == ["a", "b"]
+
+def test_known_calls_are_standardized_without_running(monkeypatch):
+    from pygradethis import check_functions
+    runs = []
+    run_program = check_functions.run_program
+    def counting_run_program(source):
+        runs.append(source)
+        return run_program(source)
+    monkeypatch.setattr(check_functions, "run_program", counting_run_program)
+
+    def standardize(source, code, solution_code=None):
+        program = ProgramNamespace(source)
+        call = ast.parse(source + "\n" + code).body[-1].value
+        solution_call = ast.parse(solution_code).body[0].value if solution_code else call
+        return standardize_arguments(call, solution_call, source, source, program, program)
+
+    source = (
+        "import numpy as np\nimport pandas as pd\n"
+        "x = sorted([3, 1], reverse=True)\ndf = pd.DataFrame({'a': x})\narr = np.array(x)"
+    )
+    for code, expected in [
+        ("sorted([3, 1], reverse=True)", ["iterable", "key", "reverse"]),
+        ("pd.isna(x)", ["obj"]),
+        # methods called on names assigned an instance of a known class
+        ("df.head(2)", ["n"]),
+        ("arr.sum(0)", ["axis", "dtype", "out", "kwargs"]),
+    ]:
+        assert [k.arg for k in standardize(source, code).keywords] == expected
+    assert runs == []
+
+    # the program is run when the call can't be checked without it, or when
+    # running it would fail, so the call is checked with its error
+    for source, code in [
+        ("x = 1", "max(1, 2)"),
+        ("import pandas as pd\ndf = pd.DataFrame({'a': [1]})\ndf = df.copy()", "df.head(2)"),
+    ]:
+        runs.clear()
+        standardize(source, code)
+        assert runs == [source]
+    runs.clear()
+    with pytest.raises(AssertionError):
+        standardize("x = 1", "sorted()", "sorted([1])")
+    assert runs == ["x = 1"]
+    runs.clear()
+    with pytest.raises(AssertionError, match="Name 'undefined' is not defined"):
+        standardize("x = undefined", "sorted([3, 1])")
+    assert runs == ["x = undefined"]
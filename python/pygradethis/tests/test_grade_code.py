@@ -1,5 +1,9 @@
-from pygradethis.grade_code import grade_code
+from pygradethis.grade_code import (
+    grade_code, prepare_solution, solution_cache_clear, solution_cache_info,
+    ParentSource, StructuralIds
+)
 from collections import namedtuple
+import ast
 
 # convenience tuple for structuring test cases
 Case = namedtuple("Case", ["actual", "expected", "message"])
@@ -112,3 +116,105 @@ def test_function_calls():
             )
         )
 
+def test_deep_and_long_code():
+    # deeply nested expressions are checked without recursion
+    deep = "x = " + " + ".join(["1"] * 400)
+    assert grade_code(deep, deep) is None
+    assert grade_code(deep, deep[:-1] + "2") == (
+        "I expected `2`, but what you wrote was interpreted as `1` at line 1."
+    )
+    # the first difference of a long program is reported
+    long = "\n".join("x{0} = (y + {0}) * [{0}, {0}]".format(i) for i in range(300))
+    assert grade_code(long, long) is None
+    assert grade_code(long, long.replace("[150, 150]", "[150, 151]")) == (
+        "I expected `151`, but what you wrote was interpreted as `150` at line 151."
+    )
+
+def test_parent_source_is_formatted_lazily():
+    call = ast.parse("sum([1, 2])").body[0].value
+    parent = ParentSource(text="").push(call)
+    # the source text is only formatted when it is needed
+    assert parent.node is call and parent._text is None
+    assert str(parent) == "sum([1, 2])"
+    # constants are not parent sources
+    assert parent.push(call.args[0].elts[0]) is parent
+    # a parent that can't be formatted falls back to the previous parent
+    unformattable = ast.parse("f([a])").body[0].value
+    assert ParentSource(unformattable, parent).text == "sum([1, 2])"
+
+def test_structural_ids():
+    left = ast.parse("x = [1, 2]\ny = 1\nz = f(1)")
+    right = ast.parse("x = [1,\n     2]\n\ny = True\nz = f(1)")
+    structure = StructuralIds(left, right)
+
+    # the same structure at different locations has the same id
+    assert structure.same(left.body[0], right.body[0])
+    assert structure.last_line(right.body[0]) == 2
+    # 1 == True, but they are different values
+    assert not structure.same(left.body[1], right.body[1])
+    # calls are always checked, since that runs them
+    assert not structure.same(left.body[2], right.body[2])
+    assert not structure.same(left, right)
+
+def test_identical_subtrees_keep_line_numbers():
+    # the missing element is reported at the line of the last checked element
+    assert grade_code("x = [1,\n     2]", "x = [1,\n     2,\n     3]") == (
+        "I expected `3` at line 2."
+    )
+
+def test_prepared_solution():
+    solution_code = "def foo(a, b=1): pass; foo(1, 2)"
+    solution = prepare_solution(solution_code)
+    assert prepare_solution(solution_code) is solution
+    before = ast.dump(solution.tree)
+
+    for student_code, message in [
+        ("def foo(a, b=1): pass; foo(1, 2)", None),
+        ("def foo(a, b=1): pass; foo(a=1, b=2)", None),
+        ("def foo(a, b=1): pass; foo(2, 2)", "I expected `1`, but what you wrote was interpreted as `2` in `foo(2, 2)` at line 1."),
+        ("def foo(a, b=1): pass; foo(1, b=3)", "I expected `2`, but what you wrote was interpreted as `3` in `foo(1, b=3)` at line 1."),
+        ("def foo(a, b=1): pass; foo()", "I expected `foo(a=1, b=2)` but what you wrote was interpreted as `foo()`, which I can't execute because I'm missing a required argument: 'a'."),
+    ]:
+        assert grade_code(student_code, solution) == message
+        assert grade_code(student_code, solution_code) == message
+    # grading leaves the solution as it was, and its call is standardized once
+    assert ast.dump(solution.tree) == before
+    assert len(solution._standardized) == 1
+
+def test_programs_run_once_per_grading(monkeypatch):
+    from pygradethis import check_functions
+    runs = []
+    run_program = check_functions.run_program
+    def counting_run_program(source):
+        runs.append(source)
+        return run_program(source)
+    monkeypatch.setattr(check_functions, "run_program", counting_run_program)
+
+    student_code = "def f(a, b): pass\nf(1, 1)\nf(a=2, b=1)\nf(3, b=2)"
+    solution_code = "def f(a, b): pass\nf(1, 1)\nf(2, 1)\nf(3, 2)"
+    solution_cache_clear()
+    assert grade_code(student_code, solution_code) is None
+    assert runs == [student_code, solution_code]
+    # the prepared solution is only run once for all gradings
+    runs.clear()
+    for _ in range(3):
+        assert grade_code(student_code, prepare_solution(solution_code)) is None
+    assert runs == [student_code] * 3
+    assert solution_cache_info().hits == 3 and solution_cache_info().currsize == 1
+
+def test_failing_programs_with_known_calls(monkeypatch):
+    from pygradethis import check_functions
+    runs = []
+    monkeypatch.setattr(check_functions, "run_program", lambda source: runs.append(source))
+
+    # a program that fails when it runs, for a reason unrelated to a call of a
+    # builtin, has the call checked without running it, like in a program that
+    # doesn't fail, instead of reporting the failure of the checking
+    for student_code, solution_code, message in [
+        ("x = 1 / 0\nabs(3)", "x = 1 / 0\nabs(-3)", "I expected `-3`, but what you wrote was interpreted as `3` in `abs(3)` at line 2."),
+        ("x = 1 / 0\nround(2.5, 1)", "x = 1 / 0\nround(2.5, 2)", "I expected `2`, but what you wrote was interpreted as `1` in `round(float, 1)` at line 2."),
+        ("x = 1 / 0\nround(2.5, ndigits=1)", "x = 1 / 0\nround(2.5, 1)", None),
+        ("round(1 / 0)", "round(2.5, 1)", "I expected `float`, but what you wrote was interpreted as `1 / 0` in `round(1 / 0)` at line 1."),
+    ]:
+        assert grade_code(student_code, solution_code) == message
+    assert runs == []
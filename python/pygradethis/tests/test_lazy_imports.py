@@ -0,0 +1,20 @@
+import subprocess
+import sys
+
+def imported_modules(statement: str) -> set:
+    """Return the top level modules imported by a statement in a new interpreter."""
+    output = subprocess.run(
+        [sys.executable, "-c", statement + "\nimport sys; print(' '.join(sys.modules))"],
+        capture_output=True, text=True, check=True
+    ).stdout
+    return {name.partition(".")[0] for name in output.split()}
+
+def test_lazy_imports():
+    heavy = {"pandas", "numpy", "rich", "lxml"}
+    assert not heavy & imported_modules("import pygradethis")
+    assert not heavy & imported_modules("from pygradethis.pygradethis_exercise_checker import pygradethis_exercise_checker")
+    # the submodules are still attributes of the package
+    assert "pygradethis" in imported_modules("import pygradethis; pygradethis.grade_code.grade_code")
+
+    import pygradethis
+    assert "grade_code" in dir(pygradethis)
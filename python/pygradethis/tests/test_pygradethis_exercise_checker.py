@@ -1,6 +1,8 @@
+import pytest
 from re import U
 from pygradethis.conditions import *
 from pygradethis.pygradethis_exercise_checker import *
+from pygradethis.grade_code import prepare_solution
 
 # Grade result -------------------------------------
 
@@ -114,3 +116,70 @@ def test_pass_if_fail_if_incorrect():
     assert not result['correct']
     assert result['type'] == "error"
     assert "We do not want 1." in result['message']
+
+def test_prepared_solution():
+    # the check code can grade the code with the prepared solution
+    check_code = """grade_result(
+        pass_if_equals(3, "Nice work!"),
+        fail_if_equals(0, "Your code differs from the solution."),
+        user_result = 3 if grade_code(user_code, prepared_solution) is None else 0
+    )"""
+    solution = prepare_solution("abs(-3)")
+    for user_code, correct in [("abs(-3)", True), ("abs(3)", False)]:
+        result = pygradethis_exercise_checker(
+            user_code=user_code,
+            solution_code=solution,
+            check_code=check_code
+        )
+        assert result['correct'] == correct
+
+def test_envir_prep_is_shared():
+    envir_prep = {"expected": [1, 2, 3]}
+    check_code = """grade_result(
+        pass_if_equals(expected, "Same list!"),
+        user_result = expected.copy() if not expected.append(4) else None
+    )"""
+    result = pygradethis_exercise_checker(
+        user_code="[1, 2, 3]",
+        solution_code="[1, 2, 3]",
+        check_code=check_code,
+        envir_prep=envir_prep
+    )
+    # the check code gets the prepared objects themselves, not copies
+    assert result['correct']
+    assert envir_prep == {"expected": [1, 2, 3, 4]}
+
+def test_prepared_exercise():
+    check_code = """grade_result(
+        pass_if_equals(2, "Woah, nice!"),
+        user_result = last_value
+    )"""
+    exercise_cache_clear()
+    exercise = prepare_exercise("ex-1", check_code)
+    assert prepare_exercise("ex-1", check_code) is exercise
+    assert prepare_exercise("ex-2", check_code) is not exercise
+
+    # submissions reuse the compiled check code
+    for check in [exercise, check_code]:
+        result = pygradethis_exercise_checker(
+            label="ex-1", user_code="2", solution_code="2", check_code=check, last_value=2
+        )
+        assert result['correct']
+    assert exercise_cache_info().hits == 2 and exercise_cache_info().currsize == 2
+
+    # errors are raised when the exercise is prepared, and reported when grading
+    with pytest.raises(SyntaxError):
+        prepare_exercise("ex-3", "grade_result(")
+    result = pygradethis_exercise_checker(
+        label="ex-3", user_code="2", solution_code="2", check_code="grade_result(", last_value=2
+    )
+    assert result['type'] == "warning"
+    # with the same message as when the check code was compiled per submission
+    assert result['message'].endswith("(<string>, line 1)")
+
+    # the cache is bounded
+    cache = SourceCache(lambda exercise: PreparedExercise(*exercise), 2, key=exercise_key)
+    first = cache.get(("a", check_code))
+    cache.get(("b", check_code))
+    cache.get(("c", check_code))
+    assert cache.get(("a", check_code)) is not first and cache.info().currsize == 2
@@ -0,0 +1,56 @@
+import pytest
+
+from pygradethis.python_grader import grade_many, grade_submission
+
+CHECK_CODE = """grade_result(
+    pass_if_equals(3, "Nice work!"),
+    fail_if_equals(0, "Your code differs from the solution."),
+    user_result = 3 if grade_code(user_code, prepared_solution) is None else 0
+)"""
+
+def test_grade_many():
+    submissions = ["abs(-3)", "abs(3)", "abs(-3)"] * 10
+    results = grade_many(iter(submissions), "abs(-3)", CHECK_CODE, workers=2, chunk_size=4)
+    # the feedback is in the order of the submissions
+    assert [r['correct'] for r in results] == [s == "abs(-3)" for s in submissions]
+
+    # a submission can be given with its last value
+    check_code = """grade_result(pass_if_equals(2, "Woah, nice!"), user_result = last_value)"""
+    results = list(grade_many(
+        [dict(user_code="2", last_value=2), dict(user_code="1", last_value=1)],
+        "2", check_code, workers=1
+    ))
+    assert [r['correct'] for r in results] == [True, False]
+
+    # an error in the check code is raised once, when grade_many() is called
+    with pytest.raises(SyntaxError):
+        grade_many(submissions, "abs(-3)", "grade_result(", workers=1)
+
+    # there has to be a worker to grade the submissions
+    for workers in [0, -1]:
+        with pytest.raises(ValueError):
+            grade_many(submissions, "abs(-3)", CHECK_CODE, workers=workers)
+
+def test_grade_many_failures():
+    # the check code runs the submission, which can misbehave
+    check_code = """grade_result(pass_if_equals(1, "Ran!"), user_result = len([exec(user_code, {})]))"""
+    swallows_timeouts = "while True:\n    try:\n        while True: pass\n    except BaseException:\n        pass"
+    results = list(grade_many(
+        ["x = 1", swallows_timeouts, "import os\nos._exit(1)", "raise SystemExit", "x = 2"],
+        "x = 1", check_code, workers=1, chunk_size=5, timeout=1
+    ))
+    # a submission that takes too long or kills its worker gets a warning, and
+    # a new worker grades the rest
+    assert [r['correct'] for r in results] == [True, False, False, False, True]
+    assert "longer than 1 seconds" in results[1]['message']
+    assert results[2]['type'] == results[3]['type'] == "warning"
+
+def test_grade_many_unparsable_solution():
+    check_code = """grade_result(
+        pass_if_equals(3, "Nice work!"),
+        user_result = 3 if grade_code(user_code, solution_code) is None else 0
+    )"""
+    # reported for each submission, like when grading them one at a time
+    serial = grade_submission("abs(-3)", "abs(-3", check_code)
+    results = grade_many(["abs(-3)"] * 3, "abs(-3", check_code, workers=2)
+    assert [(r['correct'], r['type']) for r in results] == [(serial['correct'], serial['type'])] * 3
@@ -0,0 +1,42 @@
+import sys
+import pandas as pd
+
+from pygradethis.conditions import pass_if_equals, fail_if_equals
+from pygradethis import result_checker
+from pygradethis.result_checker import condition_matches
+
+def test_condition_matches():
+    df = pd.DataFrame({"a": [1, 2]})
+    assert condition_matches(df, df.copy())
+    assert not condition_matches(df, pd.DataFrame({"a": [1, 3]}))
+    # comparisons that raise don't match
+    assert not condition_matches(df, 1)
+    assert not condition_matches(df["a"], df["a"])
+    assert condition_matches([1, 2], [1, 2]) and not condition_matches([1, 2], (1, 2))
+    # a condition without a value matches anything
+    assert condition_matches(df, None)
+
+def test_conditions_order():
+    compared = []
+    class Result:
+        def __eq__(self, other):
+            compared.append(other)
+            return other in (1, 2)
+    result = result_checker.test_conditions(
+        fail_if_equals(1, "one"), pass_if_equals(2, "two"), pass_if_equals(3, "three"),
+        user_result=Result()
+    )
+    # the first pass_if_equals that matches is returned, without checking the rest
+    assert result["message"] == "two"
+    assert compared == [1, 2]
+
+    result = result_checker.test_conditions(
+        pass_if_equals(3, "three"), fail_if_equals(1, "one"), fail_if_equals(2, "two"),
+        user_result=Result()
+    )
+    assert result["message"] == "one" and not result["correct"]
+
+    stderr = sys.stderr
+    result = result_checker.test_conditions(pass_if_equals(3, "three"), user_result=1)
+    assert result == dict(x=None, message="", correct=False, type="error")
+    assert sys.stderr is stderr
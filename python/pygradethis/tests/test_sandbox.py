@@ -0,0 +1,50 @@
+import os
+import time
+import pytest
+
+from pygradethis.sandbox import SandboxPool, SandboxError, SandboxTimeout
+
+def test_sandbox_pool():
+    with SandboxPool(workers=1, preload=("pandas",), timeout=2, cpu_seconds=1, memory_bytes=2 << 30) as pool:
+        result = pool.check(
+            user_code="2", solution_code="2", last_value=2,
+            check_code="grade_result(pass_if_equals(2, 'Nice!'), user_result = last_value)"
+        )
+        assert result['correct']
+        # each job runs in a new child of the same warm worker
+        worker = pool.run(os.getppid)
+        child = pool.run(os.getpid)
+        assert pool.run(os.getppid) == worker and pool.run(os.getpid) != child
+        # the job's exceptions are raised, and the limits kill the job, not the worker
+        with pytest.raises(ZeroDivisionError):
+            pool.run(eval, "1 / 0")
+        with pytest.raises(MemoryError):
+            pool.run(bytearray, 4 << 30)
+        with pytest.raises(SandboxTimeout):
+            pool.run(time.sleep, 5)
+        with pytest.raises(SandboxError, match="SIGXCPU|SIGKILL"):
+            pool.run(eval, "sum(iter(int, 1))")
+        assert pool.run(os.getppid) == worker
+        # a job that doesn't need the sandboxed process' state gets its result
+        assert pool.run(eval, "len(__import__('sys').modules['pandas'].__name__)") == 6
+
+def raise_unpicklable(path):
+    class Exploit(BaseException):
+        # unpickling it would run code in the process that reads it
+        def __reduce__(self):
+            return (exec, ("open({!r}, 'w').write(str(__import__('os').getpid()))".format(path),))
+    raise Exploit("boom")
+
+def test_sandbox_outcome_is_not_unpickled(tmp_path):
+    path = str(tmp_path / "pwned")
+    with SandboxPool(workers=1, preload=()) as pool:
+        # only the type name and message of the job's exception are sent back
+        with pytest.raises(SandboxError, match="Exploit: boom"):
+            pool.run(raise_unpicklable, path)
+        assert not os.path.exists(path)
+        with pytest.raises(KeyError, match="x"):
+            pool.run(eval, "{}['x']")
+        # the results are sent back as JSON
+        assert pool.run(divmod, 7, 2) == [3, 1]
+        with pytest.raises(SandboxError, match="can't be sent back"):
+            pool.run(object)
@@ -0,0 +1,89 @@
+import ast
+import inspect
+import math
+import pytest
+
+from pygradethis.signatures import (
+    SignatureRegistry, program_bindings, static_function_name
+)
+
+def function_name(source: str, call: str) -> str:
+    bindings = program_bindings(ast.parse(source))
+    return static_function_name(ast.parse(call).body[0].value.func, bindings)
+
+def test_static_function_name():
+    source = "import numpy as np\nimport os.path\nx = 1\ndef f(a): pass"
+    assert function_name(source, "len(x)") == "builtins.len"
+    # builtins come before math, like in the namespace the code is run with
+    assert function_name(source, "pow(2, 3)") == "builtins.pow"
+    assert function_name(source, "sqrt(2)") == "math.sqrt"
+    assert function_name(source, "np.mean(x)") == "numpy.mean"
+    assert function_name(source, "os.getcwd()") == "os.getcwd"
+    # the program's functions and objects need the program to be run
+    for call in ["f(1)", "x.count(1)", "os.path.join('a')", "undefined(1)"]:
+        with pytest.raises(KeyError):
+            function_name(source, call)
+    # methods of names assigned an instance of a known class, once and before
+    # the call
+    source = "import pandas as pd\ndf = pd.DataFrame()\nr = pd.read_csv('a', chunksize=1)"
+    assert function_name(source, "\n\n\ndf.head()") == "pandas.DataFrame.head"
+    for call in ["df.head()", "\n\n\nr.read()"]:
+        with pytest.raises(KeyError):
+            function_name(source, call)
+    with pytest.raises(KeyError):
+        function_name(source + "\ndf = df.copy()", "\n\n\n\ndf.head()")
+    # names the program binds shadow builtins
+    for shadowing in ["sum = max", "def sum(): pass", "import sum", "for sum in []: pass"]:
+        with pytest.raises(KeyError):
+            function_name(shadowing, "sum([1])")
+    # and some programs can bind any name
+    for dynamic in ["from math import *", "exec('sum = max')", "import builtins\nbuiltins.sum = max"]:
+        with pytest.raises(KeyError):
+            function_name(dynamic, "len([1])")
+
+def test_program_bindings():
+    bindings = program_bindings(ast.parse(
+        "import numpy as np\nx = np.array([1])\ny = x\ny = 2\nprint(sqrt(x), z, _private)"
+    ))
+    assert bindings.modules == {"np": "numpy"} and bindings.names == {"x", "y"}
+    # names used but never bound raise a NameError when the program runs
+    assert bindings.unbound == {"z", "_private"}
+    assert list(bindings.receivers) == ["x"]
+    # names are bound by the statements before the ones that use them
+    for source in ["print(y)\ny = 1", "def f(a=y): pass\ny = 1", "class A:\n    b = y\ny = 1"]:
+        assert program_bindings(ast.parse(source)).unbound == {"y"}
+    for source in ["def f():\n    return y\ny = 1", "for y in [1]: print(y)", "f = lambda: y\ny = 1"]:
+        assert program_bindings(ast.parse(source)).unbound == set()
+
+def test_registry_lookup():
+    registry = SignatureRegistry(modules=("builtins", "math"))
+    assert registry.lookup("builtins.sorted") == inspect.signature(sorted)
+    # functions without a signature are registered with None
+    assert registry.lookup("builtins.max") is None
+    # a module is seeded the first time one of its functions is looked up
+    assert len(registry) > 100 and "math.sqrt" in registry
+    for name in ["math.pi", "math.undefined", "math._private", "pandas.isna"]:
+        assert name not in registry
+
+    # the methods of a class are registered without their `self`
+    registry = SignatureRegistry(modules=("pandas",))
+    head = registry.lookup("pandas.DataFrame.head")
+    assert list(head.parameters) == ["n"]
+    assert list(registry.lookup("pandas.DataFrame.from_dict").parameters)[0] == "data"
+    assert "pandas.DataFrame.undefined" not in registry
+
+def test_registry_dump_and_load(tmp_path):
+    registry = SignatureRegistry(modules=("builtins", "math"))
+    registry.seed()
+    assert registry.lookup("math.isclose") == inspect.signature(math.isclose)
+    path = str(tmp_path / "signatures.json")
+    registry.dump(path)
+
+    loaded = SignatureRegistry(modules=())
+    loaded.load(path)
+    for name in ["builtins.sorted", "builtins.max", "builtins.print", "math.isclose"]:
+        assert loaded.lookup(name) == registry.lookup(name)
+    with open(path, "w") as f:
+        f.write("{}")
+    with pytest.raises(ValueError):
+        loaded.load(path)
@@ -1,4 +1,9 @@
-from pygradethis.utils import get_last_value, get_envir_diff, NONE
+import traceback
+import pytest
+from pygradethis.utils import (
+  get_last_value, get_envir_diff, script_cache_clear, script_cache_info,
+  LayeredNamespace, LAST_VALUE_NAME, NONE
+)
 import pandas as pd
 from pandas.testing import assert_frame_equal
 
@@ -12,6 +17,24 @@ def test_get_last_value_exprs():
   envir, last_value = get_last_value("import pandas as pd\npd.DataFrame({'a':[1,2,3]})", {})
   assert_frame_equal(last_value, pd.DataFrame({'a':[1,2,3]}))
 
+def test_get_last_value_without_envir():
+  # e.g. the R package passes None when an exercise has no setup code
+  envir, last_value = get_last_value("x = 2\nx + 1", None)
+  assert last_value == 3 and envir['x'] == 2
+  # every call gets a new environment
+  envir, last_value = get_last_value("y = 1\n'x' in globals()", None)
+  assert last_value is False
+  # not the globals of the utils module
+  envir, last_value = get_last_value("'NONE' in globals()", None)
+  assert last_value is False
+
+def test_get_last_value_compile_error():
+  # the script is compiled before it runs, so no statement runs
+  envir = {}
+  with pytest.raises(SyntaxError):
+    get_last_value("x = 1\nbreak", envir)
+  assert 'x' not in envir
+
 def test_get_last_value_statement():
   envir, last_value = get_last_value("2 + 2\nx = 2", {})
   assert last_value != None
@@ -24,4 +47,35 @@ def test_get_last_value_statement():
 def test_get_envir_diff():
   envir_prep = {'x': 2}
   envir_result = {'x': 2, 'y': 4}
-  assert get_envir_diff(envir_prep, envir_result) == ['y']
\ No newline at end of file
+  assert get_envir_diff(envir_prep, envir_result) == ['y']
+
+
+def test_layered_namespace():
+  prep = {'df': pd.DataFrame({'a': [1, 2]}), 'x': 1, 'hidden': None}
+  grader = {'x': 2, 'hidden': 3, 'y': 4}
+  envir = LayeredNamespace(prep, grader)
+  exec("z = x + y\ncols = [df[c].sum() * y for c in df]\nx = 5", envir)
+  # the writes stay in the namespace, and the layers are left as they were
+  assert dict(envir) == {'__builtins__': envir['__builtins__'], 'z': 5, 'cols': [12], 'x': 5}
+  assert prep['x'] == 1 and grader['x'] == 2
+  # the layers are read through, not copied
+  assert envir['df'] is prep['df']
+  # a name set to None in the first layer that has it is not defined
+  assert 'hidden' not in envir and envir.get('hidden', 0) == 0
+
+def test_get_last_value_compiles_once():
+  script = "\n".join(f"x{i} = {i}" for i in range(300)) + "\nx299 + 1"
+  script_cache_clear()
+  for _ in range(3):
+    envir, last_value = get_last_value(script, {})
+    assert last_value == 300
+  assert script_cache_info().misses == 1
+  # the reserved name of the last value is not left in the environment
+  assert LAST_VALUE_NAME not in envir and envir['x299'] == 299
+
+  envir, last_value = get_last_value("", {})
+  assert last_value is None and envir == {}
+  # errors are raised with the line they happened on
+  with pytest.raises(ZeroDivisionError) as e:
+    get_last_value("x = 1\n1 / 0\nx", {})
+  assert traceback.extract_tb(e.value.__traceback__)[-1].lineno == 2
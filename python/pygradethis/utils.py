@@ -2,9 +2,11 @@
 Module with useful functions.
 """
 
-from typing import Tuple
+from typing import Mapping, Tuple
 import ast
 
+from pygradecode.source_cache import CacheInfo, SourceCache
+
 class NotSet:
     """Sentinel value to distinguish a special type of None from literal
     None. This is used specifically for get_last_value function.
@@ -14,6 +16,52 @@ class NotSet:
 
 NONE = NotSet()
 
+class LayeredNamespace(dict):
+    """A namespace for `exec` that reads through to layers of other namespaces
+    without copying them, and records the writes in itself.
+
+    The layers are looked up in order, so earlier layers shadow later ones, and
+    the layers are not modified. Like merging the layers into a dict and
+    filtering out the `None`s, a name is not defined if its value in the first
+    layer that has it is None.
+
+    This works because `exec` looks up the names of a dict subclass, at module
+    level and in functions, with `__getitem__`, which calls `__missing__` for
+    the names that were not written.
+
+    Parameters
+    ----------
+    *layers : Mapping
+        the namespaces to read from, from the highest priority to the lowest
+    """
+    def __init__(self, *layers: Mapping):
+        super().__init__()
+        self.layers = layers
+
+    def __missing__(self, key):
+        for layer in self.layers:
+            if key in layer:
+                value = layer[key]
+                if value is None:
+                    break
+                return value
+        raise KeyError(key)
+
+    def __contains__(self, key) -> bool:
+        if dict.__contains__(self, key):
+            return True
+        try:
+            self.__missing__(key)
+        except KeyError:
+            return False
+        return True
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
 def parse_code(input: str | list[str]) -> str:
     """Tries to parse code represented as string or list of strings
 
@@ -44,15 +92,51 @@ def parse_code(input: str | list[str]) -> str:
         else:
             raise SyntaxError("Problem parsing your code!")
 
-def get_last_value(script: str, envir: dict) -> Tuple:
+# the name that the value of the last line of a script is stored in, while it runs
+LAST_VALUE_NAME = "__pygradethis_last_value__"
+
+def compile_script(script: str) -> Tuple:
+    """Compile a script so that it stores the value of its last line.
+
+    Returns the code object and the kind of the last line: "expression", in
+    which case running the code stores its value in `LAST_VALUE_NAME`,
+    "statement", or "empty" if the script has no lines of code.
+    """
+    tree = ast.parse(script)
+    if not tree.body:
+        last_line = "empty"
+    elif isinstance(tree.body[-1], ast.Expr):
+        last_line = "expression"
+        last = tree.body[-1]
+        # only the new nodes are given locations, walking the whole tree to fix
+        # missing locations costs more than compiling it
+        target = ast.copy_location(ast.Name(id=LAST_VALUE_NAME, ctx=ast.Store()), last)
+        tree.body[-1] = ast.copy_location(ast.Assign(targets=[target], value=last.value), last)
+    else:
+        last_line = "statement"
+    return compile(tree, filename="<ast>", mode="exec"), last_line
+
+# the compiled scripts of `get_last_value()`, keyed by a hash of their source
+SCRIPT_CACHE = SourceCache(compile_script)
+
+def script_cache_info() -> CacheInfo:
+    """Return the hits, misses, maxsize and current size of the compiled script cache."""
+    return SCRIPT_CACHE.info()
+
+def script_cache_clear() -> None:
+    """Clear the compiled script cache and reset its counters."""
+    SCRIPT_CACHE.clear()
+
+def get_last_value(script: str, envir: dict = None) -> Tuple:
     """Evaluate Python code and return the value of the last line of code.
 
     Parameters
     ----------
     script : str
         A string of Python code
-    envir : dict
-        A dictionary for the environment in which to evaluate code
+    envir : dict, optional
+        A dictionary for the environment in which to evaluate code, by default
+        a new empty one
 
     Returns
     -------
@@ -60,6 +144,16 @@ def get_last_value(script: str, envir: dict) -> Tuple:
         The Python envir which contains all objects created in execution of envir,
         and a last value which is a Python object, or `NotSet` if the last line is not an expression.
 
+    Notes
+    -----
+    Without `envir`, the code runs in a new environment that is returned, not
+    in the globals of this module as it used to, so it can't read or change
+    the names of this module.
+
+    The whole script is compiled before any of it runs, so a script with an
+    error that is only found when compiling (e.g. `break` outside a loop)
+    runs none of its statements, not the ones before that error.
+
     Examples
     --------
     >>> get_last_value("x = 2; x + 1")
@@ -67,16 +161,20 @@ def get_last_value(script: str, envir: dict) -> Tuple:
 
     >>> get_last_value("2 + 2; x = 2") # returns NONE (sentinel value for None)
     """
-    stmts = list(ast.iter_child_nodes(ast.parse(script)))
-    # iteratively walk through AST and execute statements and expressions while storing the last value
-    last_value = None
-    for s in stmts:
-      if isinstance(s, ast.Expr):
-        last_value = eval(compile(ast.Expression(body=s.value), filename="<ast>", mode="eval"), envir)
-      else:
-        exec(compile(ast.Module(body=[s], type_ignores=[]), filename="<ast>", mode="exec"), envir)
+    # the script is compiled once (and cached), with its last expression stored
+    # in a reserved name that is removed from the environment after it runs
+    code, last_line = SCRIPT_CACHE.get(script)
+    if envir is None:
+        envir = {}
+    if last_line != "empty":
+        exec(code, envir)
+    if last_line == "expression":
+        last_value = envir.pop(LAST_VALUE_NAME)
+    elif last_line == "statement":
         last_value = NONE
-    
+    else:
+        last_value = None
+
     return envir, last_value
 
 def get_envir_diff(x: dict, y: dict) -> list[str]: